@@ -2,7 +2,7 @@
 Configuration management for the AI Coach backend.
 """
 from pydantic_settings import BaseSettings
-from typing import Dict, List
+from typing import Dict, List, Optional
 from functools import lru_cache
 from pydantic import field_validator
 
@@ -30,22 +30,85 @@ class Settings(BaseSettings):
     openai_model: str = "gpt-4o-mini"  # Fast and cost-effective
     openai_temperature: float = 0.7
     openai_max_tokens: int = 500  # Reduced for faster responses (aim for concise answers)
+    openai_embedding_model: str = "text-embedding-3-small"
+    openai_embedding_dimensions: int = 1024  # Match Pinecone index dimension
+
+    # Query embedding cache
+    embedding_cache_size: int = 2048  # In-process LRU entries
+    embedding_cache_path: Optional[str] = None  # SQLite file shared by workers on the host (disabled if unset)
+    embedding_cache_disk_max_entries: int = 50000
 
     # Pinecone Configuration
     pinecone_api_key: str
     pinecone_environment: str
     pinecone_index_name: str
     pinecone_top_k: int = 3  # Reduced from 5 for faster responses
+    pinecone_max_workers: int = 8  # Threads for blocking SDK calls (bounds concurrent queries)
+    pinecone_timeout_seconds: float = 10.0  # Per-call timeout for Pinecone requests
+    pinecone_max_abandoned_calls: int = 4  # Timed-out calls still holding a worker before new calls fail fast
+
+    # Retrieval backend: "pinecone" or "local" (in-process search over the ingestion vector artifact)
+    retrieval_backend: str = "pinecone"
+    local_vector_artifact_path: Optional[str] = None  # e.g. ../rag/data/processed/vector_artifact; also resolves stored citations
+    chunk_history_dir: Optional[str] = None  # e.g. ../rag/data/processed/chunk_history; needed to store citations by reference
 
     # Firebase Configuration
     firebase_project_id: str
     firebase_private_key: str
     firebase_client_email: str
     firebase_database_url: str
+    firebase_database_emulator_host: Optional[str] = None  # e.g. "localhost:9000" for local testing
+    firebase_http2: bool = True  # HTTP/2 multiplexing for Realtime Database REST calls
+    firebase_timeout_seconds: float = 10.0
+
+    # Auth token verification cache
+    auth_token_cache_size: int = 4096
+    auth_check_revoked: bool = False  # Opt-in revocation check (extra network call per miss)
+    auth_revocation_recheck_seconds: float = 300.0  # Max trust window for cached tokens when checking revocation
+
+    # Outbound HTTP connection pooling (shared clients owned by the service container)
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0  # Seconds an idle keep-alive connection is kept open
+
+    # Semantic response cache (near-duplicate first-turn questions per agent)
+    response_cache_enabled: bool = True
+    response_cache_similarity_threshold: float = 0.95  # Cosine similarity required for a hit
+    response_cache_ttl_seconds: float = 86400.0
+    response_cache_max_entries_per_agent: int = 512
+    corpus_version: str = "1"  # Without a vector artifact: bump after re-ingesting to invalidate cached answers
+
+    # Analytics response cache (stale-while-revalidate)
+    analytics_cache_ttl_seconds: float = 60.0  # Older snapshots are served while refreshed in the background
+    analytics_export_user_ids: List[str] = []  # Firebase UIDs allowed to export raw conversation data
+    metrics_user_ids: List[str] = []  # Firebase UIDs allowed to read /metrics
+    analytics_export_page_size: int = 500  # Records per database request while exporting
+
+    # Streaming chat (SSE) framing
+    sse_flush_chars: int = 64  # Pending characters that trigger a content frame
+    sse_flush_interval_ms: float = 20.0  # Pending content is sent after this long, even if no delta arrives
+
+    # Resumable streams (per worker; reconnects need sticky sessions)
+    stream_resume_enabled: bool = True  # Off: no reattaching, generation stops as soon as the client leaves
+    stream_buffer_max_streams: int = 256  # Answers kept for Last-Event-ID replay
+    stream_buffer_retention_seconds: float = 60.0  # Finished answers stay resumable this long
+    stream_resume_grace_seconds: float = 2.0  # Generation continues this long with no client attached
+
+    # WebSocket chat transport (/ws/chat)
+    ws_auth_timeout_seconds: float = 10.0  # Connections must authenticate within this time
+    ws_max_inflight_turns: int = 4  # Concurrent turns per connection
 
     # Conversation Settings
     max_conversation_history: int = 2  # Number of previous message pairs to include (reduced for speed)
 
+    # Recent conversation history cache (per worker, updated on write)
+    session_cache_size: int = 1024  # Active sessions kept in memory
+    session_cache_ttl_seconds: float = 600.0  # Entries are also checked against the index message count
+
+    # Cold session archive (see archive_sessions.py)
+    session_archive_dir: Optional[str] = None  # gs://bucket/prefix or a durable directory (archiving/rehydration disabled if unset)
+    session_retention_days: int = 90  # Sessions not accessed for this long are archived
+
     # Agent Configuration
     agent_configs: Dict[str, Dict] = {
         "professional_learning": {
@@ -54,6 +117,7 @@ class Settings(BaseSettings):
             "metadata_filter": {
                 "agent_professional_learning": {"$eq": True}
             },
+            "response_cache": True,  # Set False to opt this agent out of the semantic response cache
             "system_prompt": """You are a Professional Learning Coach for PLCs. You help educators with team collaboration and PLC implementation using Solution Tree research.
 
 RESPONSE FORMAT - Always structure your responses as follows:
@@ -84,6 +148,7 @@ Specific recommendations here..."""
             "metadata_filter": {
                 "agent_curriculum_planning": {"$eq": True}
             },
+            "response_cache": True,
             "system_prompt": """You are a Curriculum Planning Coach specializing in standards-aligned design and SMART goals. You help educators plan curriculum using Solution Tree resources.
 
 RESPONSE FORMAT - Always structure your responses as follows:
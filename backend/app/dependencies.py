@@ -3,9 +3,14 @@ FastAPI dependencies for authentication and service injection.
 """
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.requests import HTTPConnection
 from typing import Optional
-from app.config import Settings, get_settings
+from app.services.container import ServiceContainer
 from app.services.firebase_service import FirebaseService
+from app.services.agent_router import AgentRouter
+from app.services.chat_pipeline import ChatPipeline
+from app.services.analytics_service import AnalyticsService
+from app.services.stream_registry import StreamRegistry
 from app.models.schemas import UserInfo
 import logging
 
@@ -15,11 +20,44 @@ logger = logging.getLogger(__name__)
 security = HTTPBearer()
 
 
+def get_services(connection: HTTPConnection) -> ServiceContainer:
+    """Dependency to get the app-lifetime service container."""
+    return connection.app.state.services
+
+
 async def get_firebase_service(
-    settings: Settings = Depends(get_settings)
+    services: ServiceContainer = Depends(get_services)
 ) -> FirebaseService:
-    """Dependency to get Firebase service instance."""
-    return FirebaseService(settings)
+    """Dependency to get the shared Firebase service instance."""
+    return services.firebase_service
+
+
+def get_agent_router(
+    services: ServiceContainer = Depends(get_services)
+) -> AgentRouter:
+    """Dependency to get the shared AgentRouter instance."""
+    return services.agent_router
+
+
+def get_chat_pipeline(
+    services: ServiceContainer = Depends(get_services)
+) -> ChatPipeline:
+    """Dependency to get the shared chat turn pipeline."""
+    return services.chat_pipeline
+
+
+def get_stream_registry(
+    services: ServiceContainer = Depends(get_services)
+) -> StreamRegistry:
+    """Dependency to get the registry of resumable answer streams."""
+    return services.stream_registry
+
+
+def get_analytics_service(
+    services: ServiceContainer = Depends(get_services)
+) -> AnalyticsService:
+    """Dependency to get the shared analytics service."""
+    return services.analytics_service
 
 
 async def get_current_user(
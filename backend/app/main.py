@@ -1,12 +1,17 @@
 """
 Main FastAPI application for AI Powered PLC at Work Virtual Coach.
 """
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import get_settings
 from app.routes import auth_router, chat_router, sessions_router, feedback_router
 from app.routes.chat_stream import router as chat_stream_router
+from app.routes.chat_ws import router as chat_ws_router
 from app.routes.analytics import router as analytics_router
+from app.services.container import ServiceContainer
+from app.dependencies import get_current_user
+from app.models.schemas import UserInfo
 from app.utils.logging import setup_logging
 import logging
 
@@ -17,13 +22,31 @@ logger = logging.getLogger(__name__)
 # Get settings
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the shared service container on startup and tear it down on shutdown."""
+    logger.info(f"Starting {settings.app_name} v{settings.app_version}")
+    logger.info(f"Debug mode: {settings.debug}")
+
+    services = ServiceContainer(settings)
+    await services.startup()
+    app.state.services = services
+
+    yield
+
+    logger.info(f"Shutting down {settings.app_name}")
+    await services.shutdown()
+
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
     description="AI-powered coaching assistants for Professional Learning Communities",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -39,6 +62,7 @@ app.add_middleware(
 app.include_router(auth_router)
 app.include_router(chat_router)
 app.include_router(chat_stream_router)
+app.include_router(chat_ws_router)
 app.include_router(sessions_router)
 app.include_router(feedback_router)
 app.include_router(analytics_router)
@@ -64,17 +88,15 @@ async def health_check():
     }
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Run on application startup."""
-    logger.info(f"Starting {settings.app_name} v{settings.app_version}")
-    logger.info(f"Debug mode: {settings.debug}")
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Run on application shutdown."""
-    logger.info(f"Shutting down {settings.app_name}")
+@app.get("/metrics")
+async def metrics(request: Request, current_user: UserInfo = Depends(get_current_user)):
+    """Cache hit rates and runtime counters of the shared services (operators only)."""
+    if current_user.user_id not in settings.metrics_user_ids:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to read metrics"
+        )
+    return request.app.state.services.stats()
 
 
 if __name__ == "__main__":
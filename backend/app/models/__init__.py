@@ -7,6 +7,8 @@ from .schemas import (
     Citation,
     SessionCreate,
     SessionResponse,
+    SessionSummary,
+    MessagePage,
     FeedbackRequest,
     FeedbackResponse,
     AgentInfo,
@@ -19,6 +21,8 @@ __all__ = [
     "Citation",
     "SessionCreate",
     "SessionResponse",
+    "SessionSummary",
+    "MessagePage",
     "FeedbackRequest",
     "FeedbackResponse",
     "AgentInfo",
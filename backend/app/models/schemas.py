@@ -23,6 +23,7 @@ class ChatRequest(BaseModel):
 class Citation(BaseModel):
     """Citation information for retrieved documents."""
     id: str = Field(..., description="Unique citation identifier")
+    vector_id: Optional[str] = Field(None, description="ID of the retrieved chunk's vector")
     source_title: str = Field(..., description="Title of source document")
     page_number: Optional[int] = Field(None, description="Page number if available")
     chunk_text: str = Field(..., description="Relevant text excerpt")
@@ -45,6 +46,7 @@ class Message(BaseModel):
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     citations: Optional[List[Citation]] = None
     message_id: Optional[str] = None
+    truncated: bool = False  # Generation stopped early (client disconnected)
 
 
 class SessionCreate(BaseModel):
@@ -64,6 +66,25 @@ class SessionResponse(BaseModel):
     last_accessed: datetime = Field(..., description="Last access timestamp")
 
 
+class MessagePage(BaseModel):
+    """One page of a session's messages, oldest first within the page."""
+    messages: List[Message] = Field(default_factory=list, description="Messages in this page")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next (older) page")
+    has_more: bool = Field(default=False, description="Whether older messages exist")
+
+
+class SessionSummary(BaseModel):
+    """Lightweight session listing entry (no messages)."""
+    session_id: str = Field(..., description="Unique session identifier")
+    agent_id: AgentType = Field(..., description="Current agent for session")
+    title: Optional[str] = Field(None, description="Session title")
+    created_at: datetime = Field(..., description="Session creation timestamp")
+    last_accessed: datetime = Field(..., description="Last access timestamp")
+    message_count: int = Field(default=0, description="Number of messages in the session")
+    last_message_preview: Optional[str] = Field(None, description="Start of the latest message")
+    archived: bool = Field(default=False, description="Moved to cold storage; restored when opened")
+
+
 class FeedbackRequest(BaseModel):
     """Request schema for submitting feedback."""
     message_id: str = Field(..., description="ID of message being rated")
@@ -91,3 +112,4 @@ class UserInfo(BaseModel):
     email: Optional[str] = Field(None, description="User email")
     name: Optional[str] = Field(None, description="User display name")
     verified: bool = Field(default=True, description="Token verification status")
+    expires_at: Optional[int] = Field(None, description="Token expiry (Unix time)")
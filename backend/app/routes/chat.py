@@ -3,13 +3,15 @@ Chat routes for AI coaching conversations.
 """
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from app.models.schemas import ChatRequest, ChatResponse, UserInfo, AgentInfo, AgentType, Message
-from app.services.openai_service import OpenAIService
-from app.services.pinecone_service import PineconeService
 from app.services.firebase_service import FirebaseService
 from app.services.agent_router import AgentRouter
-from app.dependencies import get_current_user, get_firebase_service
-from app.config import get_settings, Settings
-from app.utils.prompts import build_conversation_history
+from app.services.chat_pipeline import ChatPipeline, SessionNotFoundError
+from app.dependencies import (
+    get_current_user,
+    get_firebase_service,
+    get_agent_router,
+    get_chat_pipeline,
+)
 import logging
 import uuid
 from datetime import datetime
@@ -19,23 +21,14 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api", tags=["chat"])
 
 
-def get_agent_router(
-    settings: Settings = Depends(get_settings)
-) -> AgentRouter:
-    """Dependency to create AgentRouter instance."""
-    openai_service = OpenAIService(settings)
-    pinecone_service = PineconeService(settings)
-    return AgentRouter(settings, openai_service, pinecone_service)
-
-
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
     background_tasks: BackgroundTasks,
     current_user: UserInfo = Depends(get_current_user),
     agent_router: AgentRouter = Depends(get_agent_router),
-    firebase_service: FirebaseService = Depends(get_firebase_service),
-    settings: Settings = Depends(get_settings)
+    chat_pipeline: ChatPipeline = Depends(get_chat_pipeline),
+    firebase_service: FirebaseService = Depends(get_firebase_service)
 ):
     """
     Process chat request and return AI-generated response with citations.
@@ -44,8 +37,8 @@ async def chat(
         request: Chat request with query, agent_id, and optional session_id
         current_user: Authenticated user information
         agent_router: Agent routing service
+        chat_pipeline: Pipeline resolving session, history and context
         firebase_service: Firebase service for session management
-        settings: Application settings
 
     Returns:
         ChatResponse with AI response, citations, and session info
@@ -54,47 +47,35 @@ async def chat(
         HTTPException: 400 for invalid requests, 500 for server errors
     """
     try:
-        # Get or create session
-        if request.session_id:
-            session = await firebase_service.get_session(
-                current_user.user_id,
-                request.session_id
-            )
-            if not session:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Session {request.session_id} not found"
-                )
-            session_id = request.session_id
-        else:
-            # Create new session
-            session_id = await firebase_service.create_session(
-                user_id=current_user.user_id,
-                agent_id=request.agent_id.value,
-                title=f"Chat with {request.agent_id.value}"
-            )
-            session = await firebase_service.get_session(
-                current_user.user_id,
-                session_id
-            )
-
-        # Build conversation history for multi-turn support
-        conversation_history = build_conversation_history(
-            session.messages,
-            max_history=settings.max_conversation_history
-        )
-
         logger.info(
             f"Processing chat request for user {current_user.user_id}, "
-            f"agent {request.agent_id.value}, session {session_id}"
+            f"agent {request.agent_id.value}, session {request.session_id or 'new'}"
         )
 
-        # Generate response using agent router
-        response_text, citations = await agent_router.generate_response(
+        # Session load runs concurrently with embedding + retrieval
+        turn = await chat_pipeline.prepare(
+            user_id=current_user.user_id,
             query=request.query,
             agent_id=request.agent_id,
-            conversation_history=conversation_history
+            session_id=request.session_id
         )
+        session_id = turn.session_id
+
+        if turn.cached_response is not None:
+            # Near-duplicate of an earlier standalone question
+            response_text, citations = turn.cached_response, turn.citations
+        else:
+            # Generate response using agent router
+            response_text, citations = await agent_router.generate_response(
+                query=request.query,
+                agent_id=request.agent_id,
+                conversation_history=turn.conversation_history,
+                citations=turn.citations
+            )
+            if not turn.conversation_history:
+                agent_router.store_cached_response(
+                    request.agent_id, turn.query_embedding, response_text, citations
+                )
 
         # Create message ID
         message_id = str(uuid.uuid4())
@@ -117,11 +98,6 @@ async def chat(
                     timestamp=datetime.utcnow(),
                     message_id=str(uuid.uuid4())
                 )
-                await firebase_service.add_message_to_session(
-                    current_user.user_id,
-                    session_id,
-                    user_message
-                )
 
                 assistant_message = Message(
                     role="assistant",
@@ -130,10 +106,11 @@ async def chat(
                     message_id=message_id,
                     citations=citations
                 )
-                await firebase_service.add_message_to_session(
+                # One multi-path write for the whole turn
+                await firebase_service.add_messages_to_session(
                     current_user.user_id,
                     session_id,
-                    assistant_message
+                    [user_message, assistant_message]
                 )
                 logger.info(f"Messages saved to session {session_id}")
             except Exception as e:
@@ -144,6 +121,11 @@ async def chat(
         logger.info(f"Chat response generated successfully for session {session_id}")
         return chat_response
 
+    except SessionNotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -1,18 +1,24 @@
 """
 Streaming chat route for real-time AI responses.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from fastapi.responses import StreamingResponse
 from app.models.schemas import ChatRequest, UserInfo, Message
-from app.services.openai_service import OpenAIService
-from app.services.pinecone_service import PineconeService
 from app.services.firebase_service import FirebaseService
 from app.services.agent_router import AgentRouter
-from app.dependencies import get_current_user, get_firebase_service
-from app.config import get_settings, Settings
-from app.utils.prompts import build_conversation_history
+from app.services.chat_pipeline import ChatPipeline, PreparedTurn, SessionNotFoundError
+from app.services.stream_registry import StreamBuffer, StreamRegistry
+from app.dependencies import (
+    get_current_user,
+    get_firebase_service,
+    get_agent_router,
+    get_chat_pipeline,
+    get_stream_registry,
+)
+from app.utils.sse import SSEStreamWriter, sse_frame
+from typing import AsyncIterator, Optional
+import asyncio
 import logging
-import json
 import uuid
 from datetime import datetime
 
@@ -20,145 +26,295 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["chat"])
 
+# Characters per content event when replaying a cached answer
+CACHED_REPLAY_CHUNK_SIZE = 64
 
-def get_agent_router(
-    settings: Settings = Depends(get_settings)
-) -> AgentRouter:
-    """Dependency to create AgentRouter instance."""
-    openai_service = OpenAIService(settings)
-    pinecone_service = PineconeService(settings)
-    return AgentRouter(settings, openai_service, pinecone_service)
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+
+def follow_stream(
+    buffer: StreamBuffer,
+    http_request: Request,
+    after_seq: int = 0
+) -> StreamingResponse:
+    """
+    Respond with the frames of a buffered stream after `after_seq`.
+
+    Args:
+        buffer: Stream to follow
+        http_request: Raw request, polled for disconnects
+        after_seq: Last sequence number the client received
+
+    Returns:
+        SSE response replaying missed frames, then following the live stream
+    """
+    async def frames() -> AsyncIterator[bytes]:
+        try:
+            async for frame in buffer.subscribe(after_seq, http_request.is_disconnected):
+                yield frame
+        except LookupError as e:
+            yield sse_frame({'type': 'error', 'code': 'resume_unavailable', 'error': str(e)})
+
+    return StreamingResponse(frames(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+def resume_unavailable(last_event_id: str) -> StreamingResponse:
+    """Respond with a single error event for a stream that cannot be resumed."""
+    async def frames() -> AsyncIterator[bytes]:
+        yield sse_frame({
+            'type': 'error',
+            'code': 'resume_unavailable',
+            'error': f"Stream for event {last_event_id} is no longer available"
+        })
+
+    return StreamingResponse(frames(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+def start_answer_stream(
+    request: ChatRequest,
+    user_id: str,
+    agent_router: AgentRouter,
+    chat_pipeline: ChatPipeline,
+    firebase_service: FirebaseService,
+    stream_registry: StreamRegistry
+) -> StreamBuffer:
+    """
+    Start generating an answer into a new buffered stream.
+
+    Shared by the SSE and WebSocket transports. Events are status, citations,
+    content, done, or an error with a `code`. Once no subscriber has been
+    attached for the registry's grace period, generation stops, the stream
+    ends with `done` (`truncated: true`) and the partial answer is saved
+    with `truncated` set.
+
+    Args:
+        request: Chat request
+        user_id: Authenticated user ID
+        agent_router: Agent routing service
+        chat_pipeline: Turn preparation pipeline
+        firebase_service: Firebase service used to save the turn
+        stream_registry: Registry that buffers the stream
+
+    Returns:
+        StreamBuffer of the answer (its message_id identifies the answer)
+    """
+    message_id = str(uuid.uuid4())
+    settings = chat_pipeline.settings
+    writer = SSEStreamWriter(
+        flush_interval=settings.sse_flush_interval_ms / 1000,
+        flush_chars=settings.sse_flush_chars
+    )
+
+    async def save_turn(turn: PreparedTurn, truncated: bool = False) -> None:
+        """Persist the user message and the (possibly partial) answer."""
+        try:
+            messages = [Message(
+                role="user",
+                content=request.query,
+                timestamp=datetime.utcnow(),
+                message_id=str(uuid.uuid4())
+            )]
+            if writer.text or not truncated:
+                messages.append(Message(
+                    role="assistant",
+                    content=writer.text,
+                    timestamp=datetime.utcnow(),
+                    message_id=message_id,
+                    citations=turn.citations,
+                    truncated=truncated
+                ))
+            # One multi-path write for the whole turn
+            await firebase_service.add_messages_to_session(user_id, turn.session_id, messages)
+            logger.info(f"Messages saved to session {turn.session_id}")
+        except Exception as e:
+            logger.error(f"Failed to save messages: {e}")
+
+    async def produce(buffer: StreamBuffer) -> None:
+        """Generate the answer into the stream buffer."""
+        turn = None
+        deltas = None
+        try:
+            buffer.append(writer.event({'type': 'status', 'status': 'retrieving', 'message_id': message_id}))
+
+            # Session load runs concurrently with embedding + retrieval
+            turn = await chat_pipeline.prepare(
+                user_id=user_id,
+                query=request.query,
+                agent_id=request.agent_id,
+                session_id=request.session_id
+            )
+
+            buffer.append(writer.event({
+                'type': 'citations',
+                'citations': [c.model_dump() for c in turn.citations],
+                'session_id': turn.session_id,
+                'message_id': message_id
+            }))
+
+            if turn.cached_response is not None:
+                # Replay the cached answer as content chunks
+                for i in range(0, len(turn.cached_response), CACHED_REPLAY_CHUNK_SIZE):
+                    frame = writer.content(turn.cached_response[i:i + CACHED_REPLAY_CHUNK_SIZE])
+                    if frame:
+                        buffer.append(frame)
+            else:
+                # Stream response chunks, coalesced into fewer frames
+                deltas = agent_router.openai_service.generate_response_with_streaming(
+                    system_prompt=agent_router.get_system_prompt(request.agent_id),
+                    user_query=request.query,
+                    citations=turn.citations,
+                    conversation_history=turn.conversation_history
+                )
+                async for frame in writer.stream(deltas):
+                    buffer.append(frame)
+                deltas = None  # Generated in full
+
+            frame = writer.flush()
+            if frame:
+                buffer.append(frame)
+            if turn.cached_response is None and not turn.conversation_history:
+                agent_router.store_cached_response(
+                    request.agent_id, turn.query_embedding, writer.text, turn.citations
+                )
+
+            # Send done event; subscribers end here, the save follows
+            buffer.append(writer.event({'type': 'done'}))
+            buffer.finish()
+            chat_pipeline.stream_stats.record_completed()
+            logger.info(f"Streamed message {message_id}: {writer.stats()}")
+
+        except SessionNotFoundError as e:
+            buffer.append(writer.event({'type': 'error', 'code': 'session_not_found', 'error': str(e)}))
+            return
+        except asyncio.CancelledError:
+            # No client came back within the grace period, the client
+            # cancelled, or shutdown. End the stream explicitly, so resuming
+            # clients can tell a truncated answer from a dropped connection.
+            frame = writer.flush()
+            if frame:
+                buffer.append(frame)
+            buffer.append(writer.event({'type': 'done', 'truncated': True}))
+            buffer.finish()
+            # Closing the model stream stops generation upstream.
+            upstream_open = deltas is not None
+            if upstream_open:
+                await deltas.aclose()
+            if turn is not None:
+                await save_turn(turn, truncated=True)
+            reason = buffer.cancel_reason or "shutdown"
+            chat_pipeline.stream_stats.record_cancelled(
+                reason, writer.deltas, settings.openai_max_tokens if upstream_open else None
+            )
+            logger.info(f"Stopped message {message_id} ({reason}): {writer.stats()}")
+            raise
+        except Exception as e:
+            logger.error(f"Streaming error: {e}", exc_info=True)
+            frame = writer.flush()
+            if frame:
+                buffer.append(frame)
+            buffer.append(writer.event({'type': 'error', 'code': 'internal', 'error': str(e)}))
+            return
+
+        # The stream has finished; a late cancel must not drop the completed turn
+        await asyncio.shield(save_turn(turn))
+
+    return stream_registry.start(message_id, user_id, produce)
 
 
 @router.post("/chat/stream")
 async def chat_stream(
-    request: ChatRequest,
+    http_request: Request,
+    request: Optional[ChatRequest] = None,
     current_user: UserInfo = Depends(get_current_user),
     agent_router: AgentRouter = Depends(get_agent_router),
+    chat_pipeline: ChatPipeline = Depends(get_chat_pipeline),
     firebase_service: FirebaseService = Depends(get_firebase_service),
-    settings: Settings = Depends(get_settings)
+    stream_registry: StreamRegistry = Depends(get_stream_registry),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID")
 ):
     """
     Stream chat response in real-time for faster perceived performance.
 
-    Returns Server-Sent Events (SSE) stream with:
-    - citations (first event)
+    The response starts immediately; session resolution, embedding and
+    retrieval run inside the stream. Returns Server-Sent Events (SSE) with:
+    - status (first event, sent before any work)
+    - citations (as soon as retrieval completes; carries the session ID)
     - content chunks (streaming)
     - done event (last)
-    """
-    try:
-        # Get or create session
-        if request.session_id:
-            session = await firebase_service.get_session(
-                current_user.user_id,
-                request.session_id
-            )
-            if not session:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Session {request.session_id} not found"
-                )
-            session_id = request.session_id
-        else:
-            session_id = await firebase_service.create_session(
-                user_id=current_user.user_id,
-                agent_id=request.agent_id.value,
-                title=f"Chat with {request.agent_id.value}"
-            )
-            session = await firebase_service.get_session(
-                current_user.user_id,
-                session_id
-            )
+    Failures in any stage, including an unknown session, are sent as an
+    `error` event (with a `code`) instead of an HTTP error status.
 
-        # Build conversation history
-        conversation_history = build_conversation_history(
-            session.messages,
-            max_history=settings.max_conversation_history
-        )
+    Model deltas are coalesced into content frames of at least
+    `sse_flush_chars` characters, or whatever is pending once
+    `sse_flush_interval_ms` has passed since the last frame (on a timer, so
+    a pause in generation does not hold back text already received).
 
-        logger.info(
-            f"Streaming chat for user {current_user.user_id}, "
-            f"agent {request.agent_id.value}, session {session_id}"
-        )
+    Every event has an ID of the form `{message_id}:{seq}`. The answer is
+    generated by a task detached from this response and buffered, so a client
+    that lost the connection can repeat the request (or call
+    `GET /api/chat/stream/{message_id}`) with a `Last-Event-ID` header to
+    receive only the missed events and then the rest of the live answer;
+    nothing is regenerated. The request body is optional (and ignored) on
+    resume; it is required otherwise. A stream that is no longer buffered
+    yields a `resume_unavailable` error event.
 
-        # Retrieve context (citations) first
-        citations = await agent_router.retrieve_context(
-            request.query,
-            request.agent_id
+    If no client is attached for `stream_resume_grace_seconds` (at once when
+    `stream_resume_enabled` is off), the upstream model stream is closed so
+    no further tokens are generated, the stream ends with a `done` event
+    with `truncated: true`, and the partial answer is saved with `truncated`
+    set.
+    """
+    resume = StreamRegistry.parse_event_id(last_event_id)
+    if last_event_id:
+        buffer = stream_registry.get(resume[0], current_user.user_id) if resume else None
+        if buffer is None:
+            return resume_unavailable(last_event_id)
+        logger.info(f"Resuming message {buffer.message_id} after event {resume[1]}")
+        return follow_stream(buffer, http_request, resume[1])
+    if request is None:
+        raise HTTPException(
+            status_code=422,  # Named HTTP_422_UNPROCESSABLE_CONTENT in newer Starlette only
+            detail="Request body is required unless resuming with Last-Event-ID"
         )
 
-        message_id = str(uuid.uuid4())
+    logger.info(
+        f"Streaming chat for user {current_user.user_id}, "
+        f"agent {request.agent_id.value}, session {request.session_id or 'new'}"
+    )
+    buffer = start_answer_stream(
+        request, current_user.user_id, agent_router, chat_pipeline, firebase_service, stream_registry
+    )
+    return follow_stream(buffer, http_request)
 
-        async def generate():
-            """Generate SSE stream."""
-            try:
-                # Send citations first
-                yield f"data: {json.dumps({'type': 'citations', 'citations': [c.model_dump() for c in citations], 'session_id': session_id, 'message_id': message_id})}\n\n"
 
-                # Stream response chunks
-                system_prompt = agent_router.get_system_prompt(request.agent_id)
-                full_response = ""
+@router.get("/chat/stream/{message_id}")
+async def resume_chat_stream(
+    message_id: str,
+    http_request: Request,
+    current_user: UserInfo = Depends(get_current_user),
+    stream_registry: StreamRegistry = Depends(get_stream_registry),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Reattach to a buffered answer stream.
 
-                async for chunk in agent_router.openai_service.generate_response_with_streaming(
-                    system_prompt=system_prompt,
-                    user_query=request.query,
-                    citations=citations,
-                    conversation_history=conversation_history
-                ):
-                    full_response += chunk
-                    yield f"data: {json.dumps({'type': 'content', 'content': chunk})}\n\n"
-
-                # Send done event
-                yield f"data: {json.dumps({'type': 'done'})}\n\n"
-
-                # Save messages to Firebase in background
-                try:
-                    user_message = Message(
-                        role="user",
-                        content=request.query,
-                        timestamp=datetime.utcnow(),
-                        message_id=str(uuid.uuid4())
-                    )
-                    await firebase_service.add_message_to_session(
-                        current_user.user_id,
-                        session_id,
-                        user_message
-                    )
-
-                    assistant_message = Message(
-                        role="assistant",
-                        content=full_response,
-                        timestamp=datetime.utcnow(),
-                        message_id=message_id,
-                        citations=citations
-                    )
-                    await firebase_service.add_message_to_session(
-                        current_user.user_id,
-                        session_id,
-                        assistant_message
-                    )
-                    logger.info(f"Messages saved to session {session_id}")
-                except Exception as e:
-                    logger.error(f"Failed to save messages: {e}")
-
-            except Exception as e:
-                logger.error(f"Streaming error: {e}")
-                yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
-
-        return StreamingResponse(
-            generate(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-            }
-        )
+    Replays the events after `Last-Event-ID` (all of them without the header)
+    and then follows the live answer, without regenerating anything.
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Chat stream failed: {str(e)}", exc_info=True)
+    Raises:
+        HTTPException: 404 if the stream is unknown, expired or not the user's
+    """
+    buffer = stream_registry.get(message_id, current_user.user_id)
+    if buffer is None:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to process chat request: {str(e)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Stream not found or no longer available"
         )
+    resume = StreamRegistry.parse_event_id(last_event_id)
+    after_seq = resume[1] if resume and resume[0] == message_id else 0
+    logger.info(f"Resuming message {message_id} after event {after_seq}")
+    return follow_stream(buffer, http_request, after_seq)
@@ -0,0 +1,298 @@
+"""
+WebSocket chat transport.
+
+One connection carries a whole coaching conversation: the ID token is
+verified once per connection instead of once per turn, and concurrent turns
+are multiplexed by message ID. Conversation history comes from the worker's
+session cache, which is checked against the session's message count, so
+turns saved by other tabs or connections are never missed.
+
+Protocol (JSON text messages):
+- client `{"type": "auth", "token"}` first (again to refresh the token);
+  server `{"type": "ready", "user_id", "expires_at"}`
+- client `{"type": "chat", "query", "agent_id", "session_id"?, "request_id"?}`;
+  server `{"type": "event", "message_id", "request_id", "event_id", "event"}`
+  for each of the SSE route's events (status, citations, content, done, error)
+- client `{"type": "cancel", "message_id"}` stops generation; the answer
+  ends with a `done` event with `truncated: true` and is saved as truncated
+  (ignored once the answer is complete)
+- client `{"type": "resume", "message_id", "last_event_id"?}` reattaches to a
+  buffered answer, e.g. after reconnecting (replacing this connection's
+  forwarding of that answer, if any)
+- server `{"type": "error", "code", "error"}` for protocol errors
+"""
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
+from app.models.schemas import ChatRequest, UserInfo
+from app.services.firebase_service import FirebaseService
+from app.services.agent_router import AgentRouter
+from app.services.chat_pipeline import ChatPipeline
+from app.services.stream_registry import StreamBuffer, StreamRegistry
+from app.dependencies import (
+    get_firebase_service,
+    get_agent_router,
+    get_chat_pipeline,
+    get_stream_registry,
+)
+from app.routes.chat_stream import start_answer_stream
+from app.utils.sse import dumps
+from contextlib import aclosing
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["chat"])
+
+
+class InvalidMessage(ValueError):
+    """A client message that is not a JSON object in a text frame."""
+
+
+async def receive_message(websocket: WebSocket) -> Dict[str, Any]:
+    """
+    Receive one client message.
+
+    Returns:
+        The decoded JSON object
+
+    Raises:
+        WebSocketDisconnect: If the client closed the connection
+        InvalidMessage: For binary frames and text that is not a JSON object
+    """
+    message = await websocket.receive()
+    if message['type'] == 'websocket.disconnect':
+        raise WebSocketDisconnect(message.get('code', status.WS_1000_NORMAL_CLOSURE), message.get('reason'))
+    if message.get('text') is None:
+        raise InvalidMessage("Messages must be text frames")
+    try:
+        data = json.loads(message['text'])
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        raise InvalidMessage("Messages must be JSON objects")
+    return data
+
+
+class ChatConnection:
+    """State of one authenticated WebSocket chat connection."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user: UserInfo,
+        agent_router: AgentRouter,
+        chat_pipeline: ChatPipeline,
+        firebase_service: FirebaseService,
+        stream_registry: StreamRegistry
+    ):
+        """
+        Initialize connection state.
+
+        Args:
+            websocket: Accepted WebSocket
+            user: Authenticated user
+            agent_router: Agent routing service
+            chat_pipeline: Turn preparation pipeline
+            firebase_service: Firebase service used to save turns
+            stream_registry: Registry that buffers the answers
+        """
+        self.websocket = websocket
+        self.user = user
+        self.agent_router = agent_router
+        self.chat_pipeline = chat_pipeline
+        self.firebase_service = firebase_service
+        self.stream_registry = stream_registry
+        self.settings = chat_pipeline.settings
+        # In-flight turns by message ID (buffer, task forwarding its events)
+        self.turns: Dict[str, Tuple[StreamBuffer, asyncio.Task]] = {}
+        # Last event sequence number sent for each in-flight turn
+        self.sent: Dict[str, int] = {}
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, payload: bytes) -> None:
+        """Send one JSON message; turns share the socket, so sends are serialized."""
+        async with self._send_lock:
+            await self.websocket.send_text(payload.decode('utf-8'))
+
+    async def send_error(self, code: str, error: str) -> None:
+        await self.send(dumps({'type': 'error', 'code': code, 'error': error}))
+
+    async def authenticate(self, message: Dict[str, Any]) -> None:
+        """
+        Re-verify the connection's token (e.g. before the current one expires).
+
+        Raises:
+            PermissionError: If the token is invalid or belongs to another user
+        """
+        user = await self.firebase_service.verify_token(str(message.get('token') or ''))
+        if user.user_id != self.user.user_id:
+            raise PermissionError("Token belongs to a different user")
+        self.user = user
+        await self.send(dumps({'type': 'ready', 'user_id': user.user_id, 'expires_at': user.expires_at}))
+
+    async def chat(self, message: Dict[str, Any]) -> None:
+        """Start a turn and forward its events."""
+        if self.user.expires_at is not None and time.time() >= self.user.expires_at:
+            await self.send_error('auth_expired', "Token expired; send a new auth message")
+            return
+        if len(self.turns) >= self.settings.ws_max_inflight_turns:
+            await self.send_error('too_many_turns', "Too many answers in progress on this connection")
+            return
+        try:
+            request = ChatRequest(**{k: v for k, v in message.items() if k not in ('type', 'request_id')})
+        except ValidationError as e:
+            await self.send_error('invalid_request', str(e))
+            return
+
+        buffer = start_answer_stream(
+            request,
+            self.user.user_id,
+            self.agent_router,
+            self.chat_pipeline,
+            self.firebase_service,
+            self.stream_registry
+        )
+        await self._follow(buffer, message.get('request_id'))
+
+    async def resume(self, message: Dict[str, Any]) -> None:
+        """Reattach to a buffered answer after the last event received."""
+        message_id = str(message.get('message_id') or '')
+        buffer = self.stream_registry.get(message_id, self.user.user_id)
+        if buffer is None:
+            await self.send_error('resume_unavailable', f"Stream {message_id} is no longer available")
+            return
+        resume = StreamRegistry.parse_event_id(str(message.get('last_event_id') or ''))
+        after_seq = resume[1] if resume and resume[0] == message_id else 0
+        await self._follow(buffer, message.get('request_id'), after_seq)
+
+    async def cancel(self, message: Dict[str, Any]) -> None:
+        """Stop generating an answer of this connection (no grace period)."""
+        turn = self.turns.get(str(message.get('message_id') or ''))
+        if turn is None or turn[0].finished or turn[0].task is None:
+            # Already complete: its done event is on the way and it is being saved
+            return
+        # The stream ends with done (truncated) and the partial answer is saved
+        turn[0].cancel("client")
+
+    async def _follow(self, buffer: StreamBuffer, request_id: Optional[str], after_seq: int = 0) -> None:
+        """
+        Forward a buffered answer's events in a task of this connection.
+
+        A repeated resume of an answer this connection is already forwarding
+        replaces the forwarder: the old one is stopped first, and the new one
+        starts after the last event already sent, so nothing is delivered twice.
+        """
+        previous = self.turns.pop(buffer.message_id, None)
+        if previous is not None:
+            # Hold a subscription across the swap so the grace period never starts
+            buffer.attach()
+            previous[1].cancel()
+            await asyncio.gather(previous[1], return_exceptions=True)
+            after_seq = max(after_seq, self.sent.get(buffer.message_id, 0))
+        task = asyncio.create_task(self._forward(buffer, request_id, after_seq))
+        self.turns[buffer.message_id] = (buffer, task)
+        if previous is not None:
+            task.add_done_callback(lambda _: buffer.detach())
+
+    async def _forward(self, buffer: StreamBuffer, request_id: Optional[str], after_seq: int) -> None:
+        # Frames are pre-serialized for SSE; splice their JSON into the envelope
+        prefix = (
+            b'{"type":"event","message_id":' + dumps(buffer.message_id)
+            + b',"request_id":' + dumps(request_id) + b',"event_id":'
+        )
+        try:
+            async with aclosing(buffer.subscribe(after_seq)) as frames:
+                async for frame in frames:
+                    id_line, _, data = frame.partition(b"\ndata: ")
+                    event_id = id_line[len(b"id: "):].decode()
+                    await self.send(prefix + dumps(event_id) + b',"event":' + data.rstrip(b"\n") + b'}')
+                    self.sent[buffer.message_id] = StreamRegistry.parse_event_id(event_id)[1]
+        except LookupError as e:
+            await self.send_error('resume_unavailable', str(e))
+        finally:
+            if self.turns.get(buffer.message_id, (None, None))[1] is asyncio.current_task():
+                del self.turns[buffer.message_id]
+                self.sent.pop(buffer.message_id, None)
+
+    async def close(self) -> None:
+        """Detach from in-flight answers; they stop after the grace period."""
+        tasks = [task for _, task in self.turns.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@router.websocket("/ws/chat")
+async def chat_websocket(
+    websocket: WebSocket,
+    agent_router: AgentRouter = Depends(get_agent_router),
+    chat_pipeline: ChatPipeline = Depends(get_chat_pipeline),
+    firebase_service: FirebaseService = Depends(get_firebase_service),
+    stream_registry: StreamRegistry = Depends(get_stream_registry)
+):
+    """
+    Multi-turn chat over one WebSocket (see the module docstring for the protocol).
+
+    Answers are generated exactly as for `POST /api/chat/stream`, into the
+    same resumable stream buffers.
+    """
+    await websocket.accept()
+    settings = chat_pipeline.settings
+
+    # Authenticate once for the whole connection
+    try:
+        message = await asyncio.wait_for(
+            receive_message(websocket), timeout=settings.ws_auth_timeout_seconds
+        )
+        if message.get('type') != 'auth':
+            raise PermissionError("First message must be an auth message")
+        user = await firebase_service.verify_token(str(message.get('token') or ''))
+    except WebSocketDisconnect:
+        return
+    except Exception as e:
+        logger.error(f"WebSocket authentication failed: {str(e)}")
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Authentication failed")
+        return
+
+    connection = ChatConnection(
+        websocket, user, agent_router, chat_pipeline, firebase_service, stream_registry
+    )
+    await connection.send(dumps({'type': 'ready', 'user_id': user.user_id, 'expires_at': user.expires_at}))
+    logger.info(f"WebSocket chat connected for user {user.user_id}")
+
+    handlers = {
+        'chat': connection.chat,
+        'cancel': connection.cancel,
+        'resume': connection.resume,
+        'auth': connection.authenticate,
+    }
+    try:
+        while True:
+            try:
+                message = await receive_message(websocket)
+            except InvalidMessage as e:
+                await connection.send_error('invalid_request', str(e))
+                continue
+            message_type = message.get('type')
+            handler = handlers.get(message_type) if isinstance(message_type, str) else None
+            if handler is None:
+                await connection.send_error('invalid_request', f"Unknown message type: {message_type!r}")
+                continue
+            try:
+                await handler(message)
+            except PermissionError as e:
+                await connection.send_error('auth_failed', str(e))
+            except Exception as e:
+                if handler is connection.authenticate:
+                    logger.error(f"WebSocket re-authentication failed: {str(e)}")
+                    await connection.send_error('auth_failed', "Invalid authentication credentials")
+                else:
+                    raise
+    except WebSocketDisconnect:
+        logger.info(f"WebSocket chat disconnected for user {user.user_id}")
+    finally:
+        await connection.close()
@@ -1,9 +1,9 @@
 """
 Session management routes for conversation history.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
-from app.models.schemas import SessionCreate, SessionResponse, UserInfo
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Optional
+from app.models.schemas import SessionCreate, SessionResponse, SessionSummary, MessagePage, UserInfo
 from app.services.firebase_service import FirebaseService
 from app.dependencies import get_current_user, get_firebase_service
 import logging
@@ -56,14 +56,16 @@ async def create_session(
         )
 
 
-@router.get("", response_model=List[SessionResponse])
+@router.get("", response_model=List[SessionSummary])
 async def get_sessions(
     current_user: UserInfo = Depends(get_current_user),
     firebase_service: FirebaseService = Depends(get_firebase_service),
-    limit: int = 50
+    limit: int = Query(50, ge=1, le=500)
 ):
     """
-    Get all sessions for the authenticated user.
+    Get the most recent sessions of the authenticated user.
+
+    Returns summaries only; load a session's messages with GET /{session_id}.
 
     Args:
         current_user: Authenticated user information
@@ -71,7 +73,7 @@ async def get_sessions(
         limit: Maximum number of sessions to return
 
     Returns:
-        List of SessionResponse objects
+        List of SessionSummary objects, most recent first
 
     Raises:
         HTTPException: 500 if retrieval fails
@@ -138,6 +140,58 @@ async def get_session(
         )
 
 
+@router.get("/{session_id}/messages", response_model=MessagePage)
+async def get_session_messages(
+    session_id: str,
+    current_user: UserInfo = Depends(get_current_user),
+    firebase_service: FirebaseService = Depends(get_firebase_service),
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[str] = None
+):
+    """
+    Get a page of a session's messages, starting from the newest.
+
+    Pass the returned next_cursor as `before` to load older messages.
+
+    Args:
+        session_id: Session ID
+        current_user: Authenticated user information
+        firebase_service: Firebase service
+        limit: Page size
+        before: Cursor returned by the previous page
+
+    Returns:
+        MessagePage with messages in chronological order
+
+    Raises:
+        HTTPException: 404 if session not found, 500 for other errors
+    """
+    try:
+        page = await firebase_service.get_session_messages(
+            current_user.user_id,
+            session_id,
+            limit=limit,
+            before=before
+        )
+
+        if page is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Session {session_id} not found"
+            )
+
+        return page
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get session messages: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve messages"
+        )
+
+
 @router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_session(
     session_id: str,
@@ -156,23 +210,18 @@ async def delete_session(
         HTTPException: 404 if session not found, 500 for other errors
     """
     try:
-        # Verify session exists and belongs to user
-        session = await firebase_service.get_session(
+        # Archived sessions are deleted from their index stub, without rehydrating
+        deleted = await firebase_service.delete_session(
             current_user.user_id,
             session_id
         )
 
-        if not session:
+        if not deleted:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Session {session_id} not found"
             )
 
-        await firebase_service.delete_session(
-            current_user.user_id,
-            session_id
-        )
-
         logger.info(f"Deleted session {session_id} for user {current_user.user_id}")
 
     except HTTPException:
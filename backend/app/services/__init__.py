@@ -2,13 +2,23 @@
 Service layer for external integrations and business logic.
 """
 from .pinecone_service import PineconeService
+from .local_vector_service import LocalVectorService
 from .openai_service import OpenAIService
 from .firebase_service import FirebaseService
 from .agent_router import AgentRouter
+from .chat_pipeline import ChatPipeline, PreparedTurn, SessionNotFoundError
+from .analytics_service import AnalyticsService
+from .container import ServiceContainer
 
 __all__ = [
     "PineconeService",
+    "LocalVectorService",
     "OpenAIService",
     "FirebaseService",
     "AgentRouter",
+    "ChatPipeline",
+    "PreparedTurn",
+    "SessionNotFoundError",
+    "AnalyticsService",
+    "ServiceContainer",
 ]
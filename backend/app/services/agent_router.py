@@ -1,11 +1,13 @@
 """
 Agent routing service for managing different AI coaching agents.
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Union
 from app.config import Settings
 from app.models.schemas import AgentType, Citation
 from app.services.openai_service import OpenAIService
 from app.services.pinecone_service import PineconeService
+from app.services.local_vector_service import LocalVectorService
+from app.services.response_cache import SemanticResponseCache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,7 +20,8 @@ class AgentRouter:
         self,
         settings: Settings,
         openai_service: OpenAIService,
-        pinecone_service: PineconeService
+        retrieval_service: Union[PineconeService, LocalVectorService],
+        corpus_version: Optional[str] = None
     ):
         """
         Initialize agent router.
@@ -26,12 +29,20 @@ class AgentRouter:
         Args:
             settings: Application settings
             openai_service: OpenAI service instance
-            pinecone_service: Pinecone service instance
+            retrieval_service: Vector retrieval backend (Pinecone or local)
+            corpus_version: Version of the loaded vector artifact's corpus
+                (defaults to settings.corpus_version when none is loaded)
         """
         self.settings = settings
         self.openai_service = openai_service
-        self.pinecone_service = pinecone_service
+        self.retrieval_service = retrieval_service
         self.agent_configs = settings.agent_configs
+        self.response_cache = SemanticResponseCache(
+            similarity_threshold=settings.response_cache_similarity_threshold,
+            max_entries_per_agent=settings.response_cache_max_entries_per_agent,
+            ttl_seconds=settings.response_cache_ttl_seconds,
+            corpus_version=corpus_version if corpus_version is not None else settings.corpus_version
+        )
 
     def get_agent_config(self, agent_id: AgentType) -> Dict[str, Any]:
         """
@@ -77,30 +88,90 @@ class AgentRouter:
         config = self.get_agent_config(agent_id)
         return config["metadata_filter"]
 
-    async def retrieve_context(
+    def response_cache_enabled(self, agent_id: AgentType) -> bool:
+        """
+        Check whether an agent's answers may be served from the semantic cache.
+
+        Args:
+            agent_id: Agent identifier
+
+        Returns:
+            True unless caching is disabled globally or for this agent
+        """
+        config = self.get_agent_config(agent_id)
+        return self.settings.response_cache_enabled and config.get("response_cache", True)
+
+    def lookup_cached_response(
         self,
-        query: str,
+        agent_id: AgentType,
+        query_embedding: List[float]
+    ) -> Optional[tuple[str, List[Citation]]]:
+        """
+        Look up a cached answer to a near-duplicate query for the same agent.
+
+        Args:
+            agent_id: Agent identifier
+            query_embedding: Embedding of the user's question
+
+        Returns:
+            Tuple of (response_text, citations), or None on a miss
+        """
+        if not self.response_cache_enabled(agent_id):
+            return None
+        return self.response_cache.lookup(agent_id.value, query_embedding)
+
+    def store_cached_response(
+        self,
+        agent_id: AgentType,
+        query_embedding: List[float],
+        response_text: str,
+        citations: List[Citation]
+    ) -> None:
+        """
+        Remember a freshly generated answer for future near-duplicate queries.
+
+        Args:
+            agent_id: Agent identifier
+            query_embedding: Embedding of the user's question
+            response_text: Generated response
+            citations: Citations used for the response
+        """
+        if self.response_cache_enabled(agent_id) and response_text:
+            self.response_cache.store(agent_id.value, query_embedding, response_text, citations)
+
+    async def embed_query(self, query: str) -> List[float]:
+        """
+        Generate the embedding vector used for retrieval.
+
+        Args:
+            query: User's question
+
+        Returns:
+            Query embedding vector
+        """
+        return await self.openai_service.get_embedding(query)
+
+    async def search_context(
+        self,
+        query_embedding: List[float],
         agent_id: AgentType
     ) -> List[Citation]:
         """
-        Retrieve relevant context for a query using agent-specific filtering.
+        Retrieve relevant context for an already-embedded query.
 
         Args:
-            query: User's question
+            query_embedding: Embedding vector of the user's question
             agent_id: Agent to use for retrieval
 
         Returns:
             List of Citation objects with retrieved documents
         """
         try:
-            # Generate query embedding
-            query_embedding = await self.openai_service.get_embedding(query)
-
             # Get agent-specific metadata filter
             metadata_filter = self.get_metadata_filter(agent_id)
 
-            # Query Pinecone with agent filter
-            citations = await self.pinecone_service.query_documents(
+            # Query the vector backend with agent filter
+            citations = await self.retrieval_service.query_documents(
                 query_embedding=query_embedding,
                 metadata_filter=metadata_filter
             )
@@ -114,11 +185,30 @@ class AgentRouter:
             logger.error(f"Context retrieval failed: {str(e)}")
             raise
 
+    async def retrieve_context(
+        self,
+        query: str,
+        agent_id: AgentType
+    ) -> List[Citation]:
+        """
+        Retrieve relevant context for a query using agent-specific filtering.
+
+        Args:
+            query: User's question
+            agent_id: Agent to use for retrieval
+
+        Returns:
+            List of Citation objects with retrieved documents
+        """
+        query_embedding = await self.embed_query(query)
+        return await self.search_context(query_embedding, agent_id)
+
     async def generate_response(
         self,
         query: str,
         agent_id: AgentType,
-        conversation_history: List[Dict[str, str]] = None
+        conversation_history: List[Dict[str, str]] = None,
+        citations: Optional[List[Citation]] = None
     ) -> tuple[str, List[Citation]]:
         """
         Generate agent response with RAG context.
@@ -127,13 +217,15 @@ class AgentRouter:
             query: User's question
             agent_id: Agent to use
             conversation_history: Previous messages for context
+            citations: Already-retrieved context (retrieved here if None)
 
         Returns:
             Tuple of (response_text, citations)
         """
         try:
-            # Retrieve context
-            citations = await self.retrieve_context(query, agent_id)
+            # Retrieve context unless the caller already did
+            if citations is None:
+                citations = await self.retrieve_context(query, agent_id)
 
             # Get agent system prompt
             system_prompt = self.get_system_prompt(agent_id)
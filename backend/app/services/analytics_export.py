@@ -0,0 +1,323 @@
+"""
+Streaming export of sessions, messages and feedback.
+
+Records are read from the Realtime Database in bounded, ordered pages and
+formatted incrementally, so an export of the full history runs in constant
+memory and the first bytes go out as soon as the first page arrives. Exports
+only read: sessions without a session index entry (created before the index
+existed) are counted and reported, not indexed; `python backfill_analytics.py`
+indexes them. Users are paged from the `analytics/users` rollup, which the
+backfill also rebuilds.
+"""
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from datetime import date
+import asyncio
+import csv
+import io
+import json
+import logging
+from app.services.firebase_service import FirebaseService
+
+logger = logging.getLogger(__name__)
+
+EXPORT_KINDS = ("sessions", "messages", "feedback", "all")
+EXPORT_FORMATS = ("ndjson", "csv")
+
+# Upper bound for ISO timestamps of a day in string-ordered range queries
+DAY_END = "\uf8ff"
+
+CSV_COLUMNS = {
+    "sessions": [
+        "session_id", "user_id", "agent_id", "title", "created_at", "last_accessed", "message_count", "archived"
+    ],
+    "messages": [
+        "session_id", "user_id", "agent_id", "message_key", "message_id", "role", "content", "timestamp"
+    ],
+    "feedback": [
+        "feedback_id", "user_id", "session_id", "message_id", "rating", "comment", "timestamp"
+    ],
+}
+
+
+class AnalyticsExporter:
+    """Streams conversation data as NDJSON or CSV."""
+
+    # Session -> agent lookups remembered while filtering feedback by agent
+    MAX_AGENT_LOOKUPS = 10000
+
+    def __init__(self, firebase_service: FirebaseService, page_size: int = 500, flush_records: int = 200):
+        """
+        Initialize exporter.
+
+        Args:
+            firebase_service: Firebase service (for its Realtime Database client)
+            page_size: Children fetched per database request
+            flush_records: Records buffered before a chunk is emitted
+        """
+        self.firebase_service = firebase_service
+        self.rtdb = firebase_service.rtdb
+        self.page_size = page_size
+        self.flush_records = flush_records
+        self._agent_by_session: Dict[str, Optional[str]] = {}
+        # Sessions skipped because they have no index entry yet
+        self.missing_index_entries = 0
+
+    @staticmethod
+    def _range(start: Optional[date], end: Optional[date]) -> Dict[str, Optional[str]]:
+        return {
+            "start_at": start.isoformat() if start else None,
+            "end_at": end.isoformat() + DAY_END if end else None,
+        }
+
+    async def iter_user_ids(self) -> AsyncIterator[str]:
+        """Users with sessions, paged by key from the distinct-user rollup."""
+        async for user_id, session_count in self.rtdb.paginate(
+            f'{FirebaseService.ANALYTICS_PATH}/users',
+            order_by='$key',
+            page_size=self.page_size
+        ):
+            if session_count:
+                yield user_id
+
+    async def _count_missing_index_entries(self, user_id: str) -> None:
+        session_keys, index_keys = await asyncio.gather(
+            self.rtdb.get(f'sessions/{user_id}', shallow=True),
+            self.rtdb.get(f'session_index/{user_id}', shallow=True)
+        )
+        self.missing_index_entries += len(set(session_keys or {}) - set(index_keys or {}))
+
+    async def iter_sessions(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        agent_id: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate session summaries created in the date range.
+
+        Args:
+            start: First creation day to include
+            end: Last creation day to include
+            agent_id: Only sessions of this agent
+
+        Yields:
+            Session records
+        """
+        async for user_id in self.iter_user_ids():
+            await self._count_missing_index_entries(user_id)
+            async for session_id, entry in self.rtdb.paginate(
+                f'session_index/{user_id}',
+                order_by='created_at',
+                page_size=self.page_size,
+                **self._range(start, end)
+            ):
+                if not isinstance(entry, dict) or 'created_at' not in entry:
+                    continue
+                if agent_id and entry.get('agent_id') != agent_id:
+                    continue
+                yield {
+                    "type": "session",
+                    "session_id": session_id,
+                    "user_id": user_id,
+                    "agent_id": entry.get('agent_id'),
+                    "title": entry.get('title'),
+                    "created_at": entry['created_at'],
+                    "last_accessed": entry.get('last_accessed'),
+                    "message_count": entry.get('message_count', 0),
+                    "archived": bool(entry.get('archived')),
+                }
+
+    async def iter_messages(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        agent_id: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate messages of the sessions created in the date range.
+
+        Args:
+            start: First session creation day to include
+            end: Last session creation day to include
+            agent_id: Only sessions of this agent
+
+        Yields:
+            Message records in chronological order per session
+        """
+        async for session in self.iter_sessions(start, end, agent_id):
+            async for message_key, message in self._session_messages(session):
+                if not message:
+                    continue
+                yield {
+                    "type": "message",
+                    "session_id": session['session_id'],
+                    "user_id": session['user_id'],
+                    "agent_id": session['agent_id'],
+                    "message_key": message_key,
+                    "message_id": message.get('message_id'),
+                    "role": message.get('role'),
+                    "content": message.get('content'),
+                    "timestamp": message.get('timestamp'),
+                    "citations": message.get('citations'),
+                }
+
+    async def _session_messages(self, session: Dict[str, Any]) -> AsyncIterator[Tuple[str, Any]]:
+        """Messages of one session, from the database or its archive blob (read, not restored)."""
+        if session['archived'] and self.firebase_service.archive is not None:
+            archived = await self.firebase_service.archive.read(session['user_id'], session['session_id'])
+            if archived is not None:
+                for item in archived['messages'].items():
+                    yield item
+                return
+        async for item in self.rtdb.paginate(
+            f"sessions/{session['user_id']}/{session['session_id']}/messages",
+            order_by='$key',
+            page_size=self.page_size
+        ):
+            yield item
+
+    async def _session_agent(self, user_id: str, session_id: str) -> Optional[str]:
+        """Agent of a session, from its index entry (bounded memo)."""
+        if session_id not in self._agent_by_session:
+            if len(self._agent_by_session) >= self.MAX_AGENT_LOOKUPS:
+                self._agent_by_session.clear()
+            self._agent_by_session[session_id] = await self.rtdb.get(
+                f'session_index/{user_id}/{session_id}/agent_id'
+            )
+        return self._agent_by_session[session_id]
+
+    async def iter_feedback(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        agent_id: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate feedback submitted in the date range.
+
+        Args:
+            start: First day to include
+            end: Last day to include
+            agent_id: Only feedback on sessions of this agent
+
+        Yields:
+            Feedback records ordered by timestamp
+        """
+        async for feedback_id, feedback in self.rtdb.paginate(
+            'feedback',
+            order_by='timestamp',
+            page_size=self.page_size,
+            **self._range(start, end)
+        ):
+            if agent_id:
+                session_agent = await self._session_agent(
+                    feedback.get('user_id'), feedback.get('session_id')
+                )
+                if session_agent != agent_id:
+                    continue
+            yield {
+                "type": "feedback",
+                "feedback_id": feedback_id,
+                "user_id": feedback.get('user_id'),
+                "session_id": feedback.get('session_id'),
+                "message_id": feedback.get('message_id'),
+                "rating": feedback.get('rating'),
+                "comment": feedback.get('comment'),
+                "timestamp": feedback.get('timestamp'),
+            }
+
+    async def _records(
+        self,
+        kind: str,
+        start: Optional[date],
+        end: Optional[date],
+        agent_id: Optional[str]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        kinds = ("sessions", "messages", "feedback") if kind == "all" else (kind,)
+        iterators = {
+            "sessions": self.iter_sessions,
+            "messages": self.iter_messages,
+            "feedback": self.iter_feedback,
+        }
+        for name in kinds:
+            async for record in iterators[name](start, end, agent_id):
+                yield record
+
+    async def stream(
+        self,
+        kind: str = "sessions",
+        fmt: str = "ndjson",
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        agent_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream an export as text chunks.
+
+        Args:
+            kind: "sessions", "messages", "feedback", or "all" (NDJSON only)
+            fmt: "ndjson" or "csv"
+            start: First day to include
+            end: Last day to include
+            agent_id: Only data of this agent
+
+        Yields:
+            Chunks of NDJSON lines or CSV rows (with a header row first)
+        """
+        buffer = io.StringIO()
+        writer = None
+        if fmt == "csv":
+            writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS[kind], extrasaction="ignore")
+            writer.writeheader()
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        count = 0
+        self.missing_index_entries = 0
+        try:
+            async for record in self._records(kind, start, end, agent_id):
+                if writer is not None:
+                    writer.writerow(record)
+                else:
+                    buffer.write(json.dumps(record, separators=(',', ':'), default=str))
+                    buffer.write("\n")
+                count += 1
+
+                if count % self.flush_records == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+
+            if buffer.tell():
+                yield buffer.getvalue()
+            logger.info(f"Exported {count} {kind} records as {fmt}")
+            if self.missing_index_entries:
+                logger.warning(
+                    f"Export skipped {self.missing_index_entries} session(s) without index entries; "
+                    f"run backfill_analytics.py to index them"
+                )
+
+        except Exception as e:
+            # Headers are already sent; the truncated body is the only signal left
+            logger.error(f"Export failed after {count} records: {str(e)}")
+            raise
+
+
+def validate_export(kind: str, fmt: str) -> None:
+    """
+    Check an export request before the response starts.
+
+    Args:
+        kind: Requested record kind
+        fmt: Requested output format
+
+    Raises:
+        ValueError: If the combination is not supported
+    """
+    if kind not in EXPORT_KINDS:
+        raise ValueError(f"Unknown export kind '{kind}' (expected one of {', '.join(EXPORT_KINDS)})")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}' (expected ndjson or csv)")
+    if fmt == "csv" and kind == "all":
+        raise ValueError("CSV exports need a single kind (sessions, messages or feedback)")
@@ -0,0 +1,198 @@
+"""
+Vectorized analytics over the columnar snapshot written by AnalyticsSnapshotJob.
+
+Tables are loaded as dicts of NumPy column arrays, and every metric is a
+handful of array operations (unique/bincount/searchsorted) instead of
+Python loops over session dicts.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+from datetime import datetime, timedelta
+from pathlib import Path
+import numpy as np
+import pyarrow.dataset as ds
+
+DAY = np.timedelta64(1, "D")
+
+
+def load_table(
+    root: str,
+    table: str,
+    start_day: Optional[str] = None,
+    end_day: Optional[str] = None,
+    columns: Optional[Sequence[str]] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Load snapshot columns for a range of day partitions.
+
+    Args:
+        root: Snapshot root directory
+        table: "sessions" or "feedback"
+        start_day: First day to include (YYYY-MM-DD), inclusive
+        end_day: Last day to include (YYYY-MM-DD), inclusive
+        columns: Columns to read (all by default)
+
+    Returns:
+        Mapping of column name to NumPy array (timestamps as datetime64[us])
+    """
+    path = Path(root) / table
+    if not path.exists():
+        return {}
+
+    dataset = ds.dataset(path, format="parquet", partitioning="hive")
+    condition = None
+    if start_day:
+        condition = ds.field("day") >= start_day
+    if end_day:
+        upper = ds.field("day") <= end_day
+        condition = upper if condition is None else condition & upper
+
+    data = dataset.to_table(columns=list(columns) if columns else None, filter=condition)
+    return {
+        name: data.column(name).to_numpy(zero_copy_only=False)
+        for name in data.column_names
+        if name != "day"
+    }
+
+
+def _day_index(timestamps: np.ndarray, first_day: np.datetime64) -> np.ndarray:
+    """Days since first_day for each timestamp."""
+    return (timestamps.astype("datetime64[D]") - first_day) // DAY
+
+
+def compute_analytics(
+    sessions: Dict[str, np.ndarray],
+    feedback: Dict[str, np.ndarray],
+    agent_ids: Sequence[str],
+    days: int = 7,
+    now: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Compute the `/api/analytics` metrics from snapshot columns.
+
+    Args:
+        sessions: Session columns (session_id, user_id, agent_id, created_at)
+        feedback: Feedback columns (session_id, rating)
+        agent_ids: Agents reported in the usage breakdown
+        days: Number of days of recent activity
+        now: Reference time (defaults to the current UTC time)
+
+    Returns:
+        Analytics dict with the same fields as AnalyticsService.compute_analytics
+    """
+    now = now or datetime.utcnow()
+    created_at = sessions.get("created_at", np.array([], dtype="datetime64[us]"))
+    ratings = feedback.get("rating", np.array([], dtype=np.int8)).astype(np.int64)
+
+    # Sessions in the last week (rolling window) and per day for the last N days
+    cutoff = np.datetime64(now - timedelta(days=7), "us")
+    sessions_this_week = int(np.count_nonzero(created_at >= cutoff))
+
+    first_day = np.datetime64((now - timedelta(days=days - 1)).date(), "D")
+    offsets = _day_index(created_at, first_day)
+    in_range = (offsets >= 0) & (offsets < days)
+    per_day = np.bincount(offsets[in_range].astype(np.int64), minlength=days)
+    recent_activity = [
+        {"date": str(first_day + i), "sessions": int(per_day[i])}
+        for i in range(days)
+    ]
+
+    # Agent usage breakdown
+    names, counts = np.unique(sessions.get("agent_id", np.array([], dtype=object)), return_counts=True)
+    by_agent = dict(zip(names.tolist(), counts.tolist()))
+    agent_usage = {agent_id: int(by_agent.get(agent_id, 0)) for agent_id in agent_ids}
+    total_agent_sessions = sum(agent_usage.values())
+    agent_usage_percent = {
+        agent_id: round((count / total_agent_sessions) * 100, 1) if total_agent_sessions else 0.0
+        for agent_id, count in agent_usage.items()
+    }
+
+    # Top rated sessions
+    top_rated: List[Dict[str, Any]] = []
+    if ratings.size:
+        session_ids, inverse = np.unique(feedback["session_id"], return_inverse=True)
+        rating_counts = np.bincount(inverse)
+        averages = np.bincount(inverse, weights=ratings) / rating_counts
+        for i in np.argsort(-averages, kind="stable")[:5]:
+            top_rated.append({
+                "session_id": str(session_ids[i]),
+                "avg_rating": round(float(averages[i]), 2),
+                "rating_count": int(rating_counts[i])
+            })
+
+    return {
+        "total_conversations": int(created_at.size),
+        "active_users": int(np.unique(sessions["user_id"]).size) if created_at.size else 0,
+        "avg_rating": round(float(ratings.mean()), 2) if ratings.size else 0.0,
+        "sessions_this_week": sessions_this_week,
+        "agent_usage": agent_usage_percent,
+        "agent_usage_counts": agent_usage,
+        "recent_activity": recent_activity,
+        "total_feedback_count": int(ratings.size),
+        "top_rated_sessions": top_rated,
+        "generated_at": now.isoformat()
+    }
+
+
+def ratings_by_agent_by_week(
+    sessions: Dict[str, np.ndarray],
+    feedback: Dict[str, np.ndarray]
+) -> List[Dict[str, Any]]:
+    """
+    Average rating per agent per ISO week (feedback joined to its session's agent).
+
+    Args:
+        sessions: Session columns (session_id, agent_id)
+        feedback: Feedback columns (session_id, rating, timestamp)
+
+    Returns:
+        Rows of {week, agent_id, avg_rating, rating_count}, sorted by week and agent
+    """
+    if not feedback.get("rating", np.array([])).size or not sessions.get("session_id", np.array([])).size:
+        return []
+
+    # Join feedback -> session agent via a sorted lookup
+    order = np.argsort(sessions["session_id"])
+    sorted_ids = sessions["session_id"][order]
+    positions = np.searchsorted(sorted_ids, feedback["session_id"])
+    positions = np.clip(positions, 0, sorted_ids.size - 1)
+    matched = sorted_ids[positions] == feedback["session_id"]
+    agents = sessions["agent_id"][order][positions[matched]]
+
+    # Weeks start on Monday; 1970-01-01 was a Thursday
+    days = feedback["timestamp"][matched].astype("datetime64[D]")
+    weeks = days - ((days.astype(np.int64) + 3) % 7) * DAY
+    ratings = feedback["rating"][matched].astype(np.float64)
+
+    keys = np.char.add(np.char.add(weeks.astype(str), "|"), agents.astype(str))
+    groups, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(inverse)
+    averages = np.bincount(inverse, weights=ratings) / counts
+
+    rows = []
+    for key, avg, count in zip(groups.tolist(), averages.tolist(), counts.tolist()):
+        week, agent_id = key.split("|", 1)
+        rows.append({"week": week, "agent_id": agent_id, "avg_rating": round(avg, 2), "rating_count": count})
+    return rows
+
+
+def session_length_distribution(
+    sessions: Dict[str, np.ndarray],
+    bins: Sequence[int] = (0, 2, 4, 8, 16, 32)
+) -> Dict[str, int]:
+    """
+    Histogram of messages per session.
+
+    Args:
+        sessions: Session columns (message_count)
+        bins: Lower bucket edges; the last bucket is open-ended
+
+    Returns:
+        Mapping of bucket label ("0-1", ..., "32+") to session count
+    """
+    counts = sessions.get("message_count", np.array([], dtype=np.int32))
+    edges = np.asarray(bins)
+    bucket = np.searchsorted(edges, counts, side="right") - 1
+    totals = np.bincount(bucket[bucket >= 0], minlength=len(edges))
+
+    labels = [f"{lo}-{hi - 1}" for lo, hi in zip(edges[:-1], edges[1:])] + [f"{edges[-1]}+"]
+    return {label: int(total) for label, total in zip(labels, totals)}
@@ -0,0 +1,296 @@
+"""
+Analytics computed from rollups maintained at write time.
+
+FirebaseService keeps small aggregate nodes up to date in the same
+multi-path writes that create/delete sessions and save feedback:
+
+    analytics/totals                  {sessions, users, feedback_count, rating_sum}
+    analytics/daily/{YYYY-MM-DD}      {sessions}
+    analytics/created/{YYYY-MM-DD}    {session_id: created_at}
+    analytics/agents/{agent_id}       session count
+    analytics/users/{user_id}         session count (distinct users: count > 0)
+    analytics/session_ratings/{sid}   {sum, count, avg}
+
+so the analytics endpoints read a few small nodes instead of scanning every
+session and message: whole days come from the daily counts, the partial day
+at the start of the rolling week from that day's creation times, and the top
+rated sessions from a query on `avg` (needs `".indexOn": ["avg"]` on
+analytics/session_ratings and `".indexOn": ".value"` on analytics/created/$day).
+`backfill()` rebuilds the rollups from existing data.
+"""
+from typing import Any, Dict
+from datetime import datetime, timedelta
+from app.config import Settings
+from app.models.schemas import AgentType
+from app.services.firebase_service import FirebaseService
+from app.services.analytics_export import AnalyticsExporter
+from app.utils.swr_cache import StaleWhileRevalidateCache
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AnalyticsService:
+    """Serves usage analytics from the write-time rollups."""
+
+    def __init__(self, settings: Settings, firebase_service: FirebaseService):
+        """
+        Initialize analytics service.
+
+        Args:
+            settings: Application settings
+            firebase_service: Firebase service that maintains the rollups
+        """
+        self.settings = settings
+        self.firebase_service = firebase_service
+        self.rtdb = firebase_service.rtdb
+        self.path = firebase_service.ANALYTICS_PATH
+        self.cache = StaleWhileRevalidateCache(ttl_seconds=settings.analytics_cache_ttl_seconds)
+
+    @staticmethod
+    def _avg_rating(totals: Dict[str, Any]) -> float:
+        count = totals.get('feedback_count', 0)
+        return totals.get('rating_sum', 0) / count if count else 0.0
+
+    async def get_analytics(self, days: int = 7) -> Dict[str, Any]:
+        """
+        Get the full analytics response (cached, stale-while-revalidate).
+
+        Args:
+            days: Number of days of recent activity
+
+        Returns:
+            Analytics data including conversation counts, ratings, agent usage, etc.;
+            `generated_at` tells when the snapshot was computed
+        """
+        return await self.cache.get(("analytics", days), lambda: self.compute_analytics(days))
+
+    async def get_summary(self) -> Dict[str, Any]:
+        """
+        Get the lightweight analytics summary (cached, stale-while-revalidate).
+
+        Returns:
+            Conversation, user and feedback totals with `generated_at`
+        """
+        return await self.cache.get(("summary",), self.compute_summary)
+
+    async def compute_analytics(self, days: int = 7) -> Dict[str, Any]:
+        """
+        Build the full analytics response from the rollups.
+
+        Args:
+            days: Number of days of recent activity
+
+        Returns:
+            Analytics data including conversation counts, ratings, agent usage, etc.
+        """
+        try:
+            now = datetime.utcnow()
+            cutoff = (now - timedelta(days=7)).isoformat()
+            first_day = (now - timedelta(days=max(days, 7) - 1)).strftime("%Y-%m-%d")
+
+            totals, agents, daily, cutoff_day, top_rated = await asyncio.gather(
+                self.rtdb.get(f'{self.path}/totals'),
+                self.rtdb.get(f'{self.path}/agents'),
+                self.rtdb.query(f'{self.path}/daily', order_by='$key', start_at=first_day),
+                self.rtdb.query(f'{self.path}/created/{cutoff[:10]}', order_by='$value', start_at=cutoff),
+                self.rtdb.query(f'{self.path}/session_ratings', order_by='avg', limit_to_last=5)
+            )
+            totals = totals or {}
+            agents = agents or {}
+            sessions_by_day = {day: (value or {}).get('sessions', 0) for day, value in daily}
+
+            # Sessions in the last week (rolling 7 x 24h): the days after the
+            # cutoff's day, plus that day's sessions created after the cutoff
+            week = [(now - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(7)]
+            sessions_this_week = len(cutoff_day) + sum(sessions_by_day.get(day, 0) for day in week)
+
+            # Agent usage breakdown
+            agent_usage = {agent.value: agents.get(agent.value, 0) for agent in AgentType}
+            total_agent_sessions = sum(agent_usage.values())
+            if total_agent_sessions > 0:
+                agent_usage_percent = {
+                    agent_id: round((count / total_agent_sessions) * 100, 1)
+                    for agent_id, count in agent_usage.items()
+                }
+            else:
+                agent_usage_percent = {k: 0.0 for k in agent_usage.keys()}
+
+            # Recent activity (sessions per day for last N days)
+            recent_activity = []
+            for i in range(days - 1, -1, -1):
+                date = (now - timedelta(days=i)).strftime("%Y-%m-%d")
+                recent_activity.append({
+                    "date": date,
+                    "sessions": sessions_by_day.get(date, 0)
+                })
+
+            # Top rated sessions (the query returns them lowest first)
+            rated = [
+                {
+                    "session_id": session_id,
+                    "avg_rating": round(ratings['avg'], 2),
+                    "rating_count": ratings['count']
+                }
+                for session_id, ratings in reversed(top_rated)
+                if ratings and ratings.get('count')
+            ]
+
+            return {
+                "total_conversations": totals.get('sessions', 0),
+                "active_users": totals.get('users', 0),
+                "avg_rating": round(self._avg_rating(totals), 2),
+                "sessions_this_week": sessions_this_week,
+                "agent_usage": agent_usage_percent,
+                "agent_usage_counts": agent_usage,
+                "recent_activity": recent_activity,
+                "total_feedback_count": totals.get('feedback_count', 0),
+                "top_rated_sessions": rated,
+                "generated_at": now.isoformat()
+            }
+
+        except Exception as e:
+            logger.error(f"Failed to compute analytics: {str(e)}")
+            raise
+
+    async def compute_summary(self) -> Dict[str, Any]:
+        """
+        Build the lightweight analytics summary (a single small read).
+
+        Returns:
+            Conversation, user and feedback totals
+        """
+        try:
+            totals = await self.rtdb.get(f'{self.path}/totals') or {}
+            return {
+                "total_conversations": totals.get('sessions', 0),
+                "active_users": totals.get('users', 0),
+                "avg_rating": round(self._avg_rating(totals), 2),
+                "total_feedback": totals.get('feedback_count', 0),
+                "generated_at": datetime.utcnow().isoformat()
+            }
+
+        except Exception as e:
+            logger.error(f"Failed to compute analytics summary: {str(e)}")
+            raise
+
+    @staticmethod
+    def build_rollups(
+        sessions_data: Dict[str, Dict[str, Any]],
+        feedback_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Compute the rollup nodes from full session and feedback trees.
+
+        Args:
+            sessions_data: Contents of /sessions ({user_id: {session_id: session}})
+            feedback_data: Contents of /feedback ({feedback_id: feedback})
+
+        Returns:
+            Contents for the analytics node
+        """
+        totals = {'sessions': 0, 'users': 0, 'feedback_count': 0, 'rating_sum': 0}
+        daily: Dict[str, Dict[str, int]] = {}
+        created: Dict[str, Dict[str, str]] = {}
+        agents: Dict[str, int] = {}
+        users: Dict[str, int] = {}
+        session_ratings: Dict[str, Dict[str, Any]] = {}
+
+        for user_id, user_sessions in (sessions_data or {}).items():
+            for session_id, session in (user_sessions or {}).items():
+                if not isinstance(session, dict) or 'created_at' not in session:
+                    continue
+                totals['sessions'] += 1
+                users[user_id] = users.get(user_id, 0) + 1
+                day = daily.setdefault(session['created_at'][:10], {'sessions': 0})
+                day['sessions'] += 1
+                created.setdefault(session['created_at'][:10], {})[session_id] = session['created_at']
+                agent_id = session.get('agent_id', '')
+                agents[agent_id] = agents.get(agent_id, 0) + 1
+
+        for feedback in (feedback_data or {}).values():
+            rating = feedback.get('rating', 0)
+            totals['feedback_count'] += 1
+            totals['rating_sum'] += rating
+            session_id = feedback.get('session_id')
+            if session_id:
+                ratings = session_ratings.setdefault(session_id, {'sum': 0, 'count': 0})
+                ratings['sum'] += rating
+                ratings['count'] += 1
+                ratings['avg'] = ratings['sum'] / ratings['count']
+
+        totals['users'] = len(users)
+        return {
+            'totals': totals,
+            'daily': daily,
+            'created': created,
+            'agents': agents,
+            'users': users,
+            'session_ratings': session_ratings,
+        }
+
+    async def backfill(self) -> Dict[str, Any]:
+        """
+        Rebuild all rollups from the existing sessions and feedback.
+
+        Reads the full /sessions, /session_index and /feedback trees once
+        (archived sessions count through their index stubs) and writes the
+        index entries of sessions created before the index existed (which
+        exports skip); run it after deploying the rollups, or to repair
+        drift, while traffic is low (writes landing during the rebuild are
+        overwritten).
+
+        Returns:
+            The rebuilt totals
+        """
+        try:
+            sessions_data, feedback_data, index_data = await asyncio.gather(
+                self.rtdb.get('sessions'),
+                self.rtdb.get('feedback'),
+                self.rtdb.get('session_index')
+            )
+            sessions_data = sessions_data or {}
+            for user_id, user_sessions in sessions_data.items():
+                if set(user_sessions or {}) - set((index_data or {}).get(user_id) or {}):
+                    await self.firebase_service.rebuild_session_index(user_id, only_missing=True)
+            # Archived sessions are only left as stubs in the session index
+            for user_id, entries in (index_data or {}).items():
+                for session_id, entry in (entries or {}).items():
+                    if isinstance(entry, dict) and entry.get('archived'):
+                        sessions_data.setdefault(user_id, {}).setdefault(session_id, entry)
+            rollups = self.build_rollups(sessions_data, feedback_data)
+            await self.rtdb.set(self.path, rollups)
+            self.cache.invalidate()
+
+            logger.info(f"Backfilled analytics rollups: {rollups['totals']}")
+            return rollups['totals']
+
+        except Exception as e:
+            logger.error(f"Failed to backfill analytics: {str(e)}")
+            raise
+
+    def can_export(self, user_id: str) -> bool:
+        """
+        Check whether a user may export raw conversation data.
+
+        Args:
+            user_id: Firebase user ID
+
+        Returns:
+            True if the user is listed in `analytics_export_user_ids`
+        """
+        return user_id in self.settings.analytics_export_user_ids
+
+    def create_exporter(self) -> AnalyticsExporter:
+        """
+        Create an exporter for one export request.
+
+        Returns:
+            AnalyticsExporter reading pages of `analytics_export_page_size`
+        """
+        return AnalyticsExporter(self.firebase_service, page_size=self.settings.analytics_export_page_size)
+
+    async def close(self) -> None:
+        """Cancel background analytics refreshes."""
+        await self.cache.close()
@@ -0,0 +1,305 @@
+"""
+Offline job that snapshots sessions and feedback into columnar files.
+
+Layout (Hive-style day partitions, Parquet):
+
+    {root}/manifest.json                          format_version, last_complete_day
+    {root}/sessions/day=YYYY-MM-DD/part-N.parquet session_id, user_id, agent_id,
+                                                  created_at, last_accessed, message_count
+    {root}/feedback/day=YYYY-MM-DD/part-N.parquet feedback_id, user_id, session_id,
+                                                  message_id, rating, timestamp
+
+Only complete (past) days are written, and each run starts after the last
+complete day in the manifest, so reruns append new days instead of
+rescanning history. Rows are bucketed by creation day; a day's partition is
+a snapshot and is not updated for later changes (e.g. new messages).
+
+Rows are written as they arrive rather than collected for the whole range:
+feedback is read in timestamp order, so each day is written once the next
+one starts; sessions are read user by user, so buffered days are written
+as additional part files whenever the buffer fills. A day may therefore
+have several part files, each sorted by time.
+
+The job only reads the database. Users are paged from the `analytics/users`
+rollup; sessions without a session index entry (created before the index
+existed) are counted and reported, not indexed; `python backfill_analytics.py`
+indexes them. Reads use ordered, ranged queries; the database rules need
+`".indexOn": ["created_at"]` on `session_index/$uid` and
+`".indexOn": ["timestamp"]` on `feedback`.
+"""
+from typing import Any, AsyncIterator, Dict, List, Optional
+from datetime import datetime, timedelta
+from pathlib import Path
+import asyncio
+import json
+import logging
+import shutil
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app.services.firebase_service import FirebaseService
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+# Upper bound for ISO timestamps of a day in string-ordered range queries
+DAY_END = "\uf8ff"
+
+SESSION_SCHEMA = pa.schema([
+    ("session_id", pa.string()),
+    ("user_id", pa.string()),
+    ("agent_id", pa.string()),
+    ("created_at", pa.timestamp("us")),
+    ("last_accessed", pa.timestamp("us")),
+    ("message_count", pa.int32()),
+])
+
+FEEDBACK_SCHEMA = pa.schema([
+    ("feedback_id", pa.string()),
+    ("user_id", pa.string()),
+    ("session_id", pa.string()),
+    ("message_id", pa.string()),
+    ("rating", pa.int8()),
+    ("timestamp", pa.timestamp("us")),
+])
+
+
+class _PartitionWriter:
+    """Buffers rows by day and writes them as part files of day partitions."""
+
+    def __init__(self, root: Path, schema: pa.Schema, time_column: str, max_buffered_rows: int):
+        self.root = root
+        self.schema = schema
+        self.time_column = time_column
+        self.max_buffered_rows = max_buffered_rows
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {}
+        self._buffered = 0
+        self._parts: Dict[str, int] = {}
+        self.rows = 0
+
+    def add(self, row: Dict[str, Any]) -> None:
+        day = row[self.time_column].strftime("%Y-%m-%d")
+        self._buffers.setdefault(day, []).append(row)
+        self._buffered += 1
+        self.rows += 1
+        if self._buffered >= self.max_buffered_rows:
+            self.flush()
+
+    def flush(self, before_day: Optional[str] = None) -> None:
+        """Write buffered days (only those before `before_day` if given)."""
+        for day in sorted(self._buffers):
+            if before_day is not None and day >= before_day:
+                break
+            self._write(day, self._buffers.pop(day))
+
+    def _write(self, day: str, rows: List[Dict[str, Any]]) -> None:
+        partition = self.root / f"day={day}"
+        partition.mkdir(parents=True, exist_ok=True)
+        part = self._parts.get(day, 0)
+        self._parts[day] = part + 1
+        rows.sort(key=lambda row: row[self.time_column])
+        table = pa.Table.from_pylist(rows, schema=self.schema)
+        pq.write_table(table, partition / f"part-{part}.parquet", compression="zstd")
+        self._buffered -= len(rows)
+
+
+class AnalyticsSnapshotJob:
+    """Streams new days of sessions and feedback into day-partitioned Parquet."""
+
+    def __init__(
+        self,
+        firebase_service: FirebaseService,
+        output_dir: str,
+        page_size: int = 500,
+        concurrency: int = 8,
+        max_buffered_rows: int = 50000
+    ):
+        """
+        Initialize snapshot job.
+
+        Args:
+            firebase_service: Firebase service (for its Realtime Database client)
+            output_dir: Snapshot root directory
+            page_size: Users, sessions or feedback records fetched per query
+            concurrency: Users whose sessions are fetched concurrently
+            max_buffered_rows: Rows held per table before buffered days are
+                written out
+        """
+        self.firebase_service = firebase_service
+        self.rtdb = firebase_service.rtdb
+        self.root = Path(output_dir)
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.max_buffered_rows = max_buffered_rows
+        self.missing_index_entries = 0
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        path = self.root / MANIFEST_FILE
+        if not path.exists():
+            return {"format_version": FORMAT_VERSION, "last_complete_day": None}
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format: {manifest.get('format_version')}")
+        return manifest
+
+    def _save_manifest(self, manifest: Dict[str, Any]) -> None:
+        tmp = self.root / (MANIFEST_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2)
+        tmp.replace(self.root / MANIFEST_FILE)
+
+    def _writer(self, table_name: str, schema: pa.Schema, time_column: str) -> _PartitionWriter:
+        return _PartitionWriter(self.root / table_name, schema, time_column, self.max_buffered_rows)
+
+    def _clear_uncommitted(self, table_name: str, last_day: Optional[str]) -> None:
+        """Remove partitions a crashed earlier run left after the last complete day."""
+        path = self.root / table_name
+        if not path.exists():
+            return
+        for partition in path.glob("day=*"):
+            if last_day is None or partition.name[len("day="):] > last_day:
+                shutil.rmtree(partition)
+
+    async def _iter_user_ids(self) -> AsyncIterator[str]:
+        """Users with sessions, paged by key from the distinct-user rollup."""
+        async for user_id, session_count in self.rtdb.paginate(
+            f'{FirebaseService.ANALYTICS_PATH}/users',
+            order_by='$key',
+            page_size=self.page_size
+        ):
+            if session_count:
+                yield user_id
+
+    async def _count_missing_index_entries(self, user_id: str) -> None:
+        session_keys, index_keys = await asyncio.gather(
+            self.rtdb.get(f'sessions/{user_id}', shallow=True),
+            self.rtdb.get(f'session_index/{user_id}', shallow=True)
+        )
+        self.missing_index_entries += len(set(session_keys or {}) - set(index_keys or {}))
+
+    async def _user_sessions(
+        self,
+        user_id: str,
+        start_day: Optional[str],
+        until_day: str,
+        writer: _PartitionWriter
+    ) -> None:
+        """Page one user's session summaries created in the day range into the writer."""
+        await self._count_missing_index_entries(user_id)
+        async for session_id, entry in self.rtdb.paginate(
+            f'session_index/{user_id}',
+            order_by='created_at',
+            page_size=self.page_size,
+            start_at=start_day,
+            end_at=until_day + DAY_END
+        ):
+            if not isinstance(entry, dict) or "created_at" not in entry:
+                continue
+            writer.add({
+                "session_id": entry.get("session_id", session_id),
+                "user_id": user_id,
+                "agent_id": entry.get("agent_id"),
+                "created_at": datetime.fromisoformat(entry["created_at"]),
+                "last_accessed": datetime.fromisoformat(entry["last_accessed"]),
+                "message_count": entry.get("message_count", 0),
+            })
+
+    async def _snapshot_sessions(self, start_day: Optional[str], until_day: str) -> int:
+        """Write all sessions created in the day range, a few users at a time."""
+        writer = self._writer("sessions", SESSION_SCHEMA, "created_at")
+        batch: List[str] = []
+        async for user_id in self._iter_user_ids():
+            batch.append(user_id)
+            if len(batch) == self.concurrency:
+                await asyncio.gather(*(
+                    self._user_sessions(uid, start_day, until_day, writer) for uid in batch
+                ))
+                batch = []
+        await asyncio.gather(*(self._user_sessions(uid, start_day, until_day, writer) for uid in batch))
+        writer.flush()
+        return writer.rows
+
+    async def _snapshot_feedback(self, start_day: Optional[str], until_day: str) -> int:
+        """Page through feedback ordered by timestamp, writing each day as the next begins."""
+        writer = self._writer("feedback", FEEDBACK_SCHEMA, "timestamp")
+        async for key, value in self.rtdb.paginate(
+            'feedback',
+            order_by='timestamp',
+            page_size=self.page_size,
+            start_at=start_day,
+            end_at=until_day + DAY_END
+        ):
+            timestamp = datetime.fromisoformat(value["timestamp"])
+            writer.flush(before_day=timestamp.strftime("%Y-%m-%d"))
+            writer.add({
+                "feedback_id": key,
+                "user_id": value.get("user_id"),
+                "session_id": value.get("session_id"),
+                "message_id": value.get("message_id"),
+                "rating": value.get("rating", 0),
+                "timestamp": timestamp,
+            })
+        writer.flush()
+        return writer.rows
+
+    async def run(self, until_day: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Snapshot every complete day after the last snapshotted one.
+
+        Args:
+            until_day: Last day to include (YYYY-MM-DD); defaults to yesterday (UTC)
+
+        Returns:
+            Summary with the day range and row counts written
+        """
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            manifest = self._load_manifest()
+            until_day = until_day or (datetime.utcnow() - timedelta(days=1)).strftime("%Y-%m-%d")
+
+            last_day = manifest.get("last_complete_day")
+            if last_day and last_day >= until_day:
+                logger.info(f"Analytics snapshot already complete through {last_day}")
+                return {
+                    "start_day": None, "until_day": until_day,
+                    "sessions": 0, "feedback": 0, "missing_index_entries": 0
+                }
+
+            start_day = None
+            if last_day:
+                start_day = (datetime.fromisoformat(last_day) + timedelta(days=1)).strftime("%Y-%m-%d")
+
+            self._clear_uncommitted("sessions", last_day)
+            self._clear_uncommitted("feedback", last_day)
+            self.missing_index_entries = 0
+            sessions, feedback = await asyncio.gather(
+                self._snapshot_sessions(start_day, until_day),
+                self._snapshot_feedback(start_day, until_day)
+            )
+
+            manifest["last_complete_day"] = until_day
+            manifest["updated_at"] = datetime.utcnow().isoformat()
+            self._save_manifest(manifest)
+
+            logger.info(
+                f"Analytics snapshot {start_day or 'start'}..{until_day}: "
+                f"{sessions} sessions, {feedback} feedback"
+            )
+            if self.missing_index_entries:
+                logger.warning(
+                    f"{self.missing_index_entries} sessions have no session index entry and were "
+                    f"not snapshotted; run backfill_analytics.py to index them"
+                )
+            return {
+                "start_day": start_day,
+                "until_day": until_day,
+                "sessions": sessions,
+                "feedback": feedback,
+                "missing_index_entries": self.missing_index_entries,
+            }
+
+        except Exception as e:
+            logger.error(f"Analytics snapshot failed: {str(e)}")
+            raise
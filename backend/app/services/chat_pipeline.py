@@ -0,0 +1,152 @@
+"""
+Chat turn preparation pipeline shared by the chat routes.
+
+Session load, query embedding and retrieval run as a small dependency graph
+so independent stages overlap instead of running back to back. New sessions
+are only created once retrieval has succeeded.
+"""
+from typing import Dict, List, NamedTuple, Optional
+from app.config import Settings
+from app.models.schemas import AgentType, Citation
+from app.services.agent_router import AgentRouter
+from app.services.firebase_service import FirebaseService
+from app.utils.prompts import build_conversation_history
+from app.utils.stage_graph import StageGraph
+from app.utils.sse import StreamStats
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SessionNotFoundError(LookupError):
+    """Raised when a chat references a session the user does not own."""
+
+
+class PreparedTurn(NamedTuple):
+    """Everything a chat turn needs before (or instead of) generation."""
+    session_id: str
+    conversation_history: List[Dict[str, str]]
+    citations: List[Citation]
+    query_embedding: List[float]
+    cached_response: Optional[str] = None
+
+
+class ChatPipeline:
+    """Prepares everything a chat turn needs before generation starts."""
+
+    def __init__(
+        self,
+        settings: Settings,
+        agent_router: AgentRouter,
+        firebase_service: FirebaseService
+    ):
+        """
+        Initialize chat pipeline.
+
+        Args:
+            settings: Application settings
+            agent_router: Agent routing service
+            firebase_service: Firebase service for session management
+        """
+        self.settings = settings
+        self.agent_router = agent_router
+        self.firebase_service = firebase_service
+        # Completed/cancelled streaming turns (see routes/chat_stream.py)
+        self.stream_stats = StreamStats()
+
+    async def prepare(
+        self,
+        user_id: str,
+        query: str,
+        agent_id: AgentType,
+        session_id: Optional[str] = None
+    ) -> PreparedTurn:
+        """
+        Resolve the session, conversation history and retrieved context.
+
+        The session stage (history of an existing session) runs concurrently
+        with query embedding and retrieval; if any stage fails the others
+        are cancelled. New chats get their session only after retrieval has
+        succeeded, so a failed or cancelled turn leaves no empty session
+        (and no analytics rollup) behind. Standalone questions (no conversation history) are
+        checked against the semantic response cache: for new chats before
+        retrieval, so a hit skips Pinecone entirely.
+
+        Args:
+            user_id: Authenticated user ID
+            query: User's question
+            agent_id: Agent to use for retrieval
+            session_id: Existing session ID, or None to create a new session
+
+        Returns:
+            PreparedTurn; cached_response is set when generation can be skipped
+
+        Raises:
+            SessionNotFoundError: If session_id does not exist for the user
+        """
+        async def load_session():
+            if not session_id:
+                # Created below once retrieval has succeeded; it has no history yet
+                return None, []
+
+            # Usually served from the session cache this worker updated last turn
+            messages = await self.firebase_service.get_recent_messages(user_id, session_id)
+            if messages is None:
+                raise SessionNotFoundError(f"Session {session_id} not found")
+            return session_id, messages
+
+        async def build_history(session):
+            _, messages = session
+            return build_conversation_history(
+                messages,
+                max_history=self.settings.max_conversation_history
+            )
+
+        async def embed_query():
+            return await self.agent_router.embed_query(query)
+
+        async def retrieve(embedding):
+            # New chats have no history, so the answer only depends on the query
+            if not session_id:
+                cached = self.agent_router.lookup_cached_response(agent_id, embedding)
+                if cached:
+                    response_text, citations = cached
+                    return citations, response_text
+            citations = await self.agent_router.search_context(embedding, agent_id)
+            return citations, None
+
+        graph = (
+            StageGraph()
+            .add("session", load_session)
+            .add("history", build_history, depends_on=["session"])
+            .add("embedding", embed_query)
+            .add("citations", retrieve, depends_on=["embedding"])
+        )
+        results = await graph.run()
+
+        resolved_session_id, _ = results["session"]
+        history = results["history"]
+        citations, cached_response = results["citations"]
+
+        if resolved_session_id is None:
+            # Shielded: once started, the session write and its rollups complete together
+            resolved_session_id = await asyncio.shield(self.firebase_service.create_session(
+                user_id=user_id,
+                agent_id=agent_id.value,
+                title=f"Chat with {agent_id.value}"
+            ))
+
+        # Existing session without messages yet: still a standalone question
+        if cached_response is None and session_id and not history:
+            cached = self.agent_router.lookup_cached_response(agent_id, results["embedding"])
+            if cached:
+                cached_response, citations = cached
+
+        return PreparedTurn(
+            session_id=resolved_session_id,
+            conversation_history=history,
+            citations=citations,
+            query_embedding=results["embedding"],
+            cached_response=cached_response
+        )
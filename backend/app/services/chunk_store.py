@@ -0,0 +1,138 @@
+"""
+Shared store of corpus chunks, keyed by corpus version and vector ID.
+
+Assistant messages persist citations as references ({vector_id,
+relevance_score, corpus_version}) instead of copies of the chunk text; reads
+resolve them against this store, built from the ingestion artifact and the
+chunk tables the pipeline retains for every corpus version. Vector IDs are
+only stable within one corpus version (re-chunking reuses them for different
+text), so a reference is resolved against its own version's table. References
+are only written while the loaded version is retained, so re-ingesting never
+strands the text of older answers; without a retained table citations are
+stored in full.
+"""
+from typing import Any, Dict, List, Optional, Union
+from pathlib import Path
+import logging
+from app.models.schemas import Citation
+from app.services.vector_artifact import MANIFEST_FILE, ChunkTable, VectorArtifact
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_SOURCE = "Unknown Source"
+UNAVAILABLE_SOURCE = "Source unavailable (corpus updated)"
+
+
+class ChunkStore:
+    """In-memory map of vector ID to source title, page and chunk text."""
+
+    def __init__(self, artifact: Optional[VectorArtifact] = None, history_dir: Optional[str] = None):
+        """
+        Build the store from a loaded vector artifact.
+
+        Args:
+            artifact: Ingestion artifact (metadata columns and chunk texts);
+                without one the store is empty and citations are stored in full
+            history_dir: Directory of retained chunk tables by corpus version
+                (`chunk_history/` of the ingestion output); tables of older
+                versions are loaded the first time a reference needs them
+        """
+        self.history_dir = Path(history_dir) if history_dir else None
+        self.corpus_version = artifact.corpus_version if artifact is not None else ""
+        self._chunks: Dict[str, Dict[str, Any]] = self._load(artifact) if artifact is not None else {}
+        # Chunks of other corpus versions (None when that version is not retained)
+        self._versions: Dict[str, Optional[Dict[str, Dict[str, Any]]]] = {}
+        # References are only safe to store while this version's table is kept
+        self.retained = bool(self._chunks) and self._table_path(self.corpus_version) is not None
+        if self._chunks:
+            logger.info(f"Loaded {len(self._chunks)} chunks for citation lookups")
+        if self._chunks and not self.retained:
+            logger.warning(
+                f"Corpus {self.corpus_version} has no retained chunk table; citations are stored in full"
+            )
+
+    @staticmethod
+    def _load(table: Union[VectorArtifact, ChunkTable]) -> Dict[str, Dict[str, Any]]:
+        chunks = {}
+        for row, vector_id in enumerate(table.columns["id"]):
+            metadata = table.row(row)
+            chunks[vector_id] = {
+                "source_title": metadata.get("doc_title") or UNKNOWN_SOURCE,
+                "page_number": metadata.get("chunk_index"),
+                "chunk_text": table.text(row),
+            }
+        return chunks
+
+    def _table_path(self, corpus_version: str) -> Optional[Path]:
+        if self.history_dir is None or not corpus_version:
+            return None
+        path = self.history_dir / corpus_version
+        return path if (path / MANIFEST_FILE).exists() else None
+
+    def _chunks_for(self, corpus_version: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Chunks of a corpus version, or None if it is neither loaded nor retained."""
+        if corpus_version == self.corpus_version and self._chunks:
+            return self._chunks
+        if corpus_version not in self._versions:
+            path = self._table_path(corpus_version)
+            self._versions[corpus_version] = self._load(ChunkTable(str(path))) if path else None
+        return self._versions[corpus_version]
+
+    def __contains__(self, vector_id: Optional[str]) -> bool:
+        return vector_id in self._chunks
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def to_reference(self, citation: Citation) -> Dict[str, Any]:
+        """
+        Convert a citation for storage.
+
+        Args:
+            citation: Retrieved citation
+
+        Returns:
+            {vector_id, relevance_score, corpus_version} when the chunk is in
+            the store and its corpus version is retained, otherwise the full
+            citation
+        """
+        if self.retained and citation.vector_id in self._chunks:
+            return {
+                "vector_id": citation.vector_id,
+                "relevance_score": citation.relevance_score,
+                "corpus_version": self.corpus_version,
+            }
+        return citation.model_dump()
+
+    def resolve(self, stored: List[Dict[str, Any]]) -> List[Citation]:
+        """
+        Hydrate stored citations (references or full copies).
+
+        Args:
+            stored: Citations as stored with a message
+
+        Returns:
+            Citations with source title, page and chunk text filled in from
+            the reference's corpus version; references to a version that is
+            no longer retained, or to chunks missing from it, keep their score
+            with an empty excerpt
+        """
+        citations = []
+        for i, data in enumerate(stored or []):
+            if "chunk_text" in data:
+                citations.append(Citation(**data))
+                continue
+            chunks = self._chunks_for(data.get("corpus_version", ""))
+            if chunks is None:
+                chunk = {"source_title": UNAVAILABLE_SOURCE, "page_number": None, "chunk_text": ""}
+            else:
+                chunk = chunks.get(data.get("vector_id")) or {
+                    "source_title": UNKNOWN_SOURCE, "page_number": None, "chunk_text": ""
+                }
+            citations.append(Citation(
+                id=f"cite_{i+1}",
+                vector_id=data.get("vector_id"),
+                relevance_score=data.get("relevance_score", 0.0),
+                **chunk
+            ))
+        return citations
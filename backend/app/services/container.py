@@ -0,0 +1,113 @@
+"""
+Application-lifetime service container.
+
+Owns one shared instance of each external-service client so requests reuse
+pooled keep-alive connections instead of constructing new clients per turn.
+"""
+from typing import Any, Dict, Optional
+from app.config import Settings
+from app.services.openai_service import OpenAIService
+from app.services.pinecone_service import PineconeService
+from app.services.local_vector_service import LocalVectorService
+from app.services.firebase_service import FirebaseService
+from app.services.chunk_store import ChunkStore
+from app.services.vector_artifact import VectorArtifact, load_artifact
+from app.services.agent_router import AgentRouter
+from app.services.chat_pipeline import ChatPipeline
+from app.services.analytics_service import AnalyticsService
+from app.services.stream_registry import StreamRegistry
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """Container for the services shared by all requests of the application."""
+
+    def __init__(self, settings: Settings):
+        """
+        Build the shared service instances.
+
+        Args:
+            settings: Application settings
+        """
+        self.settings = settings
+        self.openai_service = OpenAIService(settings)
+        # The ingestion artifact backs local retrieval and stored-citation lookups
+        artifact = load_artifact(settings.local_vector_artifact_path) \
+            if settings.local_vector_artifact_path else None
+        self.retrieval_service = self._create_retrieval_service(settings, artifact)
+        self.firebase_service = FirebaseService(
+            settings,
+            chunk_store=ChunkStore(artifact, settings.chunk_history_dir) if artifact else None
+        )
+        self.agent_router = AgentRouter(
+            settings,
+            self.openai_service,
+            self.retrieval_service,
+            corpus_version=artifact.corpus_version if artifact else None
+        )
+        self.chat_pipeline = ChatPipeline(
+            settings,
+            self.agent_router,
+            self.firebase_service
+        )
+        self.analytics_service = AnalyticsService(settings, self.firebase_service)
+        self.stream_registry = StreamRegistry(
+            max_streams=settings.stream_buffer_max_streams,
+            retention_seconds=settings.stream_buffer_retention_seconds,
+            grace_seconds=settings.stream_resume_grace_seconds,
+            resumable=settings.stream_resume_enabled
+        )
+
+    @staticmethod
+    def _create_retrieval_service(settings: Settings, artifact: Optional[VectorArtifact] = None):
+        """Build the vector retrieval backend selected by settings.retrieval_backend."""
+        if settings.retrieval_backend == "local":
+            logger.info("Using local in-process vector retrieval backend")
+            return LocalVectorService(settings, artifact=artifact)
+        if settings.retrieval_backend != "pinecone":
+            raise ValueError(f"Unknown retrieval backend: {settings.retrieval_backend}")
+        return PineconeService(settings)
+
+    async def startup(self) -> None:
+        """Warm up connections so the first chat turn does not pay for them."""
+        try:
+            await self.retrieval_service.warm_up()
+        except Exception as e:
+            # Not fatal: the index handle is resolved lazily on first query
+            logger.warning(f"Retrieval backend warm-up failed: {str(e)}")
+
+        logger.info("Service container started")
+
+    def stats(self) -> Dict[str, Any]:
+        """Collect cache and runtime counters from the shared services."""
+        return {
+            "auth_token_cache": self.firebase_service.token_cache.stats(),
+            "session_cache": self.firebase_service.session_cache.stats(),
+            "embedding_cache": self.openai_service.embedding_cache.stats(),
+            "response_cache": self.agent_router.response_cache.stats(),
+            "analytics_cache": self.analytics_service.cache.stats(),
+            "chat_streams": self.chat_pipeline.stream_stats.stats(),
+            "stream_buffers": self.stream_registry.stats(),
+        }
+
+    async def shutdown(self) -> None:
+        """Release pooled connections held by the services."""
+        # In-flight answers save their partial text before the clients close
+        await self.stream_registry.close()
+
+        try:
+            await self.openai_service.close()
+        except Exception as e:
+            logger.error(f"Failed to close OpenAI client: {str(e)}")
+
+        try:
+            await self.firebase_service.close()
+        except Exception as e:
+            logger.error(f"Failed to close Realtime Database client: {str(e)}")
+
+        await self.analytics_service.close()
+        self.retrieval_service.close()
+
+        logger.info("Service container shut down")
@@ -0,0 +1,180 @@
+"""
+Two-tier cache for query embeddings.
+
+Tier 1 is an in-process LRU. Tier 2 is an optional SQLite file that every
+uvicorn worker on the host can share, so a question embedded by one worker
+is a hit for all of them.
+"""
+from typing import Any, Dict, List, Optional
+from array import array
+from collections import OrderedDict
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Trim the disk tier back to its bound once every N inserts
+DISK_TRIM_INTERVAL = 100
+
+
+def normalize_query(text: str) -> str:
+    """Normalize query text so trivially different phrasings share a cache key."""
+    return " ".join(text.split()).casefold()
+
+
+class EmbeddingCache:
+    """Memoizes embeddings keyed on normalized text + model + dimensions."""
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        disk_path: Optional[str] = None,
+        disk_max_entries: int = 50000
+    ):
+        """
+        Initialize embedding cache.
+
+        Args:
+            max_entries: Capacity of the in-process LRU tier
+            disk_path: Optional SQLite file for the shared on-disk tier
+            disk_max_entries: Capacity of the on-disk tier (least recently used trimmed)
+        """
+        self.max_entries = max_entries
+        self.disk_max_entries = disk_max_entries
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._disk: Optional[sqlite3.Connection] = None
+        self._disk_lock = threading.Lock()
+        self._disk_inserts = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if disk_path:
+            try:
+                self._disk = sqlite3.connect(disk_path, check_same_thread=False, timeout=5.0)
+                self._disk.execute("PRAGMA journal_mode=WAL")
+                self._disk.execute("PRAGMA synchronous=NORMAL")
+                self._disk.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+                )
+                self._disk.execute(
+                    "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)"
+                )
+                self._disk.commit()
+                logger.info(f"Embedding disk cache opened at {disk_path}")
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding disk cache disabled: {str(e)}")
+                self._disk = None
+
+    @staticmethod
+    def make_key(text: str, model: str, dimensions: int) -> str:
+        """Build the cache key for a query embedding."""
+        raw = f"{model}\x1f{dimensions}\x1f{normalize_query(text)}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[List[float]]:
+        """
+        Look up an embedding, checking memory first and then disk.
+
+        Args:
+            key: Key from make_key()
+
+        Returns:
+            Embedding vector, or None on a miss
+        """
+        embedding = self._memory.get(key)
+        if embedding is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return embedding
+
+        if self._disk is not None:
+            embedding = await asyncio.to_thread(self._disk_get, key)
+            if embedding is not None:
+                self.disk_hits += 1
+                self._remember(key, embedding)
+                return embedding
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, embedding: List[float]) -> None:
+        """
+        Store an embedding in both tiers.
+
+        Args:
+            key: Key from make_key()
+            embedding: Embedding vector
+        """
+        self._remember(key, embedding)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk_put, key, embedding)
+
+    def _remember(self, key: str, embedding: List[float]) -> None:
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[List[float]]:
+        try:
+            with self._disk_lock:
+                row = self._disk.execute(
+                    "SELECT vector FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                self._disk.execute(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?", (time.time(), key)
+                )
+                self._disk.commit()
+            vector = array('f')
+            vector.frombytes(row[0])
+            return vector.tolist()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding disk cache read failed: {str(e)}")
+            return None
+
+    def _disk_put(self, key: str, embedding: List[float]) -> None:
+        try:
+            with self._disk_lock:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                    (key, array('f', embedding).tobytes(), time.time())
+                )
+                self._disk_inserts += 1
+                if self._disk_inserts % DISK_TRIM_INTERVAL == 0:
+                    self._disk.execute(
+                        "DELETE FROM embeddings WHERE key IN ("
+                        "SELECT key FROM embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                        (self.disk_max_entries,)
+                    )
+                self._disk.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding disk cache write failed: {str(e)}")
+
+    def close(self) -> None:
+        """Close the on-disk tier."""
+        if self._disk is not None:
+            with self._disk_lock:
+                self._disk.close()
+            self._disk = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters and hit rate."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "memory_size": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_enabled": self._disk is not None,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
@@ -1,35 +1,85 @@
 """
 Firebase service for authentication and session storage.
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, NamedTuple, Optional, Tuple
 import firebase_admin
-from firebase_admin import credentials, auth, db
+from firebase_admin import credentials, auth
 import logging
 from datetime import datetime
 from app.config import Settings
-from app.models.schemas import UserInfo, SessionResponse, Message
+from app.models.schemas import UserInfo, SessionResponse, SessionSummary, MessagePage, Message
+from app.services.token_cache import VerifiedTokenCache
+from app.services.session_cache import SessionHistoryCache
+from app.services.session_archive import open_session_archive
+from app.services.chunk_store import ChunkStore
+from app.services.rtdb_client import (
+    RealtimeDatabaseClient,
+    ServiceAccountTokenProvider,
+    PreconditionFailedError,
+    generate_push_id,
+    key_order,
+)
+import asyncio
 import uuid
 import json
 
 logger = logging.getLogger(__name__)
 
 
+class HistoryMessage(NamedTuple):
+    """Role and content of a message, all conversation history needs."""
+    role: str
+    content: str
+
+
 class FirebaseService:
     """Service for Firebase authentication and Realtime Database operations."""
 
     _initialized = False
+    _credential = None
+
+    # Characters of the latest message kept in the session index
+    PREVIEW_LENGTH = 120
 
-    def __init__(self, settings: Settings):
+    # Root of the analytics rollups maintained on write (see AnalyticsService)
+    ANALYTICS_PATH = 'analytics'
+
+    def __init__(self, settings: Settings, chunk_store: Optional[ChunkStore] = None):
         """
         Initialize Firebase service.
 
         Args:
             settings: Application settings containing Firebase configuration
+            chunk_store: Corpus chunks that stored citations refer to
+                (citations are stored in full without one)
         """
         self.settings = settings
         self.database_url = settings.firebase_database_url
+        self.chunk_store = chunk_store or ChunkStore()
+
+        self._initialize_sdk(settings)
+        self.rtdb = self._create_rtdb_client(settings)
+        # Users whose session index was checked for missing entries
+        self._indexed_users = set()
+        self.session_cache = SessionHistoryCache(
+            max_sessions=settings.session_cache_size,
+            window=settings.max_conversation_history * 2,
+            ttl_seconds=settings.session_cache_ttl_seconds
+        )
+        # Cold sessions moved out of the database by SessionRetentionJob
+        self.archive = (
+            open_session_archive(settings.session_archive_dir) if settings.session_archive_dir else None
+        )
+        self.token_cache = VerifiedTokenCache(
+            max_size=settings.auth_token_cache_size,
+            max_ttl_seconds=(
+                settings.auth_revocation_recheck_seconds if settings.auth_check_revoked else None
+            )
+        )
 
-        # Initialize Firebase Admin SDK once
+    @classmethod
+    def _initialize_sdk(cls, settings: Settings) -> None:
+        """Initialize the Firebase Admin SDK once per process (used for auth)."""
         if not FirebaseService._initialized:
             try:
                 # Create credentials from environment variables
@@ -42,18 +92,230 @@ class FirebaseService:
                 }
                 cred = credentials.Certificate(cred_dict)
                 firebase_admin.initialize_app(cred, {
-                    'databaseURL': self.database_url
+                    'databaseURL': settings.firebase_database_url
                 })
+                FirebaseService._credential = cred
                 FirebaseService._initialized = True
                 logger.info("Firebase Admin SDK initialized")
             except Exception as e:
                 logger.error(f"Failed to initialize Firebase: {str(e)}")
                 raise
 
+    @classmethod
+    def _create_rtdb_client(cls, settings: Settings) -> RealtimeDatabaseClient:
+        """Build the pooled async Realtime Database client (or emulator client)."""
+        client_options = {
+            'http2': settings.firebase_http2,
+            'max_connections': settings.http_max_connections,
+            'max_keepalive_connections': settings.http_max_keepalive_connections,
+            'keepalive_expiry': settings.http_keepalive_expiry,
+            'timeout': settings.firebase_timeout_seconds,
+        }
+
+        if settings.firebase_database_emulator_host:
+            # The emulator accepts the "owner" token and selects the db via ?ns=
+            async def emulator_token() -> str:
+                return "owner"
+
+            return RealtimeDatabaseClient(
+                f"http://{settings.firebase_database_emulator_host}",
+                token_provider=emulator_token,
+                namespace=settings.firebase_project_id,
+                **client_options
+            )
+
+        return RealtimeDatabaseClient(
+            settings.firebase_database_url,
+            token_provider=ServiceAccountTokenProvider(cls._credential),
+            **client_options
+        )
+
+    async def close(self) -> None:
+        """Close the Realtime Database connection pool."""
+        await self.rtdb.close()
+        logger.info("Realtime Database client closed")
+
+    def _message_to_dict(self, message: Message) -> Dict[str, Any]:
+        """Serialize a message for storage (citations as chunk references)."""
+        message_dict = {
+            'role': message.role,
+            'content': message.content,
+            'timestamp': message.timestamp.isoformat(),
+            'message_id': message.message_id
+        }
+        if message.citations:
+            message_dict['citations'] = [self.chunk_store.to_reference(c) for c in message.citations]
+        if message.truncated:
+            message_dict['truncated'] = True
+        return message_dict
+
+    def _parse_message(self, msg_data: Dict[str, Any]) -> Message:
+        """Convert one stored message to a Message object (citations hydrated)."""
+        return Message(
+            role=msg_data['role'],
+            content=msg_data['content'],
+            timestamp=datetime.fromisoformat(msg_data['timestamp']),
+            message_id=msg_data.get('message_id'),
+            citations=self.chunk_store.resolve(msg_data['citations']) if msg_data.get('citations') else None,
+            truncated=msg_data.get('truncated', False)
+        )
+
+    def _parse_messages(self, messages_data: Any) -> List[Message]:
+        """
+        Convert stored messages to Message objects in chronological order.
+
+        Messages are stored under push keys ({push_id: message}); sessions
+        written before that stored a list, which the database returns as a
+        list (or as integer keys once push-keyed children were added).
+        """
+        if not messages_data:
+            return []
+        if isinstance(messages_data, dict):
+            items = [messages_data[key] for key in sorted(messages_data, key=key_order)]
+        else:
+            items = [msg for msg in messages_data if msg]
+
+        return [self._parse_message(msg_data) for msg_data in items]
+
+    @classmethod
+    def _preview(cls, content: str) -> str:
+        """Shorten message content for the session index."""
+        content = ' '.join(content.split())
+        if len(content) <= cls.PREVIEW_LENGTH:
+            return content
+        return content[:cls.PREVIEW_LENGTH - 3].rstrip() + '...'
+
+    def _build_index_entry(self, session_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a session index entry from a full stored session."""
+        messages = self._parse_messages(session_data.get('messages'))
+        return {
+            'session_id': session_data['session_id'],
+            'agent_id': session_data['agent_id'],
+            'title': session_data.get('title'),
+            'created_at': session_data['created_at'],
+            'last_accessed': session_data['last_accessed'],
+            'message_count': len(messages),
+            'last_message_preview': self._preview(messages[-1].content) if messages else None
+        }
+
+    @classmethod
+    def _session_rollup_updates(
+        cls,
+        session_id: str,
+        agent_id: str,
+        created_at: str,
+        delta: int
+    ) -> Dict[str, Any]:
+        """Multi-path rollup increments for a created (+1) or deleted (-1) session."""
+        increment = {'.sv': {'increment': delta}}
+        return {
+            f'{cls.ANALYTICS_PATH}/totals/sessions': increment,
+            f'{cls.ANALYTICS_PATH}/daily/{created_at[:10]}/sessions': increment,
+            f'{cls.ANALYTICS_PATH}/created/{created_at[:10]}/{session_id}': created_at if delta > 0 else None,
+            f'{cls.ANALYTICS_PATH}/agents/{agent_id}': increment,
+        }
+
+    async def _transact(self, path: str, update: Callable[[Any], Any]) -> Tuple[Any, Any]:
+        """
+        Read-modify-write a small node with ETag-conditional writes.
+
+        `update` maps the current value to the new one (returning it unchanged
+        skips the write); on a conflict it is re-applied to the winning value.
+
+        Returns:
+            Tuple of (old value, new value)
+        """
+        value, etag = await self.rtdb.get_with_etag(path)
+        while True:
+            new_value = update(value)
+            if new_value == value:
+                return value, value
+            try:
+                await self.rtdb.set(path, new_value, etag=etag)
+                return value, new_value
+            except PreconditionFailedError as e:
+                value, etag = e.value, e.etag
+
+    async def _count_user_session(self, user_id: str, delta: int) -> None:
+        """
+        Adjust a user's session count in the distinct-user rollup.
+
+        The count changes transactionally, so exactly one writer sees a user
+        go from no sessions to one (or back) and moves the distinct-user total.
+        """
+        old, new = await self._transact(
+            f'{self.ANALYTICS_PATH}/users/{user_id}',
+            lambda count: max(int(count or 0) + delta, 0)
+        )
+        if bool(old) != bool(new):
+            await self.rtdb.update(f'{self.ANALYTICS_PATH}/totals', {
+                'users': {'.sv': {'increment': 1 if new else -1}}
+            })
+
+    async def list_user_ids(self) -> List[str]:
+        """
+        List users with sessions, hot or archived (shallow reads: keys only).
+
+        Returns:
+            Sorted user IDs
+        """
+        session_users, index_users = await asyncio.gather(
+            self.rtdb.get('sessions', shallow=True),
+            self.rtdb.get('session_index', shallow=True)
+        )
+        return sorted(set(session_users or {}) | set(index_users or {}))
+
+    async def _rehydrate(self, user_id: str, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Restore an archived session into the database.
+
+        Called when a session is missing from the hot tree (or only a
+        headless fragment is left) and before appending to an archived
+        session; the index stub's `archived` flag tells archived sessions
+        from unknown ones. The archived fields and messages are merged into
+        whatever is in the hot tree, so messages written to a fragment by a
+        turn racing the archive job are kept.
+
+        Returns:
+            The restored session as stored, or None if it is not archived
+        """
+        if self.archive is None:
+            return None
+        index_path = f'session_index/{user_id}/{session_id}'
+        if not await self.rtdb.get(f'{index_path}/archived'):
+            return None
+
+        session_data = await self.archive.read(user_id, session_id)
+        if session_data is None:
+            # Restored concurrently by another request or worker
+            return await self.rtdb.get(f'sessions/{user_id}/{session_id}')
+
+        # Opening counts as access, so the next retention run keeps it hot
+        session_path = f'sessions/{user_id}/{session_id}'
+        session_data['last_accessed'] = datetime.utcnow().isoformat()
+        messages = session_data.pop('messages', None) or {}
+        if isinstance(messages, list):
+            messages = {str(i): message for i, message in enumerate(messages) if message}
+        updates: Dict[str, Any] = {f'{session_path}/{field}': value for field, value in session_data.items()}
+        updates.update({f'{session_path}/messages/{key}': message for key, message in messages.items()})
+        updates.update({
+            f'{index_path}/last_accessed': session_data['last_accessed'],
+            f'{index_path}/archived': None,
+            f'{index_path}/archived_at': None,
+        })
+        await self.rtdb.update('', updates)
+        await self.archive.delete(user_id, session_id)
+        self.session_cache.invalidate(user_id, session_id)
+        logger.info(f"Rehydrated archived session {session_id}")
+        return await self.rtdb.get(session_path)
+
     async def verify_token(self, id_token: str) -> UserInfo:
         """
         Verify Firebase ID token and return user information.
 
+        Verified tokens are cached until their `exp` claim, so repeat requests
+        skip signature verification; cache misses verify in a worker thread.
+
         Args:
             id_token: Firebase ID token from client
 
@@ -64,18 +326,26 @@ class FirebaseService:
             Exception: If token verification fails
         """
         try:
-            decoded_token = auth.verify_id_token(id_token)
+            decoded_token = self.token_cache.get(id_token)
+            if decoded_token is None:
+                decoded_token = await asyncio.to_thread(
+                    auth.verify_id_token,
+                    id_token,
+                    check_revoked=self.settings.auth_check_revoked
+                )
+                self.token_cache.put(id_token, decoded_token)
+                logger.info(f"Token verified for user: {decoded_token['uid']}")
+
             user_id = decoded_token['uid']
             email = decoded_token.get('email')
             name = decoded_token.get('name')
 
-            logger.info(f"Token verified for user: {user_id}")
-
             return UserInfo(
                 user_id=user_id,
                 email=email,
                 name=name,
-                verified=True
+                verified=True,
+                expires_at=decoded_token.get('exp')
             )
         except Exception as e:
             logger.error(f"Token verification failed: {str(e)}")
@@ -108,13 +378,23 @@ class FirebaseService:
                 'agent_id': agent_id,
                 'title': title or f"Session {timestamp}",
                 'created_at': timestamp,
-                'last_accessed': timestamp,
-                'messages': []
+                'last_accessed': timestamp
             }
 
-            # Store in Firebase: /sessions/{user_id}/{session_id}
-            ref = db.reference(f'sessions/{user_id}/{session_id}')
-            ref.set(session_data)
+            # Store the session, its index entry and the analytics rollups together:
+            # /sessions/{user_id}/{session_id} and /session_index/{user_id}/{session_id}
+            updates = {
+                f'sessions/{user_id}/{session_id}': session_data,
+                f'session_index/{user_id}/{session_id}': self._build_index_entry(session_data)
+            }
+            updates.update(self._session_rollup_updates(session_id, agent_id, timestamp, 1))
+            await asyncio.gather(
+                self.rtdb.update('', updates),
+                self._count_user_session(user_id, 1)
+            )
+
+            # A new session has no history yet; follow-ups can skip the read
+            self.session_cache.put(user_id, session_id, [], 0)
 
             logger.info(f"Created session {session_id} for user {user_id}")
             return session_id
@@ -139,29 +419,20 @@ class FirebaseService:
             SessionResponse object or None if not found
         """
         try:
-            ref = db.reference(f'sessions/{user_id}/{session_id}')
-            session_data = ref.get()
+            session_data = await self.rtdb.get(f'sessions/{user_id}/{session_id}')
+            if not session_data or 'session_id' not in session_data:
+                session_data = await self._rehydrate(user_id, session_id)
 
-            if not session_data:
+            # A message write racing a delete can leave a headless fragment
+            if not session_data or 'session_id' not in session_data:
                 return None
 
-            # Convert messages to Message objects
-            messages = []
-            for msg_data in session_data.get('messages', []):
-                messages.append(Message(
-                    role=msg_data['role'],
-                    content=msg_data['content'],
-                    timestamp=datetime.fromisoformat(msg_data['timestamp']),
-                    message_id=msg_data.get('message_id'),
-                    citations=msg_data.get('citations')
-                ))
-
             return SessionResponse(
                 session_id=session_data['session_id'],
                 user_id=session_data['user_id'],
                 agent_id=session_data['agent_id'],
                 title=session_data.get('title'),
-                messages=messages,
+                messages=self._parse_messages(session_data.get('messages')),
                 created_at=datetime.fromisoformat(session_data['created_at']),
                 last_accessed=datetime.fromisoformat(session_data['last_accessed'])
             )
@@ -170,125 +441,338 @@ class FirebaseService:
             logger.error(f"Failed to get session: {str(e)}")
             raise
 
+    async def get_recent_messages(
+        self,
+        user_id: str,
+        session_id: str
+    ) -> Optional[List[HistoryMessage]]:
+        """
+        Get the most recent messages of a session for conversation history.
+
+        Served from the write-through session cache when possible. Cached
+        tails are validated against the session index's `message_count` (a
+        single field read), so messages another worker appended are never
+        missed. A miss checks ownership (a single field read) and fetches
+        only the last K messages with an orderBy("$key")/limitToLast query,
+        concurrently, so latency and bytes stay constant as the session grows.
+
+        Args:
+            user_id: User ID who owns the session
+            session_id: Session ID
+
+        Returns:
+            Up to `max_conversation_history * 2` lightweight role/content
+            records, oldest first, or None if the session does not exist
+        """
+        try:
+            # Sessions without an index entry (legacy or deleted) skip the cache
+            message_count = await self.rtdb.get(f'session_index/{user_id}/{session_id}/message_count')
+            if message_count is not None:
+                messages = self.session_cache.get(user_id, session_id, message_count)
+                if messages is not None:
+                    return messages
+
+            session_path = f'sessions/{user_id}/{session_id}'
+            window = self.session_cache.window
+            owner, entries = await asyncio.gather(
+                self.rtdb.get(f'{session_path}/session_id'),
+                self.rtdb.query(
+                    f'{session_path}/messages',
+                    order_by='$key',
+                    limit_to_last=window
+                ) if window else asyncio.sleep(0, result=[])
+            )
+            if not owner:
+                session_data = await self._rehydrate(user_id, session_id)
+                if not session_data:
+                    return None
+                restored = self._parse_messages(session_data.get('messages'))
+                messages = [HistoryMessage(m.role, m.content) for m in restored[-window:]] if window else []
+                return self.session_cache.put(user_id, session_id, messages, message_count)
+
+            messages = [
+                HistoryMessage(value['role'], value['content'])
+                for _, value in entries if value
+            ]
+            return self.session_cache.put(user_id, session_id, messages, message_count)
+
+        except Exception as e:
+            logger.error(f"Failed to get recent messages: {str(e)}")
+            raise
+
+    async def get_session_messages(
+        self,
+        user_id: str,
+        session_id: str,
+        limit: int = 20,
+        before: Optional[str] = None
+    ) -> Optional[MessagePage]:
+        """
+        Get one page of a session's messages, newest page first.
+
+        Uses an orderBy("$key") query with limitToLast (and endAt for the
+        cursor) on the message store, so the payload is bounded by the page
+        size no matter how long the session is. Message keys are push IDs
+        (or list indexes for older sessions), so key order is chronological.
+
+        Args:
+            user_id: User ID who owns the session
+            session_id: Session ID
+            limit: Page size
+            before: Cursor from a previous page; only older messages are returned
+
+        Returns:
+            MessagePage, or None if the session does not exist
+        """
+        try:
+            # The cursor itself is included by endAt, so fetch one extra
+            fetch = limit + 1 + (1 if before else 0)
+            owner, entries = await asyncio.gather(
+                self.rtdb.get(f'sessions/{user_id}/{session_id}/session_id'),
+                self.rtdb.query(
+                    f'sessions/{user_id}/{session_id}/messages',
+                    order_by='$key',
+                    limit_to_last=fetch,
+                    end_at=before
+                )
+            )
+            if not owner:
+                if await self._rehydrate(user_id, session_id) is None:
+                    return None
+                return await self.get_session_messages(user_id, session_id, limit, before)
+
+            if before:
+                entries = [(key, value) for key, value in entries if key != before]
+            has_more = len(entries) > limit
+            entries = entries[-limit:]
+
+            return MessagePage(
+                messages=[self._parse_message(value) for _, value in entries if value],
+                next_cursor=entries[0][0] if has_more and entries else None,
+                has_more=has_more
+            )
+
+        except Exception as e:
+            logger.error(f"Failed to get session messages: {str(e)}")
+            raise
+
     async def get_user_sessions(
         self,
         user_id: str,
         limit: int = 50
-    ) -> List[SessionResponse]:
+    ) -> List[SessionSummary]:
         """
-        Get all sessions for a user.
+        Get the most recently used sessions of a user.
+
+        Reads the per-user session index (`/session_index/{user_id}`) with a
+        server-side orderBy("last_accessed")/limitToLast query, so only the
+        top N small summaries are transferred; messages are loaded only when
+        a session is opened. Requires `".indexOn": ["last_accessed"]` on
+        `session_index/$uid` in the database rules.
 
         Args:
             user_id: User ID
             limit: Maximum number of sessions to return
 
         Returns:
-            List of SessionResponse objects
+            List of SessionSummary objects, most recent first
         """
         try:
-            ref = db.reference(f'sessions/{user_id}')
-            sessions_data = ref.get()
-
-            if not sessions_data:
-                return []
-
-            sessions = []
-            for session_id, session_data in sessions_data.items():
-                # Convert messages
-                messages = []
-                for msg_data in session_data.get('messages', []):
-                    messages.append(Message(
-                        role=msg_data['role'],
-                        content=msg_data['content'],
-                        timestamp=datetime.fromisoformat(msg_data['timestamp']),
-                        message_id=msg_data.get('message_id'),
-                        citations=msg_data.get('citations')
-                    ))
-
-                sessions.append(SessionResponse(
-                    session_id=session_data['session_id'],
-                    user_id=session_data['user_id'],
-                    agent_id=session_data['agent_id'],
-                    title=session_data.get('title'),
-                    messages=messages,
-                    created_at=datetime.fromisoformat(session_data['created_at']),
-                    last_accessed=datetime.fromisoformat(session_data['last_accessed'])
-                ))
+            if user_id not in self._indexed_users:
+                await self.rebuild_session_index(user_id, only_missing=True)
 
-            # Sort by last accessed, most recent first
-            sessions.sort(key=lambda x: x.last_accessed, reverse=True)
+            entries = await self.rtdb.query(
+                f'session_index/{user_id}',
+                order_by='last_accessed',
+                limit_to_last=limit
+            )
 
-            return sessions[:limit]
+            # Entries without created_at were only touched by message writes
+            # (sessions created before the index existed); repair them once
+            if any('created_at' not in entry for _, entry in entries):
+                await self.rebuild_session_index(user_id)
+                entries = await self.rtdb.query(
+                    f'session_index/{user_id}',
+                    order_by='last_accessed',
+                    limit_to_last=limit
+                )
+
+            sessions = [
+                SessionSummary(**entry)
+                for _, entry in reversed(entries)
+                if 'created_at' in entry
+            ]
+            return sessions
 
         except Exception as e:
             logger.error(f"Failed to get user sessions: {str(e)}")
             raise
 
-    async def add_message_to_session(
+    async def rebuild_session_index(self, user_id: str, only_missing: bool = False) -> int:
+        """
+        Rebuild a user's session index entries from the full sessions.
+
+        Used to backfill sessions created before the index existed. With
+        only_missing, the (cheap, shallow) key sets of both nodes are compared
+        first and only sessions without an index entry are read.
+
+        Args:
+            user_id: User ID
+            only_missing: Only rebuild entries that are missing
+
+        Returns:
+            Number of index entries written
+        """
+        try:
+            if only_missing:
+                session_keys, index_keys = await asyncio.gather(
+                    self.rtdb.get(f'sessions/{user_id}', shallow=True),
+                    self.rtdb.get(f'session_index/{user_id}', shallow=True)
+                )
+                missing = set(session_keys or {}) - set(index_keys or {})
+                sessions = await asyncio.gather(*(
+                    self.rtdb.get(f'sessions/{user_id}/{session_id}') for session_id in missing
+                ))
+                sessions_data = dict(zip(missing, sessions))
+            else:
+                sessions_data = await self.rtdb.get(f'sessions/{user_id}') or {}
+
+            entries = {
+                session_id: self._build_index_entry(session_data)
+                for session_id, session_data in sessions_data.items()
+                if session_data and 'session_id' in session_data
+            }
+            if entries:
+                await self.rtdb.update(f'session_index/{user_id}', entries)
+                logger.info(f"Rebuilt {len(entries)} session index entries for user {user_id}")
+
+            self._indexed_users.add(user_id)
+            return len(entries)
+
+        except Exception as e:
+            logger.error(f"Failed to rebuild session index: {str(e)}")
+            raise
+
+    async def add_messages_to_session(
         self,
         user_id: str,
         session_id: str,
-        message: Message
+        messages: List[Message]
     ) -> None:
         """
-        Add a message to a session.
+        Append messages to a session in one write.
+
+        Each message becomes a child under a client-generated push key and
+        the messages, the `last_accessed` bump and the session index update
+        are committed as a single multi-path update, so a turn costs one
+        small write regardless of how long the session is, and concurrent
+        appends never overwrite each other. The caller must have resolved
+        the session (the chat pipeline loads or creates it for every turn).
+
+        When archiving is enabled, the index stub is checked first and an
+        archived session is rehydrated before the append: the caller may
+        have resolved it from a session cache entry older than the archive.
 
         Args:
             user_id: User ID who owns the session
             session_id: Session ID
-            message: Message to add
+            messages: Messages to append, in order
         """
         try:
-            # Get current messages
-            ref = db.reference(f'sessions/{user_id}/{session_id}')
-            session_data = ref.get()
-
-            if not session_data:
-                raise ValueError(f"Session {session_id} not found")
-
-            # Convert message to dict
-            message_dict = {
-                'role': message.role,
-                'content': message.content,
-                'timestamp': message.timestamp.isoformat(),
-                'message_id': message.message_id
-            }
-
-            if message.citations:
-                message_dict['citations'] = [c.model_dump() for c in message.citations]
+            session_path = f'sessions/{user_id}/{session_id}'
+            index_path = f'session_index/{user_id}/{session_id}'
+            # Never write into an archived session: that would leave a headless
+            # fragment and the archive flag would hide the blob
+            if self.archive is not None and await self.rtdb.get(f'{index_path}/archived'):
+                await self._rehydrate(user_id, session_id)
+            timestamp = datetime.utcnow().isoformat()
 
-            # Append message
-            messages = session_data.get('messages', [])
-            messages.append(message_dict)
+            updates: Dict[str, Any] = {
+                f'{session_path}/messages/{generate_push_id()}': self._message_to_dict(message)
+                for message in messages
+            }
+            updates[f'{session_path}/last_accessed'] = timestamp
+            updates[f'{index_path}/last_accessed'] = timestamp
+            updates[f'{index_path}/message_count'] = {'.sv': {'increment': len(messages)}}
+            if messages:
+                updates[f'{index_path}/last_message_preview'] = self._preview(messages[-1].content)
 
-            # Update session
-            ref.update({
-                'messages': messages,
-                'last_accessed': datetime.utcnow().isoformat()
-            })
+            await self.rtdb.update('', updates)
+            self.session_cache.append(user_id, session_id, [
+                HistoryMessage(message.role, message.content) for message in messages
+            ])
 
-            logger.info(f"Added message to session {session_id}")
+            logger.info(f"Added {len(messages)} message(s) to session {session_id}")
 
         except Exception as e:
-            logger.error(f"Failed to add message to session: {str(e)}")
+            logger.error(f"Failed to add messages to session: {str(e)}")
             raise
 
+    async def add_message_to_session(
+        self,
+        user_id: str,
+        session_id: str,
+        message: Message
+    ) -> None:
+        """
+        Add a message to a session.
+
+        Args:
+            user_id: User ID who owns the session
+            session_id: Session ID
+            message: Message to add
+        """
+        await self.add_messages_to_session(user_id, session_id, [message])
+
     async def delete_session(
         self,
         user_id: str,
         session_id: str
-    ) -> None:
+    ) -> bool:
         """
         Delete a session.
 
+        Archived sessions are deleted without being rehydrated: their index
+        stub proves ownership and carries the fields the rollups need.
+
         Args:
             user_id: User ID who owns the session
             session_id: Session ID to delete
+
+        Returns:
+            False if the user has no such session
         """
         try:
-            ref = db.reference(f'sessions/{user_id}/{session_id}')
-            ref.delete()
+            # Shallow read returns only the scalar fields the rollups need;
+            # sessions from before the index existed have no index entry
+            session_fields, index_entry = await asyncio.gather(
+                self.rtdb.get(f'sessions/{user_id}/{session_id}', shallow=True),
+                self.rtdb.get(f'session_index/{user_id}/{session_id}')
+            )
+            if not index_entry and not (session_fields and 'session_id' in session_fields):
+                return False
+            archived = bool(index_entry and index_entry.get('archived')) and self.archive is not None
+            if not (session_fields and 'created_at' in session_fields):
+                session_fields = index_entry
+
+            updates = {
+                f'sessions/{user_id}/{session_id}': None,
+                f'session_index/{user_id}/{session_id}': None
+            }
+            counted = bool(session_fields and 'created_at' in session_fields)
+            if counted:
+                updates.update(self._session_rollup_updates(
+                    session_id, session_fields['agent_id'], session_fields['created_at'], -1
+                ))
+
+            await self.rtdb.update('', updates)
+            if counted:
+                await self._count_user_session(user_id, -1)
+            self.session_cache.invalidate(user_id, session_id)
+            if archived:
+                await self.archive.delete(user_id, session_id)
             logger.info(f"Deleted session {session_id}")
+            return True
         except Exception as e:
             logger.error(f"Failed to delete session: {str(e)}")
             raise
@@ -328,9 +812,21 @@ class FirebaseService:
                 'timestamp': timestamp
             }
 
-            # Store in Firebase: /feedback/{feedback_id}
-            ref = db.reference(f'feedback/{feedback_id}')
-            ref.set(feedback_data)
+            def add_rating(ratings: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+                total = (ratings or {}).get('sum', 0) + rating
+                count = (ratings or {}).get('count', 0) + 1
+                return {'sum': total, 'count': count, 'avg': total / count}
+
+            # Store in Firebase: /feedback/{feedback_id}, with the rating rollups
+            # (the per-session average is kept queryable for top-rated sessions)
+            await asyncio.gather(
+                self.rtdb.update('', {
+                    f'feedback/{feedback_id}': feedback_data,
+                    f'{self.ANALYTICS_PATH}/totals/feedback_count': {'.sv': {'increment': 1}},
+                    f'{self.ANALYTICS_PATH}/totals/rating_sum': {'.sv': {'increment': rating}},
+                }),
+                self._transact(f'{self.ANALYTICS_PATH}/session_ratings/{session_id}', add_rating)
+            )
 
             logger.info(f"Saved feedback {feedback_id} for message {message_id}")
             return feedback_id
@@ -0,0 +1,179 @@
+"""
+In-process exact vector search over the ingestion artifact.
+
+The corpus is a few hundred chunks, so a brute-force cosine search over a
+contiguous float32 matrix takes microseconds - far less than a Pinecone
+round-trip. Implements the same retrieval contract as PineconeService.
+"""
+from typing import List, Dict, Any, Optional
+import json
+import logging
+import numpy as np
+from app.config import Settings
+from app.models.schemas import Citation
+from app.services.vector_artifact import VectorArtifact, load_artifact
+
+logger = logging.getLogger(__name__)
+
+
+class LocalVectorService:
+    """Drop-in replacement for PineconeService backed by a local vector artifact."""
+
+    def __init__(self, settings: Settings, artifact: Optional[VectorArtifact] = None):
+        """
+        Initialize local vector service.
+
+        Args:
+            settings: Application settings containing the artifact path
+            artifact: Already-loaded artifact (loaded from settings if None)
+        """
+        self.settings = settings
+        self.top_k = settings.pinecone_top_k
+        self.artifact = artifact or load_artifact(settings.local_vector_artifact_path)
+        self._masks: Dict[str, np.ndarray] = {}
+
+        # Precompute the boolean mask of every agent flag column
+        for name in self.artifact.columns:
+            if name.startswith("agent_"):
+                self._masks[self._filter_key({name: {"$eq": True}})] = self._column_equals(name, True)
+
+    @staticmethod
+    def _filter_key(metadata_filter: Dict[str, Any]) -> str:
+        return json.dumps(metadata_filter, sort_keys=True)
+
+    def _column_equals(self, name: str, value: Any) -> np.ndarray:
+        column = self.artifact.columns.get(name)
+        if column is None:
+            return np.zeros(self.artifact.count, dtype=bool)
+        return np.fromiter((v == value for v in column), dtype=bool, count=self.artifact.count)
+
+    def _evaluate(self, metadata_filter: Dict[str, Any]) -> np.ndarray:
+        """Evaluate a Pinecone-style metadata filter into a row mask."""
+        mask = np.ones(self.artifact.count, dtype=bool)
+        for field, condition in metadata_filter.items():
+            if field == "$and":
+                for clause in condition:
+                    mask &= self._evaluate(clause)
+            elif field == "$or":
+                mask &= np.logical_or.reduce([self._evaluate(clause) for clause in condition])
+            elif isinstance(condition, dict):
+                for op, value in condition.items():
+                    if op == "$eq":
+                        mask &= self._column_equals(field, value)
+                    elif op == "$ne":
+                        mask &= ~self._column_equals(field, value)
+                    elif op == "$in":
+                        mask &= np.logical_or.reduce(
+                            [self._column_equals(field, v) for v in value]
+                        )
+                    else:
+                        raise ValueError(f"Unsupported metadata filter operator: {op}")
+            else:
+                mask &= self._column_equals(field, condition)
+        return mask
+
+    def get_mask(self, metadata_filter: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """
+        Get the (cached) row mask for a metadata filter.
+
+        Args:
+            metadata_filter: Pinecone-style metadata filter
+
+        Returns:
+            Boolean row mask, or None when no filter is given
+        """
+        if not metadata_filter:
+            return None
+        key = self._filter_key(metadata_filter)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = self._evaluate(metadata_filter)
+            self._masks[key] = mask
+        return mask
+
+    def search(
+        self,
+        query_embedding: List[float],
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        top_k: Optional[int] = None
+    ) -> List[tuple]:
+        """
+        Exact cosine top-k search.
+
+        Args:
+            query_embedding: Vector embedding of the query
+            metadata_filter: Optional metadata filter
+            top_k: Number of results to return
+
+        Returns:
+            List of (row, score) tuples, best first
+        """
+        k = top_k or self.top_k
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        scores = self.artifact.vectors @ query
+        mask = self.get_mask(metadata_filter)
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(row), float(scores[row])) for row in top]
+
+    async def warm_up(self) -> None:
+        """Nothing to connect to; the artifact is loaded at construction."""
+
+    async def query_documents(
+        self,
+        query_embedding: List[float],
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        top_k: Optional[int] = None
+    ) -> List[Citation]:
+        """
+        Query the local artifact for similar documents with optional metadata filtering.
+
+        Args:
+            query_embedding: Vector embedding of the query
+            metadata_filter: Optional metadata filter for agent-specific documents
+            top_k: Number of results to return (defaults to settings value)
+
+        Returns:
+            List of Citation objects with retrieved document information
+        """
+        try:
+            citations = []
+            for i, (row, score) in enumerate(self.search(query_embedding, metadata_filter, top_k)):
+                metadata = self.artifact.row(row)
+                citations.append(Citation(
+                    id=f"cite_{i+1}",
+                    vector_id=metadata.get("id"),
+                    source_title=metadata.get("doc_title", "Unknown Source"),
+                    page_number=metadata.get("chunk_index"),
+                    chunk_text=self.artifact.text(row),
+                    relevance_score=min(max(score, 0.0), 1.0)
+                ))
+
+            logger.info(f"Retrieved {len(citations)} documents from local vector index")
+            return citations
+
+        except Exception as e:
+            logger.error(f"Local vector query failed: {str(e)}")
+            raise
+
+    def get_index_stats(self) -> Dict[str, Any]:
+        """Get statistics about the local vector artifact."""
+        return {
+            "dimension": self.artifact.dimensions,
+            "total_vector_count": self.artifact.count,
+            "corpus_version": self.artifact.corpus_version,
+        }
+
+    def close(self) -> None:
+        """Release the artifact's memory maps."""
+        self.artifact.close()
@@ -2,10 +2,13 @@
 OpenAI service for LLM interactions and embeddings.
 """
 from typing import List, Dict, Any, Tuple
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+import httpx
+import asyncio
 import logging
 from app.config import Settings
 from app.models.schemas import Citation
+from app.services.embedding_cache import EmbeddingCache
 from app.utils.prompts import create_rag_prompt, format_context_for_prompt
 
 logger = logging.getLogger(__name__)
@@ -22,15 +25,42 @@ class OpenAIService:
             settings: Application settings containing OpenAI configuration
         """
         self.settings = settings
-        self.client = AsyncOpenAI(api_key=settings.openai_api_key)
+        # One pooled keep-alive HTTP client for the lifetime of the service,
+        # so chat turns reuse warm TLS connections to the API
+        self.client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=settings.http_max_connections,
+                    max_keepalive_connections=settings.http_max_keepalive_connections,
+                    keepalive_expiry=settings.http_keepalive_expiry
+                )
+            )
+        )
         self.model = settings.openai_model
         self.temperature = settings.openai_temperature
         self.max_tokens = settings.openai_max_tokens
+        self.embedding_model = settings.openai_embedding_model
+        self.embedding_dimensions = settings.openai_embedding_dimensions
+        self.embedding_cache = EmbeddingCache(
+            max_entries=settings.embedding_cache_size,
+            disk_path=settings.embedding_cache_path,
+            disk_max_entries=settings.embedding_cache_disk_max_entries
+        )
+
+    async def close(self) -> None:
+        """Close the underlying HTTP connection pool."""
+        await self.client.close()
+        self.embedding_cache.close()
+        logger.info("OpenAI client closed")
 
     async def get_embedding(self, text: str) -> List[float]:
         """
         Generate embedding vector for text using OpenAI.
 
+        Repeated queries (after whitespace/case normalization) are served
+        from the embedding cache without calling the API.
+
         Args:
             text: Input text to embed
 
@@ -38,12 +68,19 @@ class OpenAIService:
             Embedding vector as list of floats
         """
         try:
+            cache_key = EmbeddingCache.make_key(text, self.embedding_model, self.embedding_dimensions)
+            embedding = await self.embedding_cache.get(cache_key)
+            if embedding is not None:
+                logger.debug(f"Embedding cache hit for text of length {len(text)}")
+                return embedding
+
             response = await self.client.embeddings.create(
-                model="text-embedding-3-small",
+                model=self.embedding_model,
                 input=text,
-                dimensions=1024  # Match Pinecone index dimension
+                dimensions=self.embedding_dimensions
             )
             embedding = response.data[0].embedding
+            await self.embedding_cache.put(cache_key, embedding)
             logger.debug(f"Generated embedding for text of length {len(text)}")
             return embedding
         except Exception as e:
@@ -115,7 +152,9 @@ class OpenAIService:
             conversation_history: Previous messages for multi-turn support
 
         Yields:
-            Response chunks as they arrive
+            Response chunks as they arrive; closing the generator early (e.g.
+            when the client disconnected) closes the upstream stream, which
+            stops generation
         """
         try:
             # Format context from citations
@@ -138,9 +177,13 @@ class OpenAIService:
                 stream=True
             )
 
-            async for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+            try:
+                async for chunk in stream:
+                    if chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                # Shielded: a cancelled stream must still release its connection
+                await asyncio.shield(stream.close())
 
         except Exception as e:
             logger.error(f"Failed to generate streaming response: {str(e)}")
@@ -161,9 +204,9 @@ class OpenAIService:
         """
         try:
             response = await self.client.embeddings.create(
-                model="text-embedding-3-small",
+                model=self.embedding_model,
                 input=texts,
-                dimensions=1024  # Match Pinecone index dimension
+                dimensions=self.embedding_dimensions
             )
             embeddings = [item.embedding for item in response.data]
             logger.info(f"Generated {len(embeddings)} embeddings")
@@ -1,9 +1,13 @@
 """
 Pinecone vector database service for document retrieval.
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 from pinecone import Pinecone, ServerlessSpec
+import asyncio
 import logging
+import threading
 from app.config import Settings
 from app.models.schemas import Citation
 import uuid
@@ -12,7 +16,18 @@ logger = logging.getLogger(__name__)
 
 
 class PineconeService:
-    """Service for interacting with Pinecone vector database."""
+    """
+    Service for interacting with Pinecone vector database.
+
+    The Pinecone SDK is synchronous, so every network call is dispatched to a
+    bounded thread pool with a per-call timeout instead of blocking the event
+    loop (and every other request and SSE stream) for the round-trip.
+
+    A thread cannot be interrupted, so a call that times out keeps its worker
+    until the SDK returns. Such abandoned calls are counted, and once
+    `pinecone_max_abandoned_calls` of them are still running new calls fail
+    fast instead of queueing behind a stalled backend.
+    """
 
     def __init__(self, settings: Settings):
         """
@@ -25,7 +40,16 @@ class PineconeService:
         self.pc = Pinecone(api_key=settings.pinecone_api_key)
         self.index_name = settings.pinecone_index_name
         self.top_k = settings.pinecone_top_k
+        self.timeout = settings.pinecone_timeout_seconds
+        self.max_abandoned_calls = settings.pinecone_max_abandoned_calls
         self._index = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.pinecone_max_workers,
+            thread_name_prefix="pinecone"
+        )
+        # Timed-out calls still occupying a worker (released from the worker thread)
+        self.abandoned_calls = 0
+        self._abandoned_lock = threading.Lock()
 
     def get_index(self):
         """Get or create Pinecone index connection."""
@@ -38,6 +62,67 @@ class PineconeService:
                 raise
         return self._index
 
+    async def _run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking SDK call in the Pinecone thread pool.
+
+        Args:
+            func: Blocking callable
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Result of func
+
+        Raises:
+            TimeoutError: If the call does not finish within the configured
+                timeout, or too many timed-out calls are still running
+        """
+        if self.abandoned_calls >= self.max_abandoned_calls:
+            raise TimeoutError(f"Pinecone is not responding ({self.abandoned_calls} timed-out calls still running)")
+
+        future = self._executor.submit(partial(func, *args, **kwargs))
+        try:
+            # Shielded: on timeout the worker is tracked below, not orphaned
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            # A call still queued is dropped; a running one holds its worker until it returns
+            if not future.cancel():
+                self._abandon(future)
+            raise TimeoutError(f"Pinecone call timed out after {self.timeout}s")
+        except asyncio.CancelledError:
+            # The caller gave up (e.g. another chat stage failed); same as a timeout
+            if not future.cancel():
+                self._abandon(future)
+            raise
+
+    def _abandon(self, future: Future) -> None:
+        """Count a timed-out call until its worker thread is released."""
+        with self._abandoned_lock:
+            self.abandoned_calls += 1
+        logger.warning(f"Pinecone call abandoned ({self.abandoned_calls} still running)")
+
+        def release(_: Future) -> None:
+            with self._abandoned_lock:
+                self.abandoned_calls -= 1
+
+        future.add_done_callback(release)
+
+    async def get_index_async(self):
+        """Get the index handle without blocking the event loop on first connect."""
+        if self._index is None:
+            return await self._run(self.get_index)
+        return self._index
+
+    async def warm_up(self) -> None:
+        """Resolve the index handle so the first query does not pay for it."""
+        await self.get_index_async()
+
+    def close(self) -> None:
+        """Shut down the thread pool used for SDK calls."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("Pinecone executor shut down")
+
     async def query_documents(
         self,
         query_embedding: List[float],
@@ -56,7 +141,7 @@ class PineconeService:
             List of Citation objects with retrieved document information
         """
         try:
-            index = self.get_index()
+            index = await self.get_index_async()
             k = top_k or self.top_k
 
             # Build query parameters
@@ -72,7 +157,7 @@ class PineconeService:
                 logger.debug(f"Applying metadata filter: {metadata_filter}")
 
             # Execute query
-            results = index.query(**query_params)
+            results = await self._run(index.query, **query_params)
 
             # Convert results to Citation objects
             citations = []
@@ -81,6 +166,7 @@ class PineconeService:
 
                 citation = Citation(
                     id=f"cite_{i+1}",
+                    vector_id=match.id,
                     source_title=metadata.get("doc_title", metadata.get("source_title", metadata.get("title", "Unknown Source"))),
                     page_number=metadata.get("page_number", metadata.get("page", metadata.get("chunk_index"))),
                     chunk_text=metadata.get("text", metadata.get("content", metadata.get("chunk_text", ""))),
@@ -111,8 +197,8 @@ class PineconeService:
             Dict with upsert statistics
         """
         try:
-            index = self.get_index()
-            response = index.upsert(vectors=vectors, namespace=namespace)
+            index = await self.get_index_async()
+            response = await self._run(index.upsert, vectors=vectors, namespace=namespace)
             logger.info(f"Upserted {response.upserted_count} vectors to Pinecone")
             return {"upserted_count": response.upserted_count}
         except Exception as e:
@@ -132,8 +218,8 @@ class PineconeService:
             namespace: Optional namespace
         """
         try:
-            index = self.get_index()
-            index.delete(filter=metadata_filter, namespace=namespace)
+            index = await self.get_index_async()
+            await self._run(index.delete, filter=metadata_filter, namespace=namespace)
             logger.info(f"Deleted vectors matching filter: {metadata_filter}")
         except Exception as e:
             logger.error(f"Pinecone delete failed: {str(e)}")
@@ -0,0 +1,167 @@
+"""
+Semantic response cache keyed by agent and query-embedding similarity.
+
+Near-duplicate questions to the same agent ("How do PLC teams collaborate?"
+vs "How should PLC teams collaborate?") are answered from a prior response
+instead of re-running retrieval and the chat completion.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import time
+import numpy as np
+from app.models.schemas import Citation
+
+logger = logging.getLogger(__name__)
+
+
+class _AgentEntries:
+    """Fixed-capacity store of normalized query vectors and cached answers for one agent."""
+
+    def __init__(self, capacity: int, dimensions: int):
+        self.vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        self.valid = np.zeros(capacity, dtype=bool)
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        self.payloads: List[Optional[Tuple[str, List[Citation], float, str]]] = [None] * capacity
+
+
+class SemanticResponseCache:
+    """
+    Cache of (response, citations) pairs looked up by cosine similarity.
+
+    Entries expire after a TTL, are ignored once the corpus version they were
+    generated against changes, and the least recently used entry of an agent
+    is evicted when that agent's store is full.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.95,
+        max_entries_per_agent: int = 512,
+        ttl_seconds: float = 86400.0,
+        corpus_version: str = ""
+    ):
+        """
+        Initialize response cache.
+
+        Args:
+            similarity_threshold: Minimum cosine similarity for a hit
+            max_entries_per_agent: Capacity of each agent's store
+            ttl_seconds: Maximum age of a served answer
+            corpus_version: Version of the indexed corpus (entries from other versions are stale)
+        """
+        self.similarity_threshold = similarity_threshold
+        self.max_entries_per_agent = max_entries_per_agent
+        self.ttl_seconds = ttl_seconds
+        self.corpus_version = corpus_version
+        self._agents: Dict[str, _AgentEntries] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(
+        self,
+        agent_id: str,
+        query_embedding: List[float]
+    ) -> Optional[Tuple[str, List[Citation]]]:
+        """
+        Find a fresh cached answer for a similar query to the same agent.
+
+        Args:
+            agent_id: Agent the query is addressed to
+            query_embedding: Embedding of the query
+
+        Returns:
+            Tuple of (response_text, citations), or None on a miss
+        """
+        entries = self._agents.get(agent_id)
+        if entries is None or not entries.valid.any():
+            self.misses += 1
+            return None
+
+        now = time.time()
+        query = self._normalize(query_embedding)
+        scores = entries.vectors @ query
+        scores[~entries.valid] = -1.0
+
+        # Walk candidates above the threshold, best first, skipping stale ones
+        for slot in np.argsort(scores)[::-1]:
+            if scores[slot] < self.similarity_threshold:
+                break
+            response_text, citations, created_at, corpus_version = entries.payloads[slot]
+            if now - created_at > self.ttl_seconds or corpus_version != self.corpus_version:
+                entries.valid[slot] = False
+                entries.payloads[slot] = None
+                continue
+            entries.last_used[slot] = now
+            self.hits += 1
+            logger.info(
+                f"Semantic cache hit for agent '{agent_id}' (similarity {scores[slot]:.3f})"
+            )
+            return response_text, citations
+
+        self.misses += 1
+        return None
+
+    def store(
+        self,
+        agent_id: str,
+        query_embedding: List[float],
+        response_text: str,
+        citations: List[Citation]
+    ) -> None:
+        """
+        Cache a generated answer.
+
+        Args:
+            agent_id: Agent that produced the answer
+            query_embedding: Embedding of the query
+            response_text: Generated response
+            citations: Citations used for the response
+        """
+        entries = self._agents.get(agent_id)
+        if entries is None:
+            entries = _AgentEntries(self.max_entries_per_agent, len(query_embedding))
+            self._agents[agent_id] = entries
+
+        free = np.flatnonzero(~entries.valid)
+        if free.size:
+            slot = int(free[0])
+        else:
+            slot = int(np.argmin(entries.last_used))
+            self.evictions += 1
+
+        now = time.time()
+        entries.vectors[slot] = self._normalize(query_embedding)
+        entries.valid[slot] = True
+        entries.last_used[slot] = now
+        entries.payloads[slot] = (response_text, list(citations), now, self.corpus_version)
+
+    def invalidate(self, agent_id: Optional[str] = None) -> None:
+        """
+        Drop cached answers for one agent, or for all agents.
+
+        Args:
+            agent_id: Agent to clear (all agents if None)
+        """
+        if agent_id is None:
+            self._agents.clear()
+        else:
+            self._agents.pop(agent_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters and hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": {agent: int(e.valid.sum()) for agent, e in self._agents.items()},
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
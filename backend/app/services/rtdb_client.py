@@ -0,0 +1,456 @@
+"""
+Async client for the Firebase Realtime Database REST API.
+
+Replaces the blocking `firebase_admin.db` reference API on the request path:
+all calls go through one pooled (HTTP/2 when available) httpx client, so
+session reads and writes overlap with other requests instead of freezing
+the event loop.
+"""
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Token refresh margin before the OAuth2 access token actually expires
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+# Alphabet of Firebase push IDs, in ASCII order so keys sort chronologically
+PUSH_CHARS = '-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz'
+
+_push_lock = threading.Lock()
+_last_push_time = 0
+_last_random_chars: List[int] = []
+
+
+class RealtimeDatabaseError(Exception):
+    """Raised when the Realtime Database REST API returns an error."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class PreconditionFailedError(RealtimeDatabaseError):
+    """Raised when a conditional write loses against a concurrent change."""
+
+    def __init__(self, message: str, etag: Optional[str] = None, value: Any = None):
+        super().__init__(message, status_code=412)
+        self.etag = etag
+        self.value = value
+
+
+class ServiceAccountTokenProvider:
+    """Supplies cached OAuth2 access tokens for a firebase_admin credential."""
+
+    def __init__(self, credential):
+        """
+        Initialize token provider.
+
+        Args:
+            credential: firebase_admin credentials.Certificate instance
+        """
+        self.credential = credential
+        self._token: Optional[str] = None
+        self._expiry: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+
+    async def __call__(self) -> str:
+        """Return a valid access token, refreshing it off-loop when needed."""
+        if self._token and self._expiry and datetime.utcnow() < self._expiry - TOKEN_REFRESH_MARGIN:
+            return self._token
+
+        async with self._lock:
+            # Another request may have refreshed while we waited for the lock
+            if self._token and self._expiry and datetime.utcnow() < self._expiry - TOKEN_REFRESH_MARGIN:
+                return self._token
+
+            token_info = await asyncio.to_thread(self.credential.get_access_token)
+            self._token = token_info.access_token
+            self._expiry = token_info.expiry or (datetime.utcnow() + timedelta(minutes=30))
+            logger.info("Refreshed Realtime Database access token")
+            return self._token
+
+
+class RealtimeDatabaseClient:
+    """Pooled async client for the Realtime Database REST API."""
+
+    def __init__(
+        self,
+        database_url: str,
+        token_provider: Optional[Callable[[], Awaitable[Optional[str]]]] = None,
+        namespace: Optional[str] = None,
+        http2: bool = True,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 10.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        """
+        Initialize Realtime Database client.
+
+        Args:
+            database_url: Database base URL (or emulator URL)
+            token_provider: Async callable returning an OAuth2 access token
+            namespace: Database namespace (required by the local emulator)
+            http2: Use HTTP/2 multiplexing when the `h2` package is installed
+            max_connections: Connection pool size
+            max_keepalive_connections: Idle keep-alive connections to retain
+            keepalive_expiry: Seconds an idle connection is kept open
+            timeout: Per-request timeout in seconds
+            transport: Optional custom transport (e.g. a local stand-in server)
+        """
+        self.database_url = database_url.rstrip('/')
+        self.token_provider = token_provider
+        self.namespace = namespace
+
+        if http2 and transport is None:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("h2 not installed; Realtime Database client falling back to HTTP/1.1")
+                http2 = False
+
+        self.client = httpx.AsyncClient(
+            base_url=self.database_url,
+            http2=http2 and transport is None,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry
+            ),
+            timeout=timeout,
+            transport=transport
+        )
+
+    async def close(self) -> None:
+        """Close the underlying connection pool."""
+        await self.client.aclose()
+
+    @staticmethod
+    def _path(path: str) -> str:
+        """Convert a database path to its REST resource path."""
+        return "/" + path.strip('/') + ".json"
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, str]] = None,
+        json_body: Any = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> httpx.Response:
+        """Send an authenticated request and raise on error responses."""
+        params = dict(params or {})
+        if self.namespace:
+            params['ns'] = self.namespace
+
+        headers = dict(headers or {})
+        if self.token_provider is not None:
+            token = await self.token_provider()
+            if token:
+                headers['Authorization'] = f"Bearer {token}"
+
+        content = None
+        if json_body is not None:
+            content = json.dumps(json_body, separators=(',', ':'))
+            headers['Content-Type'] = 'application/json'
+
+        response = await self.client.request(
+            method,
+            self._path(path),
+            params=params,
+            content=content,
+            headers=headers
+        )
+
+        if response.status_code == 412:
+            raise PreconditionFailedError(
+                f"Conditional {method} on '{path}' failed: data changed",
+                etag=response.headers.get('ETag'),
+                value=response.json() if response.content else None
+            )
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get('error', response.text)
+            except ValueError:
+                detail = response.text
+            raise RealtimeDatabaseError(
+                f"{method} '{path}' failed ({response.status_code}): {detail}",
+                status_code=response.status_code
+            )
+        return response
+
+    @staticmethod
+    def _query_params(
+        shallow: bool = False,
+        order_by: Optional[str] = None,
+        limit_to_first: Optional[int] = None,
+        limit_to_last: Optional[int] = None,
+        start_at: Any = None,
+        end_at: Any = None,
+        equal_to: Any = None
+    ) -> Dict[str, str]:
+        """Build REST query parameters (constraint values are JSON-encoded)."""
+        params = {}
+        if shallow:
+            params['shallow'] = 'true'
+        if order_by is not None:
+            params['orderBy'] = json.dumps(order_by)
+        if limit_to_first is not None:
+            params['limitToFirst'] = str(limit_to_first)
+        if limit_to_last is not None:
+            params['limitToLast'] = str(limit_to_last)
+        if start_at is not None:
+            params['startAt'] = json.dumps(start_at)
+        if end_at is not None:
+            params['endAt'] = json.dumps(end_at)
+        if equal_to is not None:
+            params['equalTo'] = json.dumps(equal_to)
+        return params
+
+    async def get(self, path: str, shallow: bool = False) -> Any:
+        """
+        Read the value at a path.
+
+        Args:
+            path: Database path
+            shallow: Return only the immediate child keys (values become True)
+
+        Returns:
+            Decoded JSON value, or None if nothing exists at the path
+        """
+        response = await self._request('GET', path, params=self._query_params(shallow=shallow))
+        return response.json()
+
+    async def get_with_etag(self, path: str) -> Tuple[Any, str]:
+        """
+        Read the value at a path together with its ETag.
+
+        Args:
+            path: Database path
+
+        Returns:
+            Tuple of (value, etag) for use with a conditional set()
+        """
+        response = await self._request('GET', path, headers={'X-Firebase-ETag': 'true'})
+        return response.json(), response.headers.get('ETag')
+
+    async def query(
+        self,
+        path: str,
+        order_by: str,
+        limit_to_first: Optional[int] = None,
+        limit_to_last: Optional[int] = None,
+        start_at: Any = None,
+        end_at: Any = None,
+        equal_to: Any = None
+    ) -> List[Tuple[str, Any]]:
+        """
+        Run an ordered, optionally limited/ranged query on a path's children.
+
+        The REST API filters server-side but returns an unordered JSON object,
+        so the results are re-sorted here.
+
+        Args:
+            path: Database path whose children are queried
+            order_by: "$key", "$value", or a child key (needs an .indexOn rule)
+            limit_to_first: Keep only the first N children in order
+            limit_to_last: Keep only the last N children in order
+            start_at: Inclusive lower bound on the ordered value
+            end_at: Inclusive upper bound on the ordered value
+            equal_to: Exact match on the ordered value
+
+        Returns:
+            List of (key, value) tuples in query order
+        """
+        params = self._query_params(
+            order_by=order_by,
+            limit_to_first=limit_to_first,
+            limit_to_last=limit_to_last,
+            start_at=start_at,
+            end_at=end_at,
+            equal_to=equal_to
+        )
+        response = await self._request('GET', path, params=params)
+        data = response.json() or {}
+        if isinstance(data, list):
+            data = {str(i): v for i, v in enumerate(data) if v is not None}
+
+        if order_by == '$key':
+            sort_key = lambda item: key_order(item[0])
+        elif order_by == '$value':
+            sort_key = lambda item: _order_value(item[1])
+        else:
+            sort_key = lambda item: _order_value(
+                item[1].get(order_by) if isinstance(item[1], dict) else None
+            )
+        return sorted(data.items(), key=lambda item: (sort_key(item), key_order(item[0])))
+
+    async def paginate(
+        self,
+        path: str,
+        order_by: str = '$key',
+        page_size: int = 500,
+        start_at: Any = None,
+        end_at: Any = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Iterate over a path's children in query order, one bounded page at a time.
+
+        Each page is an orderBy/startAt/limitToFirst query continuing from the
+        last ordered value seen; children at that boundary value are skipped
+        when the next page repeats them (startAt is inclusive). The REST API
+        cannot break ties by key, so a page whose children all share the
+        boundary value is refetched twice as large until it gets past them.
+
+        Args:
+            path: Database path whose children are iterated
+            order_by: "$key", "$value", or a child key (needs an .indexOn rule)
+            page_size: Children fetched per request
+            start_at: Inclusive lower bound on the ordered value
+            end_at: Inclusive upper bound on the ordered value
+
+        Yields:
+            (key, value) tuples in query order
+        """
+        def ordered_value(key: str, value: Any) -> Any:
+            if order_by == '$key':
+                return key
+            if order_by == '$value':
+                return value
+            return value.get(order_by) if isinstance(value, dict) else None
+
+        cursor = start_at
+        limit = page_size
+        boundary: set = set()
+        while True:
+            page = await self.query(
+                path,
+                order_by=order_by,
+                limit_to_first=limit,
+                start_at=cursor,
+                end_at=end_at
+            )
+            for key, value in page:
+                if key not in boundary:
+                    yield key, value
+            if len(page) < limit:
+                return
+
+            last = ordered_value(*page[-1])
+            # Whole page at the cursor value: widen it instead of stalling
+            limit = limit * 2 if last == cursor else page_size
+            cursor = last
+            boundary = {key for key, value in page if ordered_value(key, value) == cursor}
+
+    async def set(self, path: str, value: Any, etag: Optional[str] = None) -> None:
+        """
+        Overwrite the value at a path.
+
+        Args:
+            path: Database path
+            value: JSON-serializable value
+            etag: Only write if the current ETag matches (optimistic concurrency)
+
+        Raises:
+            PreconditionFailedError: If etag no longer matches the stored data
+        """
+        headers = {'if-match': etag} if etag else None
+        await self._request('PUT', path, params={'print': 'silent'}, json_body=value, headers=headers)
+
+    async def update(self, path: str, values: Dict[str, Any]) -> None:
+        """
+        Atomically write several children, possibly at nested relative paths.
+
+        Args:
+            path: Base database path ("" for the root)
+            values: Mapping of relative path -> value (None deletes)
+        """
+        await self._request('PATCH', path, params={'print': 'silent'}, json_body=values)
+
+    async def push(self, path: str, value: Any) -> str:
+        """
+        Append a child under a server-generated, chronologically ordered key.
+
+        Args:
+            path: Database path of the list
+            value: JSON-serializable value
+
+        Returns:
+            Generated child key
+        """
+        response = await self._request('POST', path, json_body=value)
+        return response.json()['name']
+
+    async def delete(self, path: str) -> None:
+        """
+        Delete the value at a path.
+
+        Args:
+            path: Database path
+        """
+        await self._request('DELETE', path, params={'print': 'silent'})
+
+
+def _order_value(value: Any) -> tuple:
+    """Sort key mirroring Realtime Database ordering: null < bool < number < string < object."""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, str):
+        return (3, value)
+    return (4, 0)
+
+
+def key_order(key: str) -> tuple:
+    """Sort key mirroring Realtime Database key ordering: integer keys first, then strings."""
+    if key.isdigit() and len(key) < 11:
+        return (0, int(key), '')
+    return (1, 0, key)
+
+
+def generate_push_id() -> str:
+    """
+    Generate a Firebase-compatible push ID without a round-trip.
+
+    Like server-side push keys, IDs start with the millisecond timestamp and
+    sort chronologically; IDs generated within the same millisecond increment
+    the random suffix, so they still sort in generation order. This lets
+    several children be created in one multi-path update.
+
+    Returns:
+        20-character push ID
+    """
+    global _last_push_time, _last_random_chars
+
+    with _push_lock:
+        now = int(time.time() * 1000)
+        if now == _last_push_time:
+            # Same millisecond: increment the previous random suffix
+            i = len(_last_random_chars) - 1
+            while i >= 0 and _last_random_chars[i] == 63:
+                _last_random_chars[i] = 0
+                i -= 1
+            if i >= 0:
+                _last_random_chars[i] += 1
+        else:
+            _last_random_chars = [random.randrange(64) for _ in range(12)]
+        _last_push_time = now
+
+        timestamp_chars = []
+        for _ in range(8):
+            timestamp_chars.append(PUSH_CHARS[now % 64])
+            now //= 64
+
+        return ''.join(reversed(timestamp_chars)) + ''.join(PUSH_CHARS[c] for c in _last_random_chars)
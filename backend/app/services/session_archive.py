@@ -0,0 +1,210 @@
+"""
+Cold-session archive: compressed JSONL blobs outside the Realtime Database.
+
+Sessions not accessed for `session_retention_days` are moved out of
+`/sessions/{user_id}` by `SessionRetentionJob` (session_retention.py), so
+the hot tree (and every read that walks it) stays bounded by recent
+activity. Their index entry stays behind as a stub marked `archived`, and
+FirebaseService rehydrates a session from its blob the first time it is
+opened again.
+
+Blob layout (one gzip-compressed JSONL file per session):
+
+    {root}/{user_id}/{session_id}.jsonl.gz
+        line 1:  session fields (without messages)
+        line 2+: {"key": <message key>, "message": <stored message>}
+
+The root is either a Cloud Storage location (`gs://bucket/prefix`) or a
+local directory. Archived sessions exist nowhere else, so the root must be
+durable and shared by every instance: on Cloud Run the container filesystem
+is per instance and lost on shutdown, and `open_session_archive` refuses a
+local directory there unless it is a mounted volume.
+"""
+from typing import Any, Dict, Optional
+from pathlib import Path
+import asyncio
+import gzip
+import json
+import logging
+import os
+from app.services.rtdb_client import key_order
+
+logger = logging.getLogger(__name__)
+
+
+class SessionArchiveStore:
+    """Reads and writes archived sessions as gzip-compressed JSONL files."""
+
+    def __init__(self, root_dir: str, compress_level: int = 6):
+        """
+        Initialize archive store.
+
+        Args:
+            root_dir: Archive root directory (must be durable, see module docstring)
+            compress_level: gzip compression level
+        """
+        self.root = Path(root_dir)
+        self.compress_level = compress_level
+
+    @staticmethod
+    def _name(user_id: str, session_id: str) -> str:
+        return f"{user_id}/{session_id}.jsonl.gz"
+
+    def _path(self, user_id: str, session_id: str) -> Path:
+        return self.root / self._name(user_id, session_id)
+
+    def _encode(self, session_data: Dict[str, Any]) -> bytes:
+        messages = session_data.get('messages') or {}
+        if isinstance(messages, list):
+            messages = {str(i): message for i, message in enumerate(messages)}
+        header = {k: v for k, v in session_data.items() if k != 'messages'}
+        lines = [json.dumps(header, separators=(',', ':'))]
+        lines.extend(
+            json.dumps({"key": key, "message": messages[key]}, separators=(',', ':'))
+            for key in sorted(messages, key=key_order) if messages[key]
+        )
+        return gzip.compress(("\n".join(lines) + "\n").encode("utf-8"), compresslevel=self.compress_level)
+
+    @staticmethod
+    def _decode(blob: bytes) -> Dict[str, Any]:
+        lines = gzip.decompress(blob).decode("utf-8").splitlines()
+        session_data = json.loads(lines[0])
+        session_data['messages'] = {}
+        for line in lines[1:]:
+            record = json.loads(line)
+            session_data['messages'][record['key']] = record['message']
+        return session_data
+
+    def _write(self, user_id: str, session_id: str, session_data: Dict[str, Any]) -> int:
+        path = self._path(user_id, session_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        blob = self._encode(session_data)
+        # Write to a temporary file first so readers never see a partial blob
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(blob)
+        tmp.replace(path)
+        return len(blob)
+
+    def _read(self, user_id: str, session_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self._decode(self._path(user_id, session_id).read_bytes())
+        except FileNotFoundError:
+            return None
+
+    def _delete(self, user_id: str, session_id: str) -> None:
+        try:
+            os.remove(self._path(user_id, session_id))
+        except FileNotFoundError:
+            pass
+
+    async def write(self, user_id: str, session_id: str, session_data: Dict[str, Any]) -> int:
+        """
+        Archive a full stored session.
+
+        Args:
+            user_id: User ID who owns the session
+            session_id: Session ID
+            session_data: Session as stored in the database (with messages)
+
+        Returns:
+            Compressed size in bytes
+        """
+        return await asyncio.to_thread(self._write, user_id, session_id, session_data)
+
+    async def read(self, user_id: str, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Read an archived session.
+
+        Args:
+            user_id: User ID who owns the session
+            session_id: Session ID
+
+        Returns:
+            Session in its stored shape (messages keyed as before), or None
+        """
+        return await asyncio.to_thread(self._read, user_id, session_id)
+
+    async def delete(self, user_id: str, session_id: str) -> None:
+        """
+        Remove an archived session (missing blobs are ignored).
+
+        Args:
+            user_id: User ID who owns the session
+            session_id: Session ID
+        """
+        await asyncio.to_thread(self._delete, user_id, session_id)
+
+
+class GCSSessionArchiveStore(SessionArchiveStore):
+    """Archive store backed by a Cloud Storage bucket (shared by all instances)."""
+
+    def __init__(self, location: str, compress_level: int = 6):
+        """
+        Initialize archive store.
+
+        Args:
+            location: `gs://bucket` or `gs://bucket/prefix`
+            compress_level: gzip compression level
+        """
+        from firebase_admin import storage
+
+        bucket, _, prefix = location[len("gs://"):].partition("/")
+        self.bucket = storage.bucket(bucket)
+        self.prefix = prefix.strip("/")
+        self.compress_level = compress_level
+
+    def _blob(self, user_id: str, session_id: str):
+        name = self._name(user_id, session_id)
+        return self.bucket.blob(f"{self.prefix}/{name}" if self.prefix else name)
+
+    def _write(self, user_id: str, session_id: str, session_data: Dict[str, Any]) -> int:
+        blob = self._encode(session_data)
+        # Object uploads are atomic, so readers never see a partial blob
+        self._blob(user_id, session_id).upload_from_string(blob, content_type="application/gzip")
+        return len(blob)
+
+    def _read(self, user_id: str, session_id: str) -> Optional[Dict[str, Any]]:
+        from google.api_core.exceptions import NotFound
+
+        try:
+            return self._decode(self._blob(user_id, session_id).download_as_bytes())
+        except NotFound:
+            return None
+
+    def _delete(self, user_id: str, session_id: str) -> None:
+        from google.api_core.exceptions import NotFound
+
+        try:
+            self._blob(user_id, session_id).delete()
+        except NotFound:
+            pass
+
+
+def _on_mounted_volume(path: Path) -> bool:
+    """Whether a path lies on a mounted volume (not the container's root filesystem)."""
+    path = path.resolve()
+    return any(os.path.ismount(parent) for parent in [path, *path.parents] if parent != Path(path.anchor))
+
+
+def open_session_archive(location: str) -> SessionArchiveStore:
+    """
+    Open the archive store for `session_archive_dir`.
+
+    Args:
+        location: `gs://bucket[/prefix]` or a local directory
+
+    Returns:
+        Archive store
+
+    Raises:
+        ValueError: For a local directory on Cloud Run that is not a mounted
+            volume (blobs written there would be lost with the instance)
+    """
+    if location.startswith("gs://"):
+        return GCSSessionArchiveStore(location)
+    if os.environ.get("K_SERVICE") and not _on_mounted_volume(Path(location)):
+        raise ValueError(
+            f"SESSION_ARCHIVE_DIR={location} is on the instance's ephemeral filesystem; "
+            "use a gs:// location or a mounted Cloud Storage volume"
+        )
+    return SessionArchiveStore(location)
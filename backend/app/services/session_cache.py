@@ -0,0 +1,147 @@
+"""
+Write-through cache of recent conversation history per session.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import time
+
+
+class SessionHistoryCache:
+    """
+    LRU cache of the last messages of recently active sessions.
+
+    Holds only the tail window needed to build conversation history. The
+    worker that saves a turn appends it here, so follow-up questions need no
+    message read. Each entry records the session's message count; callers
+    pass the current count from the session index, so a tail extended by
+    another worker is detected and re-read instead of served stale. Entries
+    also expire after a TTL.
+    """
+
+    def __init__(self, max_sessions: int = 1024, window: int = 4, ttl_seconds: float = 600.0):
+        """
+        Initialize session history cache.
+
+        Args:
+            max_sessions: Maximum number of cached sessions (least recently used evicted)
+            window: Number of most recent messages kept per session
+            ttl_seconds: How long an entry is trusted after it was loaded
+        """
+        self.max_sessions = max_sessions
+        self.window = window
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], tuple[float, List[Any], Optional[int]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale = 0
+
+    def get(self, user_id: str, session_id: str, message_count: Optional[int] = None) -> Optional[List[Any]]:
+        """
+        Get the cached message tail of a session.
+
+        Args:
+            user_id: User ID who owns the session
+            session_id: Session ID
+            message_count: Current message count of the session; an entry
+                cached at a different count is stale and dropped
+
+        Returns:
+            Copy of the cached messages (oldest first), or None on a miss
+        """
+        key = (user_id, session_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, messages, count = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        if message_count is not None and count != message_count:
+            del self._entries[key]
+            self.stale += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return list(messages)
+
+    def put(
+        self,
+        user_id: str,
+        session_id: str,
+        messages: List[Any],
+        message_count: Optional[int] = None
+    ) -> List[Any]:
+        """
+        Cache the complete recent history of a session (keeps the tail window).
+
+        Args:
+            user_id: User ID who owns the session
+            session_id: Session ID
+            messages: Most recent messages, oldest first
+            message_count: Message count of the session the tail was read at
+                (None if unknown: the entry then fails every count check)
+
+        Returns:
+            Copy of the cached tail
+        """
+        key = (user_id, session_id)
+        tail = list(messages[-self.window:]) if self.window else []
+        self._entries[key] = (time.time() + self.ttl_seconds, tail, message_count)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_sessions:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return list(tail)
+
+    def append(self, user_id: str, session_id: str, messages: List[Any]) -> None:
+        """
+        Append newly written messages to a cached session.
+
+        Sessions that are not cached are left alone: a partial tail would be
+        mistaken for the full recent history.
+
+        Args:
+            user_id: User ID who owns the session
+            session_id: Session ID
+            messages: Messages just written, oldest first
+        """
+        entry = self._entries.get((user_id, session_id))
+        if entry is None:
+            return
+        expires_at, cached, count = entry
+        tail = (cached + list(messages))[-self.window:] if self.window else []
+        count = count + len(messages) if count is not None else None
+        self._entries[(user_id, session_id)] = (expires_at, tail, count)
+
+    def invalidate(self, user_id: str, session_id: str) -> None:
+        """
+        Drop a session from the cache.
+
+        Args:
+            user_id: User ID who owns the session
+            session_id: Session ID
+        """
+        self._entries.pop((user_id, session_id), None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters and hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_sessions": self.max_sessions,
+            "window": self.window,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "stale": self.stale,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
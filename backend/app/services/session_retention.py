@@ -0,0 +1,117 @@
+"""
+Retention job that moves cold sessions out of the hot database tree.
+"""
+from typing import Any, Dict, Optional, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import logging
+from app.services.firebase_service import FirebaseService
+from app.services.rtdb_client import PreconditionFailedError
+
+logger = logging.getLogger(__name__)
+
+
+class SessionRetentionJob:
+    """Moves sessions idle for longer than the retention period into the archive."""
+
+    def __init__(
+        self,
+        firebase_service: FirebaseService,
+        retention_days: int,
+        page_size: int = 200,
+        concurrency: int = 8
+    ):
+        """
+        Initialize retention job.
+
+        Args:
+            firebase_service: Firebase service configured with an archive store
+            retention_days: Sessions not accessed for this many days are archived
+            page_size: Index entries fetched per query
+            concurrency: Sessions archived concurrently
+        """
+        if firebase_service.archive is None:
+            raise ValueError("SESSION_ARCHIVE_DIR must be set to archive sessions")
+        self.firebase_service = firebase_service
+        self.rtdb = firebase_service.rtdb
+        self.archive = firebase_service.archive
+        self.retention_days = retention_days
+        self.page_size = page_size
+        self.concurrency = concurrency
+
+    async def _archive_session(self, user_id: str, session_id: str) -> Tuple[bool, int]:
+        """
+        Archive one session; returns (archived, compressed bytes).
+
+        The session is removed from the hot tree with an ETag-conditional
+        write, so a message appended after it was read keeps it hot.
+        """
+        session_path = f'sessions/{user_id}/{session_id}'
+        index_path = f'session_index/{user_id}/{session_id}'
+
+        session_data, etag = await self.rtdb.get_with_etag(session_path)
+        if not session_data or 'session_id' not in session_data:
+            return False, 0
+
+        size = await self.archive.write(user_id, session_id, session_data)
+        # Mark the stub first: readers prefer hot data, so a crash before the
+        # delete only leaves a hot copy behind (merged back by the next append)
+        await self.rtdb.update(index_path, {
+            'archived': True,
+            'archived_at': datetime.utcnow().isoformat()
+        })
+        try:
+            await self.rtdb.set(session_path, None, etag=etag)
+        except PreconditionFailedError:
+            await self.rtdb.update(index_path, {'archived': None, 'archived_at': None})
+            await self.archive.delete(user_id, session_id)
+            return False, 0
+
+        self.firebase_service.session_cache.invalidate(user_id, session_id)
+        return True, size
+
+    async def run(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Archive every session whose last access is older than the cutoff.
+
+        Args:
+            now: Reference time (defaults to the current UTC time)
+
+        Returns:
+            Summary with the cutoff, sessions archived and bytes written
+        """
+        try:
+            cutoff = ((now or datetime.utcnow()) - timedelta(days=self.retention_days)).isoformat()
+            user_ids = sorted((await self.rtdb.get('sessions', shallow=True) or {}).keys())
+            semaphore = asyncio.Semaphore(self.concurrency)
+            archived = 0
+            archived_bytes = 0
+
+            async def archive(user_id: str, session_id: str) -> Tuple[bool, int]:
+                async with semaphore:
+                    return await self._archive_session(user_id, session_id)
+
+            for user_id in user_ids:
+                await self.firebase_service.rebuild_session_index(user_id, only_missing=True)
+                candidates = []
+                async for session_id, entry in self.rtdb.paginate(
+                    f'session_index/{user_id}',
+                    order_by='last_accessed',
+                    page_size=self.page_size,
+                    end_at=cutoff
+                ):
+                    if isinstance(entry, dict) and not entry.get('archived'):
+                        candidates.append(session_id)
+
+                for done, size in await asyncio.gather(*(
+                    archive(user_id, session_id) for session_id in candidates
+                )):
+                    archived += done
+                    archived_bytes += size
+
+            logger.info(f"Archived {archived} sessions not accessed since {cutoff} ({archived_bytes} bytes)")
+            return {"cutoff": cutoff, "archived": archived, "bytes": archived_bytes}
+
+        except Exception as e:
+            logger.error(f"Session retention failed: {str(e)}")
+            raise
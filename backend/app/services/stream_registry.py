@@ -0,0 +1,293 @@
+"""
+In-memory buffers that make streamed chat answers resumable.
+
+Each streamed answer is produced by a task detached from the HTTP response
+and written into a StreamBuffer keyed by its message_id. Responses subscribe
+to the buffer, so a client that lost its connection can reconnect with
+`Last-Event-ID` and receive only the frames it missed before following the
+live stream; no embedding, retrieval or completion is repeated.
+
+Event IDs are "{message_id}:{seq}". Buffers live in this worker's memory, so
+reconnects must reach the same worker (sticky sessions behind a balancer).
+"""
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+from collections import OrderedDict, deque
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StreamBuffer:
+    """Frames of one streamed answer, kept for replay to reconnecting clients."""
+
+    def __init__(
+        self,
+        message_id: str,
+        user_id: str,
+        max_frames: int = 2048,
+        grace_seconds: float = 2.0
+    ):
+        """
+        Initialize stream buffer.
+
+        Args:
+            message_id: ID of the streamed answer
+            user_id: Owner; only they may subscribe
+            max_frames: Frames retained for replay (older frames are dropped)
+            grace_seconds: How long the producer keeps running once the
+                last subscriber has gone
+        """
+        self.message_id = message_id
+        self.user_id = user_id
+        self.grace_seconds = grace_seconds
+        self._frames: Deque[Tuple[int, bytes]] = deque(maxlen=max_frames)
+        self._last_seq = 0
+        self._changed = asyncio.Event()
+        self.finished = False
+        self.finished_at: Optional[float] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        # Why the producer was cancelled: "disconnected", "client" or "shutdown"
+        self.cancel_reason: Optional[str] = None
+        self._grace: Optional[asyncio.TimerHandle] = None
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.message_id}:{seq}"
+
+    def append(self, frame: bytes) -> None:
+        """
+        Add an SSE frame, prefixed with its event ID.
+
+        Args:
+            frame: Encoded `data:` frame
+        """
+        self._last_seq += 1
+        self._frames.append((self._last_seq, f"id: {self.event_id(self._last_seq)}\n".encode() + frame))
+        self._wake()
+
+    def finish(self) -> None:
+        """Mark the stream complete (no more frames)."""
+        if self.finished:
+            return
+        self.finished = True
+        self.finished_at = time.monotonic()
+        self._cancel_grace()
+        self._wake()
+
+    def _wake(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def frames_after(self, seq: int) -> Optional[List[Tuple[int, bytes]]]:
+        """
+        Get the frames after a sequence number.
+
+        Args:
+            seq: Last sequence number the client received (0 for none)
+
+        Returns:
+            Frames in order, or None if some were already dropped
+        """
+        if self._frames and self._frames[0][0] > seq + 1:
+            return None
+        return [(s, frame) for s, frame in self._frames if s > seq]
+
+    async def subscribe(
+        self,
+        after_seq: int = 0,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Replay frames after `after_seq`, then follow the live stream.
+
+        Args:
+            after_seq: Last sequence number the client received
+            is_disconnected: Checked while waiting; ends the subscription early
+
+        Yields:
+            Encoded SSE frames
+        """
+        self.attach()
+        try:
+            seq = after_seq
+            while True:
+                changed = self._changed
+                frames = self.frames_after(seq)
+                if frames is None:
+                    raise LookupError(f"Stream {self.message_id} no longer has frames after {seq}")
+                for seq, frame in frames:
+                    yield frame
+                if self.finished and seq >= self._last_seq:
+                    return
+                await changed.wait()
+                if is_disconnected is not None and await is_disconnected():
+                    return
+        finally:
+            self.detach()
+
+    def attach(self) -> None:
+        """Register a subscriber (stops a pending grace-period cancel)."""
+        self.subscribers += 1
+        self._cancel_grace()
+
+    def detach(self) -> None:
+        """Unregister a subscriber; the last one starts the grace period."""
+        self.subscribers -= 1
+        if self.subscribers == 0 and not self.finished and self.task is not None:
+            if self.grace_seconds <= 0:
+                self.cancel("disconnected")
+            else:
+                self._grace = asyncio.get_running_loop().call_later(
+                    self.grace_seconds, self.cancel, "disconnected"
+                )
+
+    def cancel(self, reason: str) -> None:
+        """
+        Stop the producer of an unfinished stream.
+
+        Args:
+            reason: Recorded in `cancel_reason` ("disconnected", "client", "shutdown")
+        """
+        if self.finished or self.task is None or self.task.done():
+            return
+        self.cancel_reason = self.cancel_reason or reason
+        self.task.cancel()
+
+    def _cancel_grace(self) -> None:
+        if self._grace is not None:
+            self._grace.cancel()
+            self._grace = None
+
+
+class StreamRegistry:
+    """Bounded set of in-flight and recently finished stream buffers."""
+
+    def __init__(
+        self,
+        max_streams: int = 256,
+        retention_seconds: float = 60.0,
+        grace_seconds: float = 2.0,
+        max_frames: int = 2048,
+        resumable: bool = True
+    ):
+        """
+        Initialize stream registry.
+
+        Args:
+            max_streams: Buffers kept at most (oldest evicted first)
+            retention_seconds: How long finished answers stay resumable
+            grace_seconds: How long generation continues with no client attached
+            max_frames: Frames retained per answer
+            resumable: Whether clients may reattach; without resume nobody
+                can come back, so generation stops as soon as the client leaves
+        """
+        self.max_streams = max_streams
+        self.retention_seconds = retention_seconds
+        self.grace_seconds = grace_seconds if resumable else 0.0
+        self.resumable = resumable
+        self.max_frames = max_frames
+        self._streams: "OrderedDict[str, StreamBuffer]" = OrderedDict()
+        # Producers outlive their responses (and may outlive eviction)
+        self._tasks: Set[asyncio.Task] = set()
+        self.started = 0
+        self.resumed = 0
+        self.resume_misses = 0
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for message_id, buffer in list(self._streams.items()):
+            if buffer.finished and now - buffer.finished_at > self.retention_seconds:
+                del self._streams[message_id]
+        while len(self._streams) > self.max_streams:
+            # Subscribers keep their buffer; it is just no longer resumable
+            self._streams.popitem(last=False)
+
+    def start(
+        self,
+        message_id: str,
+        user_id: str,
+        produce: Callable[[StreamBuffer], Awaitable[None]]
+    ) -> StreamBuffer:
+        """
+        Create a buffer and run its producer as a detached task.
+
+        Args:
+            message_id: ID of the streamed answer
+            user_id: Owner of the stream
+            produce: Coroutine function that appends frames to the buffer
+
+        Returns:
+            The new StreamBuffer
+        """
+        buffer = StreamBuffer(
+            message_id, user_id, max_frames=self.max_frames, grace_seconds=self.grace_seconds
+        )
+
+        async def run() -> None:
+            try:
+                await produce(buffer)
+            finally:
+                buffer.finish()
+
+        buffer.task = asyncio.create_task(run())
+        self._tasks.add(buffer.task)
+        buffer.task.add_done_callback(self._tasks.discard)
+        self._streams[message_id] = buffer
+        self.started += 1
+        self._evict()
+        return buffer
+
+    def get(self, message_id: str, user_id: str) -> Optional[StreamBuffer]:
+        """
+        Look up a resumable stream owned by a user.
+
+        Args:
+            message_id: ID of the streamed answer
+            user_id: Requesting user
+
+        Returns:
+            StreamBuffer, or None if unknown, expired or owned by someone else
+        """
+        self._evict()
+        buffer = self._streams.get(message_id) if self.resumable else None
+        if buffer is None or buffer.user_id != user_id:
+            self.resume_misses += 1
+            return None
+        self.resumed += 1
+        return buffer
+
+    @staticmethod
+    def parse_event_id(last_event_id: Optional[str]) -> Optional[Tuple[str, int]]:
+        """
+        Split a `Last-Event-ID` into (message_id, seq).
+
+        Args:
+            last_event_id: Header value
+
+        Returns:
+            Tuple, or None if the value is missing or malformed
+        """
+        if not last_event_id:
+            return None
+        message_id, _, seq = last_event_id.rpartition(":")
+        if not message_id or not seq.isdigit():
+            return None
+        return message_id, int(seq)
+
+    async def close(self) -> None:
+        """Stop in-flight producers and wait for their saves (on shutdown)."""
+        for buffer in self._streams.values():
+            buffer.cancel("shutdown")
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Buffer and resume counters."""
+        return {
+            "buffered": len(self._streams),
+            "active": sum(1 for b in self._streams.values() if not b.finished),
+            "started": self.started,
+            "resumed": self.resumed,
+            "resume_misses": self.resume_misses,
+        }
@@ -0,0 +1,98 @@
+"""
+Bounded cache of verified Firebase ID tokens.
+"""
+from typing import Any, Dict, Optional
+from collections import OrderedDict
+import hashlib
+import time
+
+
+class VerifiedTokenCache:
+    """
+    LRU cache mapping a token hash to its verified claims.
+
+    Entries expire at the token's own `exp` claim, optionally capped by a
+    shorter TTL (used when revocation checks are enabled so a revoked token
+    is noticed within that window). Raw tokens are never stored.
+    """
+
+    def __init__(self, max_size: int = 1024, max_ttl_seconds: Optional[float] = None):
+        """
+        Initialize token cache.
+
+        Args:
+            max_size: Maximum number of cached tokens (least recently used evicted)
+            max_ttl_seconds: Optional upper bound on how long an entry is trusted
+        """
+        self.max_size = max_size
+        self.max_ttl_seconds = max_ttl_seconds
+        self._entries: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up the verified claims for a token.
+
+        Args:
+            token: Raw Firebase ID token
+
+        Returns:
+            Decoded claims, or None on a miss or expired entry
+        """
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, claims = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return claims
+
+    def put(self, token: str, claims: Dict[str, Any]) -> None:
+        """
+        Cache the claims of a freshly verified token.
+
+        Args:
+            token: Raw Firebase ID token
+            claims: Decoded claims returned by verification (must include `exp`)
+        """
+        expires_at = float(claims.get('exp', 0))
+        if self.max_ttl_seconds is not None:
+            expires_at = min(expires_at, time.time() + self.max_ttl_seconds)
+        if expires_at <= time.time():
+            return
+
+        key = self._key(token)
+        self._entries[key] = (expires_at, claims)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters and hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
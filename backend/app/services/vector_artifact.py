@@ -0,0 +1,261 @@
+"""
+Loader for the vector artifact produced by the RAG ingestion pipeline.
+
+Artifact layout (a directory, written by the ingestion pipeline or by
+write_artifact below):
+
+    manifest.json   format_version, corpus_version, model, dimensions, dtype,
+                    count, normalized, created_at
+    vectors.npy     (count, dimensions) float32 or float16 matrix, row-aligned
+    metadata.json   column table: {"columns": {name: [value per row]}} with
+                    id, doc_name, doc_title, chunk_index, token_count,
+                    text_offset, text_length and one agent_<name> flag per agent
+    chunks.txt      UTF-8 chunk texts concatenated; rows point into it by
+                    byte offset/length
+
+`vectors.npy` is opened with `np.load(mmap_mode='r')`, so several workers on
+the same host share one page-cached copy.
+
+The ingestion pipeline also keeps each corpus version's chunk table (the same
+files minus vectors.npy) under `chunk_history/{corpus_version}/`; ChunkTable
+reads one, and retain_chunk_table writes one.
+"""
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from pathlib import Path
+import json
+import logging
+import mmap
+import shutil
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.npy"
+METADATA_FILE = "metadata.json"
+TEXT_FILE = "chunks.txt"
+
+
+class VectorArtifact:
+    """Memory-mapped vectors plus their row-aligned metadata and chunk text."""
+
+    def __init__(self, path: str, mmap_vectors: bool = True):
+        """
+        Load an artifact directory.
+
+        Args:
+            path: Artifact directory
+            mmap_vectors: Memory-map the vector matrix instead of reading it
+
+        Raises:
+            ValueError: If the artifact format version is not supported
+        """
+        self.path = Path(path)
+        with open(self.path / MANIFEST_FILE) as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+
+        if self.manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported vector artifact format {self.manifest.get('format_version')} "
+                f"(expected {FORMAT_VERSION})"
+            )
+
+        vectors = np.load(self.path / VECTORS_FILE, mmap_mode='r' if mmap_vectors else None)
+        if vectors.dtype != np.float32:
+            # float16 artifacts are upcast once; the matmul needs float32
+            vectors = vectors.astype(np.float32)
+        if not self.manifest.get("normalized", False):
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+        self.vectors: np.ndarray = vectors
+
+        with open(self.path / METADATA_FILE) as f:
+            self.columns: Dict[str, List[Any]] = json.load(f)["columns"]
+
+        self._text_file = open(self.path / TEXT_FILE, "rb")
+        self._text = mmap.mmap(self._text_file.fileno(), 0, access=mmap.ACCESS_READ) \
+            if (self.path / TEXT_FILE).stat().st_size else b""
+
+        if len(self.columns["id"]) != self.vectors.shape[0]:
+            raise ValueError("Vector artifact metadata is not row-aligned with vectors")
+
+        logger.info(
+            f"Loaded vector artifact {self.path} "
+            f"({self.count} vectors, dim {self.dimensions}, corpus {self.corpus_version})"
+        )
+
+    @property
+    def count(self) -> int:
+        return int(self.vectors.shape[0])
+
+    @property
+    def dimensions(self) -> int:
+        return int(self.vectors.shape[1])
+
+    @property
+    def corpus_version(self) -> str:
+        return str(self.manifest.get("corpus_version", ""))
+
+    def text(self, row: int) -> str:
+        """
+        Return the full chunk text of a row.
+
+        Args:
+            row: Row index
+
+        Returns:
+            Chunk text
+        """
+        offset = self.columns["text_offset"][row]
+        length = self.columns["text_length"][row]
+        return bytes(self._text[offset:offset + length]).decode("utf-8")
+
+    def row(self, row: int) -> Dict[str, Any]:
+        """
+        Return all metadata columns of a row as a dict.
+
+        Args:
+            row: Row index
+
+        Returns:
+            Metadata dict
+        """
+        return {name: values[row] for name, values in self.columns.items()}
+
+    def close(self) -> None:
+        """Release the memory-mapped chunk text."""
+        if isinstance(self._text, mmap.mmap):
+            self._text.close()
+        self._text_file.close()
+
+
+class ChunkTable:
+    """Metadata and chunk texts of a retained corpus version (no vectors)."""
+
+    def __init__(self, path: str):
+        """
+        Load a retained chunk table directory.
+
+        Args:
+            path: Chunk table directory (manifest.json, metadata.json, chunks.txt)
+        """
+        self.path = Path(path)
+        with open(self.path / MANIFEST_FILE) as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+        with open(self.path / METADATA_FILE) as f:
+            self.columns: Dict[str, List[Any]] = json.load(f)["columns"]
+        self._text = (self.path / TEXT_FILE).read_bytes()
+
+    @property
+    def corpus_version(self) -> str:
+        return str(self.manifest.get("corpus_version", ""))
+
+    def text(self, row: int) -> str:
+        offset = self.columns["text_offset"][row]
+        length = self.columns["text_length"][row]
+        return self._text[offset:offset + length].decode("utf-8")
+
+    def row(self, row: int) -> Dict[str, Any]:
+        return {name: values[row] for name, values in self.columns.items()}
+
+
+def retain_chunk_table(artifact_path: str, history_dir: str) -> Path:
+    """
+    Copy an artifact's chunk table to `{history_dir}/{corpus_version}/`.
+
+    Args:
+        artifact_path: Artifact directory
+        history_dir: Directory of retained chunk tables
+
+    Returns:
+        Directory of the retained table
+    """
+    source = Path(artifact_path)
+    with open(source / MANIFEST_FILE) as f:
+        corpus_version = str(json.load(f).get("corpus_version", ""))
+    out = Path(history_dir) / corpus_version
+    out.mkdir(parents=True, exist_ok=True)
+    for name in (METADATA_FILE, TEXT_FILE, MANIFEST_FILE):
+        shutil.copyfile(source / name, out / name)
+    return out
+
+
+def load_artifact(path: Optional[str]) -> VectorArtifact:
+    """
+    Load a vector artifact, raising a clear error when it is not configured.
+
+    Args:
+        path: Artifact directory
+
+    Returns:
+        Loaded VectorArtifact
+    """
+    if not path:
+        raise ValueError("LOCAL_VECTOR_ARTIFACT_PATH must be set to use the local vector backend")
+    return VectorArtifact(path)
+
+
+def write_artifact(
+    path: str,
+    vectors: np.ndarray,
+    rows: List[Dict[str, Any]],
+    texts: List[str],
+    corpus_version: str = "",
+    model: str = "",
+    dtype: str = "float32"
+) -> Path:
+    """
+    Write a vector artifact directory (same format as the ingestion pipeline).
+
+    Args:
+        path: Output directory
+        vectors: (count, dimensions) embedding matrix
+        rows: Row-aligned metadata dicts (must include "id")
+        texts: Row-aligned chunk texts
+        corpus_version: Corpus version recorded in the manifest
+        model: Embedding model name
+        dtype: "float32" or "float16"
+
+    Returns:
+        Output directory path
+    """
+    out = Path(path)
+    out.mkdir(parents=True, exist_ok=True)
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = matrix / np.where(norms == 0, 1, norms)
+    np.save(out / VECTORS_FILE, np.ascontiguousarray(matrix.astype(dtype)))
+
+    columns: Dict[str, List[Any]] = {}
+    names = sorted({name for row in rows for name in row})
+    offset = 0
+    with open(out / TEXT_FILE, "wb") as f:
+        for row, text in zip(rows, texts):
+            encoded = text.encode("utf-8")
+            f.write(encoded)
+            for name in names:
+                columns.setdefault(name, []).append(row.get(name, False if name.startswith("agent_") else None))
+            columns.setdefault("text_offset", []).append(offset)
+            columns.setdefault("text_length", []).append(len(encoded))
+            offset += len(encoded)
+
+    with open(out / METADATA_FILE, "w") as f:
+        json.dump({"columns": columns}, f)
+
+    with open(out / MANIFEST_FILE, "w") as f:
+        json.dump({
+            "format_version": FORMAT_VERSION,
+            "corpus_version": corpus_version,
+            "model": model,
+            "dimensions": int(matrix.shape[1]),
+            "dtype": dtype,
+            "count": int(matrix.shape[0]),
+            "normalized": True,
+            "created_at": datetime.utcnow().isoformat()
+        }, f, indent=2)
+
+    return out
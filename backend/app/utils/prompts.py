@@ -35,7 +35,7 @@ def build_conversation_history(
     Build conversation history for multi-turn context.
 
     Args:
-        messages: List of previous messages in the session
+        messages: Previous messages in the session (objects with role and content)
         max_history: Maximum number of message pairs to include
 
     Returns:
@@ -0,0 +1,208 @@
+"""
+Server-Sent Events framing for the streaming chat route.
+
+Model deltas are often only a few characters long; sending each as its own
+`content` frame costs a JSON encode, a frame and a socket write per delta.
+SSEStreamWriter coalesces deltas and flushes a frame once enough text is
+pending or enough time has passed since the last flush, and encodes frames
+with orjson when it is installed.
+"""
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+import asyncio
+import json
+import time
+
+try:
+    import orjson
+except ImportError:  # Optional; the stdlib encoder is used instead
+    orjson = None
+
+
+def dumps(payload: Dict[str, Any]) -> bytes:
+    """Encode a payload as compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def sse_frame(payload: Dict[str, Any]) -> bytes:
+    """Format one SSE data frame."""
+    return b"data: " + dumps(payload) + b"\n\n"
+
+
+class SSEStreamWriter:
+    """Builds the SSE frames of one streamed response and counts them."""
+
+    def __init__(
+        self,
+        flush_interval: float = 0.02,
+        flush_chars: int = 64,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize stream writer.
+
+        Args:
+            flush_interval: Seconds after the last flush at which pending
+                content is sent (by `stream` even if no further delta arrives)
+            flush_chars: Pending characters that trigger a flush
+            clock: Monotonic clock (injectable for tests)
+        """
+        self.flush_interval = flush_interval
+        self.flush_chars = flush_chars
+        self.clock = clock
+        self._parts: List[str] = []
+        self._pending: List[str] = []
+        self._pending_chars = 0
+        self._last_flush = clock()
+        self.frames = 0
+        self.bytes = 0
+        self.deltas = 0
+
+    def event(self, payload: Dict[str, Any]) -> bytes:
+        """
+        Frame a non-content event (status, citations, done, error).
+
+        Args:
+            payload: Event payload with a `type`
+
+        Returns:
+            Encoded frame
+        """
+        frame = sse_frame(payload)
+        self.frames += 1
+        self.bytes += len(frame)
+        return frame
+
+    def content(self, delta: str) -> Optional[bytes]:
+        """
+        Add a model delta.
+
+        Args:
+            delta: Generated text
+
+        Returns:
+            A content frame when a threshold is reached, otherwise None
+        """
+        self.deltas += 1
+        self._parts.append(delta)
+        self._pending.append(delta)
+        self._pending_chars += len(delta)
+        if (self._pending_chars >= self.flush_chars
+                or self.clock() - self._last_flush >= self.flush_interval):
+            return self.flush()
+        return None
+
+    async def stream(self, deltas: AsyncIterator[str]) -> AsyncIterator[bytes]:
+        """
+        Coalesce a model stream into content frames.
+
+        The next delta is awaited with the rest of the flush interval as a
+        timeout, so pending content goes out on time even when the model
+        pauses. The pending read is a task rather than a cancelled
+        `__anext__`, which would close the model stream.
+
+        Args:
+            deltas: Model deltas
+
+        Yields:
+            Content frames (the caller flushes what is pending at the end)
+        """
+        next_delta = None
+        try:
+            while True:
+                if next_delta is None:
+                    next_delta = asyncio.ensure_future(anext(deltas))
+                timeout = None
+                if self._pending:
+                    timeout = max(self.flush_interval - (self.clock() - self._last_flush), 0)
+                done, _ = await asyncio.wait({next_delta}, timeout=timeout)
+                if not done:
+                    frame = self.flush()
+                else:
+                    try:
+                        delta = next_delta.result()
+                    except StopAsyncIteration:
+                        return
+                    finally:
+                        next_delta = None
+                    frame = self.content(delta)
+                if frame:
+                    yield frame
+        finally:
+            # Stopped early (cancelled or closed): stop reading the model stream
+            if next_delta is not None:
+                next_delta.cancel()
+                await asyncio.gather(next_delta, return_exceptions=True)
+
+    def flush(self) -> Optional[bytes]:
+        """
+        Frame all pending content.
+
+        Returns:
+            A content frame, or None if nothing is pending
+        """
+        self._last_flush = self.clock()
+        if not self._pending:
+            return None
+        frame = self.event({'type': 'content', 'content': ''.join(self._pending)})
+        self._pending.clear()
+        self._pending_chars = 0
+        return frame
+
+    @property
+    def text(self) -> str:
+        """Full content streamed so far (including pending deltas)."""
+        return ''.join(self._parts)
+
+    def stats(self) -> Dict[str, int]:
+        """Frames, bytes and model deltas of this stream."""
+        return {"frames": self.frames, "bytes": self.bytes, "deltas": self.deltas}
+
+
+class StreamStats:
+    """Counters of completed and cancelled streams, shared by all requests."""
+
+    def __init__(self):
+        self.completed = 0
+        self.cancelled = 0
+        self.cancelled_by_reason: Dict[str, int] = {}
+        self.upstream_closed = 0
+        self.cancelled_deltas = 0
+        self.max_tokens_saved = 0
+
+    def record_completed(self) -> None:
+        """Count a stream that ran to its done event."""
+        self.completed += 1
+
+    def record_cancelled(self, reason: str, deltas: int, max_tokens: Optional[int] = None) -> None:
+        """
+        Count a stream stopped before its done event.
+
+        Deltas are not tokens, but each carries at least one, so `max_tokens`
+        minus the deltas received bounds the tokens saved from above.
+
+        Args:
+            reason: Why it was stopped ("disconnected", "client", "shutdown")
+            deltas: Model deltas received before generation was stopped
+            max_tokens: Generation limit when the model stream was closed
+                mid-answer; None when no model stream was open, so nothing
+                was saved upstream
+        """
+        self.cancelled += 1
+        self.cancelled_by_reason[reason] = self.cancelled_by_reason.get(reason, 0) + 1
+        self.cancelled_deltas += deltas
+        if max_tokens is not None:
+            self.upstream_closed += 1
+            self.max_tokens_saved += max(max_tokens - deltas, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Stream counters."""
+        return {
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "cancelled_by_reason": dict(self.cancelled_by_reason),
+            "upstream_closed": self.upstream_closed,
+            "cancelled_deltas": self.cancelled_deltas,
+            "max_tokens_saved": self.max_tokens_saved,
+        }
@@ -0,0 +1,86 @@
+"""
+Small dependency-graph runner for concurrent async pipeline stages.
+"""
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Tuple
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class StageGraph:
+    """
+    Run named async stages concurrently, respecting declared dependencies.
+
+    Each stage is called with the results of the stages it depends on as
+    keyword arguments. Stages without a dependency path between them run
+    concurrently. If any stage fails, every other pending stage is cancelled
+    and the original exception is re-raised.
+    """
+
+    def __init__(self):
+        """Initialize an empty graph."""
+        self._stages: Dict[str, Tuple[Callable[..., Awaitable[Any]], List[str]]] = {}
+
+    def add(
+        self,
+        name: str,
+        func: Callable[..., Awaitable[Any]],
+        depends_on: Iterable[str] = ()
+    ) -> "StageGraph":
+        """
+        Register a stage.
+
+        Args:
+            name: Unique stage name (also the keyword its result is passed as)
+            func: Async callable receiving dependency results as kwargs
+            depends_on: Names of stages that must finish first
+
+        Returns:
+            The graph, for chaining
+        """
+        deps = list(depends_on)
+        for dep in deps:
+            if dep not in self._stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self._stages[name] = (func, deps)
+        return self
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Execute all stages.
+
+        Returns:
+            Dict mapping stage name to its result
+
+        Raises:
+            Exception: The first exception raised by a failing stage
+        """
+        tasks: Dict[str, asyncio.Task] = {}
+        failures: List[Tuple[str, BaseException]] = []
+
+        async def run_stage(name: str) -> Any:
+            func, deps = self._stages[name]
+            kwargs = {}
+            for dep in deps:
+                kwargs[dep] = await tasks[dep]
+            try:
+                return await func(**kwargs)
+            except Exception as e:
+                failures.append((name, e))
+                raise
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                # Stages are registered after their dependencies, so every
+                # dependency task exists before a dependent awaits it
+                for name in self._stages:
+                    tasks[name] = group.create_task(run_stage(name), name=name)
+        except BaseExceptionGroup as group_error:
+            if failures:
+                stage, error = failures[0]
+                logger.error(f"Pipeline stage '{stage}' failed: {str(error)}")
+                raise error from None
+            raise
+
+        return {name: task.result() for name, task in tasks.items()}
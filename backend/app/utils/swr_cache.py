@@ -0,0 +1,112 @@
+"""
+Stale-while-revalidate cache with single-flight recomputation.
+"""
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StaleWhileRevalidateCache:
+    """
+    Cache of async computation results keyed by arbitrary hashable keys.
+
+    - Fresh entries (younger than the TTL) are returned directly.
+    - Stale entries are returned immediately while one background task
+      recomputes them.
+    - Missing entries are computed once; concurrent callers for the same key
+      await the same in-flight computation (single flight).
+    """
+
+    def __init__(self, ttl_seconds: float = 60.0):
+        """
+        Initialize cache.
+
+        Args:
+            ttl_seconds: Age after which an entry is refreshed in the background
+        """
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._inflight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def _start(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> "asyncio.Task[Any]":
+        """Start (or join) the single in-flight computation for a key."""
+        task = self._inflight.get(key)
+        if task is None:
+            async def run():
+                try:
+                    value = await compute()
+                    self._entries[key] = (time.monotonic(), value)
+                    self.refreshes += 1
+                    return value
+                except Exception as e:
+                    self.refresh_failures += 1
+                    logger.error(f"Refresh of cached {key!r} failed: {str(e)}")
+                    raise
+                finally:
+                    self._inflight.pop(key, None)
+
+            task = asyncio.ensure_future(run())
+            # Mark failures as retrieved; they are logged above and re-raised to awaiters
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        return task
+
+    async def get(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Get a cached value, computing or refreshing it as needed.
+
+        Args:
+            key: Cache key
+            compute: Async callable producing the value
+
+        Returns:
+            Cached (possibly stale) or freshly computed value
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            computed_at, value = entry
+            if time.monotonic() - computed_at < self.ttl_seconds:
+                self.hits += 1
+                return value
+
+            # Serve the previous snapshot while one task refreshes it
+            self.stale_hits += 1
+            self._start(key, compute)
+            return value
+
+        self.misses += 1
+        # shield: a cancelled caller must not cancel the computation others await
+        return await asyncio.shield(self._start(key, compute))
+
+    def invalidate(self) -> None:
+        """Drop all cached values (in-flight computations still complete)."""
+        self._entries.clear()
+
+    async def close(self) -> None:
+        """Cancel in-flight background refreshes."""
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters and hit rate."""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
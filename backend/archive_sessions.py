@@ -0,0 +1,39 @@
+"""
+Move sessions that have not been accessed for a while out of the Realtime
+Database into compressed archive blobs (restored automatically when opened).
+
+Usage:
+    python archive_sessions.py                 # uses SESSION_RETENTION_DAYS
+    python archive_sessions.py --days 180
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+# Add app to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+
+async def archive(days: int) -> None:
+    from app.config import get_settings
+    from app.services.firebase_service import FirebaseService
+    from app.services.session_retention import SessionRetentionJob
+
+    settings = get_settings()
+    firebase_service = FirebaseService(settings)
+    try:
+        job = SessionRetentionJob(firebase_service, days or settings.session_retention_days)
+        summary = await job.run()
+        print(f"✓ Sessions archived: {json.dumps(summary)}")
+    finally:
+        await firebase_service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive cold sessions")
+    parser.add_argument("--days", type=int, default=None, help="Retention period (default: SESSION_RETENTION_DAYS)")
+    args = parser.parse_args()
+
+    asyncio.run(archive(args.days))
@@ -0,0 +1,34 @@
+"""
+Rebuild the analytics rollups from existing sessions and feedback.
+
+Run once after deploying write-time rollups (and whenever they need
+repair), preferably while traffic is low:
+
+    python backfill_analytics.py
+"""
+import asyncio
+import os
+import sys
+
+# Add app to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+
+async def main() -> None:
+    from app.config import get_settings
+    from app.services.firebase_service import FirebaseService
+    from app.services.analytics_service import AnalyticsService
+
+    settings = get_settings()
+    firebase_service = FirebaseService(settings)
+    try:
+        totals = await AnalyticsService(settings, firebase_service).backfill()
+        print("✓ Analytics rollups rebuilt")
+        for name, value in totals.items():
+            print(f"  {name}: {value}")
+    finally:
+        await firebase_service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+"""
+Benchmark: local in-process vector search vs. Pinecone.
+
+Usage:
+    python benchmark_retrieval.py                      # synthetic corpus-sized artifact
+    python benchmark_retrieval.py --artifact PATH      # real ingestion artifact
+    python benchmark_retrieval.py --pinecone           # also time Pinecone (needs .env)
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Add app to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+CORPUS_ROWS = 400  # ~194KB of text at 400-token chunks
+DIMENSIONS = 1024
+AGENT_FILTER = {"agent_professional_learning": {"$eq": True}}
+
+
+def _settings(**overrides):
+    from app.config import Settings
+
+    values = dict(
+        openai_api_key=os.getenv("OPENAI_API_KEY", "test-key"),
+        pinecone_api_key=os.getenv("PINECONE_API_KEY", "test-key"),
+        pinecone_environment=os.getenv("PINECONE_ENVIRONMENT", "test"),
+        pinecone_index_name=os.getenv("PINECONE_INDEX_NAME", "test"),
+        firebase_project_id="test",
+        firebase_private_key="test",
+        firebase_client_email="test@test",
+        firebase_database_url="https://test.firebaseio.com"
+    )
+    values.update(overrides)
+    return Settings(**values)
+
+
+def _synthetic_artifact(path: str) -> None:
+    from app.services.vector_artifact import write_artifact
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((CORPUS_ROWS, DIMENSIONS)).astype(np.float32)
+    rows = [
+        {
+            "id": f"doc_{i}",
+            "doc_title": f"Document {i % 7}",
+            "chunk_index": i,
+            f"agent_{'professional_learning' if i % 3 else 'curriculum_planning'}": True,
+        }
+        for i in range(CORPUS_ROWS)
+    ]
+    write_artifact(path, vectors, rows, ["chunk text " * 40] * CORPUS_ROWS)
+
+
+async def _time_queries(service, queries, label: str) -> None:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        await service.query_documents(query, metadata_filter=AGENT_FILTER)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    print(
+        f"{label:10s} n={len(timings):4d}  "
+        f"p50={statistics.median(timings):8.3f}ms  "
+        f"p95={timings[int(len(timings) * 0.95) - 1]:8.3f}ms  "
+        f"max={timings[-1]:8.3f}ms"
+    )
+
+
+async def main(artifact_path: str, include_pinecone: bool, iterations: int) -> None:
+    from app.services.local_vector_service import LocalVectorService
+    from app.services.vector_artifact import VectorArtifact
+
+    artifact = VectorArtifact(artifact_path)
+    rng = np.random.default_rng(1)
+    queries = [q.tolist() for q in rng.standard_normal((iterations, artifact.dimensions))]
+
+    print("=" * 70)
+    print(f"Retrieval benchmark: {artifact.count} vectors x {artifact.dimensions} dims")
+    print("=" * 70)
+
+    local = LocalVectorService(_settings(), artifact=artifact)
+    await _time_queries(local, queries, "local")
+
+    if include_pinecone:
+        from app.config import get_settings
+        from app.services.pinecone_service import PineconeService
+
+        pinecone = PineconeService(get_settings())
+        await pinecone.warm_up()
+        await _time_queries(pinecone, queries[:min(iterations, 50)], "pinecone")
+        pinecone.close()
+
+    local.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark vector retrieval backends")
+    parser.add_argument("--artifact", default=None, help="Vector artifact directory")
+    parser.add_argument("--pinecone", action="store_true", help="Also benchmark Pinecone")
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.artifact:
+        asyncio.run(main(args.artifact, args.pinecone, args.iterations))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            _synthetic_artifact(tmp)
+            asyncio.run(main(tmp, args.pinecone, args.iterations))
@@ -0,0 +1,92 @@
+"""
+Benchmark: per-token SSE frames vs. coalesced, pre-serialized frames.
+
+Replays a synthetic model stream (1-3 character deltas) through the old
+framing (json.dumps per delta, string +=) and through SSEStreamWriter, and
+reports CPU time, frames and bytes per streamed response.
+
+Usage:
+    python benchmark_streaming.py
+    python benchmark_streaming.py --responses 2000 --chars 1500
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+# Add app to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+
+def _deltas(chars: int, seed: int = 0):
+    rng = random.Random(seed)
+    text = ("Professional learning communities focus on student learning, "
+            "collaboration and results. ") * (chars // 80 + 1)
+    deltas, i = [], 0
+    while i < chars:
+        size = rng.randint(1, 3)
+        deltas.append(text[i:i + size])
+        i += size
+    return deltas
+
+
+def per_token(deltas):
+    """Framing before coalescing: one frame and one json.dumps per delta."""
+    frames = []
+    full_response = ""
+    for delta in deltas:
+        full_response += delta
+        frames.append(f"data: {json.dumps({'type': 'content', 'content': delta})}\n\n".encode())
+    frames.append(f"data: {json.dumps({'type': 'done'})}\n\n".encode())
+    return frames, full_response
+
+
+def coalesced(deltas, flush_chars: int):
+    """Framing with SSEStreamWriter (no time threshold: deltas arrive instantly here)."""
+    from app.utils.sse import SSEStreamWriter
+
+    writer = SSEStreamWriter(flush_interval=float("inf"), flush_chars=flush_chars)
+    frames = []
+    for delta in deltas:
+        frame = writer.content(delta)
+        if frame:
+            frames.append(frame)
+    frame = writer.flush()
+    if frame:
+        frames.append(frame)
+    frames.append(writer.event({'type': 'done'}))
+    return frames, writer.text
+
+
+def measure(name, fn, deltas, responses):
+    start = time.process_time()
+    for _ in range(responses):
+        frames, text = fn(deltas)
+    cpu = (time.process_time() - start) / responses
+    size = sum(len(frame) for frame in frames)
+    print(f"{name:28s} {cpu * 1e6:9.1f} µs CPU/response  {len(frames):5d} frames  {size:7d} bytes")
+    return cpu, text
+
+
+if __name__ == "__main__":
+    from app.utils import sse
+
+    parser = argparse.ArgumentParser(description="SSE framing benchmark")
+    parser.add_argument("--responses", type=int, default=1000, help="Streamed responses to replay")
+    parser.add_argument("--chars", type=int, default=1200, help="Characters per response")
+    parser.add_argument("--flush-chars", type=int, default=64, help="Coalescing threshold")
+    args = parser.parse_args()
+
+    deltas = _deltas(args.chars)
+    print(f"{len(deltas)} deltas per response, {args.responses} responses, "
+          f"encoder: {'orjson' if sse.orjson is not None else 'json'}\n")
+
+    before, expected = measure("per-token frames", per_token, deltas, args.responses)
+    after, text = measure(
+        f"coalesced ({args.flush_chars} chars)",
+        lambda d: coalesced(d, args.flush_chars), deltas, args.responses
+    )
+    assert text == expected
+    print(f"\nCPU per streamed response: {before / after:.1f}x lower")
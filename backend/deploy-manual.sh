@@ -46,6 +46,7 @@ echo "  --allow-unauthenticated \\"
 echo "  --memory 1Gi \\"
 echo "  --cpu 1 \\"
 echo "  --timeout 300 \\"
+echo "  --session-affinity \\"
 echo "  --set-env-vars OPENAI_API_KEY=\$OPENAI_API_KEY,PINECONE_API_KEY=\$PINECONE_API_KEY,PINECONE_INDEX_NAME=plc-coach,PINECONE_ENVIRONMENT=\$PINECONE_ENVIRONMENT,FIREBASE_DATABASE_URL=https://solutiontreevirtualcoach-default-rtdb.firebaseio.com/,FIREBASE_CREDENTIALS_PATH=/tmp/firebase-credentials.json"
 echo ""
 read -p "Press enter when done..."
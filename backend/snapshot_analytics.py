@@ -0,0 +1,64 @@
+"""
+Snapshot sessions and feedback into day-partitioned Parquet files and
+report analytics computed from them.
+
+Usage:
+    python snapshot_analytics.py                          # append new complete days
+    python snapshot_analytics.py --output DIR --report    # then print metrics
+    python snapshot_analytics.py --report-only --days 30  # metrics from existing snapshot
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+# Add app to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+
+async def snapshot(output_dir: str, until_day: str) -> None:
+    from app.config import get_settings
+    from app.services.firebase_service import FirebaseService
+    from app.services.analytics_snapshot import AnalyticsSnapshotJob
+
+    firebase_service = FirebaseService(get_settings())
+    try:
+        summary = await AnalyticsSnapshotJob(firebase_service, output_dir).run(until_day)
+        print(f"✓ Snapshot written: {json.dumps(summary)}")
+    finally:
+        await firebase_service.close()
+
+
+def report(output_dir: str, days: int) -> None:
+    from app.models.schemas import AgentType
+    from app.services.analytics_query import (
+        load_table,
+        compute_analytics,
+        ratings_by_agent_by_week,
+        session_length_distribution,
+    )
+
+    sessions = load_table(output_dir, "sessions")
+    feedback = load_table(output_dir, "feedback")
+    analytics = compute_analytics(sessions, feedback, [agent.value for agent in AgentType], days)
+    print(json.dumps({
+        "analytics": analytics,
+        "ratings_by_agent_by_week": ratings_by_agent_by_week(sessions, feedback),
+        "session_length_distribution": session_length_distribution(sessions),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar analytics snapshot")
+    parser.add_argument("--output", default="analytics_snapshot", help="Snapshot directory")
+    parser.add_argument("--until", default=None, help="Last day to include (default: yesterday, UTC)")
+    parser.add_argument("--report", action="store_true", help="Print metrics after snapshotting")
+    parser.add_argument("--report-only", action="store_true", help="Only print metrics")
+    parser.add_argument("--days", type=int, default=7, help="Days of recent activity to report")
+    args = parser.parse_args()
+
+    if not args.report_only:
+        asyncio.run(snapshot(args.output, args.until))
+    if args.report or args.report_only:
+        report(args.output, args.days)
@@ -276,6 +276,777 @@ def test_agent_types():
     return True
 
 
+def test_stage_graph():
+    """Test concurrent pipeline stage execution."""
+    print("\nTesting stage graph...")
+
+    import asyncio
+    import time
+    from app.utils.stage_graph import StageGraph
+
+    try:
+        async def slow(value):
+            await asyncio.sleep(0.05)
+            return value
+
+        async def run_graph():
+            graph = (
+                StageGraph()
+                .add("session", lambda: slow("s"))
+                .add("embedding", lambda: slow("e"))
+                .add("citations", lambda embedding: slow(embedding + "c"), depends_on=["embedding"])
+            )
+            return await graph.run()
+
+        start = time.perf_counter()
+        results = asyncio.run(run_graph())
+        elapsed = time.perf_counter() - start
+        assert results == {"session": "s", "embedding": "e", "citations": "ec"}
+        assert elapsed < 0.14  # session overlaps embedding -> citations
+        print("✓ Independent stages run concurrently")
+
+    except Exception as e:
+        print(f"✗ Stage graph concurrency test failed: {e}")
+        return False
+
+    try:
+        cancelled = []
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise LookupError("session missing")
+
+        async def long_stage():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def run_failing():
+            graph = StageGraph().add("session", fail).add("embedding", long_stage)
+            await graph.run()
+
+        try:
+            asyncio.run(run_failing())
+            print("✗ Stage graph should have raised")
+            return False
+        except LookupError:
+            pass
+        assert cancelled == [True]
+        print("✓ Failing stage cancels siblings and re-raises original error")
+
+    except Exception as e:
+        print(f"✗ Stage graph cancellation test failed: {e}")
+        return False
+
+    return True
+
+
+def test_chat_pipeline():
+    """Test that new chats only create their session once retrieval succeeds."""
+    print("\nTesting chat pipeline...")
+
+    import asyncio
+    from types import SimpleNamespace
+    from app.models.schemas import AgentType
+    from app.services.chat_pipeline import ChatPipeline
+
+    created = []
+    retrieval = {"error": None}
+
+    async def create_session(user_id, agent_id, title=None):
+        created.append(user_id)
+        return "s-new"
+
+    async def embed_query(query):
+        return [0.1]
+
+    async def search_context(embedding, agent_id):
+        await asyncio.sleep(0.01)
+        if retrieval["error"]:
+            raise retrieval["error"]
+        return []
+
+    pipeline = ChatPipeline(
+        SimpleNamespace(max_conversation_history=2),
+        SimpleNamespace(
+            embed_query=embed_query, search_context=search_context,
+            lookup_cached_response=lambda agent_id, embedding: None
+        ),
+        SimpleNamespace(create_session=create_session)
+    )
+
+    async def prepare():
+        return await pipeline.prepare(user_id="u1", query="q", agent_id=AgentType.PROFESSIONAL_LEARNING)
+
+    try:
+        retrieval["error"] = TimeoutError("Pinecone call timed out")
+        try:
+            asyncio.run(prepare())
+            raise AssertionError("Retrieval errors must propagate")
+        except TimeoutError:
+            pass
+        assert created == []
+
+        async def cancel_during_retrieval():
+            task = asyncio.create_task(prepare())
+            await asyncio.sleep(0.005)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        retrieval["error"] = None
+        asyncio.run(cancel_during_retrieval())
+        assert created == []
+        print("✓ Failed or cancelled turns create no session")
+
+        turn = asyncio.run(prepare())
+        assert turn.session_id == "s-new" and created == ["u1"] and turn.conversation_history == []
+        print("✓ New chats get their session after retrieval")
+
+    except Exception as e:
+        print(f"✗ Chat pipeline test failed: {e}")
+        return False
+
+    return True
+
+
+def test_swr_cache():
+    """Test stale-while-revalidate caching with single-flight refresh."""
+    print("\nTesting stale-while-revalidate cache...")
+
+    import asyncio
+    from app.utils.swr_cache import StaleWhileRevalidateCache
+
+    try:
+        calls = []
+
+        async def compute():
+            calls.append(True)
+            await asyncio.sleep(0.02)
+            return len(calls)
+
+        async def run():
+            cache = StaleWhileRevalidateCache(ttl_seconds=0.05)
+            results = await asyncio.gather(*(cache.get("k", compute) for _ in range(5)))
+            assert results == [1] * 5 and len(calls) == 1
+            print("✓ Concurrent misses share one computation")
+
+            assert await cache.get("k", compute) == 1 and len(calls) == 1
+            await asyncio.sleep(0.06)
+            assert await cache.get("k", compute) == 1  # stale value served immediately
+            await asyncio.sleep(0)
+            assert await cache.get("k", compute) == 1 and len(calls) == 2  # one refresh
+            await asyncio.sleep(0.03)
+            assert await cache.get("k", compute) == 2
+            stats = cache.stats()
+            assert stats["misses"] == 5 and stats["stale_hits"] == 2 and stats["refreshes"] == 2
+            print("✓ Stale snapshots are served while one background refresh runs")
+
+        asyncio.run(run())
+
+    except Exception as e:
+        print(f"✗ Stale-while-revalidate cache test failed: {e}")
+        return False
+
+    return True
+
+
+def test_token_cache():
+    """Test verified-token cache expiry, eviction and counters."""
+    print("\nTesting verified token cache...")
+
+    import time
+    from app.services.token_cache import VerifiedTokenCache
+
+    try:
+        cache = VerifiedTokenCache(max_size=2)
+        now = time.time()
+        assert cache.get("token-a") is None
+        cache.put("token-a", {"uid": "a", "exp": now + 3600})
+        assert cache.get("token-a")["uid"] == "a"
+        print("✓ Verified tokens are served from cache")
+
+        cache.put("token-expired", {"uid": "x", "exp": now - 1})
+        assert cache.get("token-expired") is None
+        print("✓ Already-expired tokens are not cached")
+
+        cache.put("token-b", {"uid": "b", "exp": now + 3600})
+        cache.put("token-c", {"uid": "c", "exp": now + 3600})
+        assert cache.get("token-a") is None  # least recently used evicted
+        stats = cache.stats()
+        assert stats["size"] == 2 and stats["evictions"] == 1
+        assert stats["hits"] == 1 and stats["misses"] == 3
+        print("✓ LRU eviction and hit-rate counters work")
+
+        capped = VerifiedTokenCache(max_ttl_seconds=0.01)
+        capped.put("token-d", {"uid": "d", "exp": now + 3600})
+        time.sleep(0.02)
+        assert capped.get("token-d") is None
+        print("✓ TTL cap bounds trust window when revocation checks are on")
+
+    except Exception as e:
+        print(f"✗ Token cache test failed: {e}")
+        return False
+
+    return True
+
+
+def test_embedding_cache():
+    """Test two-tier query embedding cache."""
+    print("\nTesting embedding cache...")
+
+    import asyncio
+    import tempfile
+    from app.services.embedding_cache import EmbeddingCache
+
+    try:
+        key = EmbeddingCache.make_key("How do we build  teams?", "m", 4)
+        assert key == EmbeddingCache.make_key(" how do we build teams? ", "m", 4)
+        assert key != EmbeddingCache.make_key("How do we build teams?", "m", 8)
+        print("✓ Keys normalize whitespace/case and include model + dimensions")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "embeddings.sqlite")
+
+            async def run():
+                writer = EmbeddingCache(max_entries=1, disk_path=path)
+                assert await writer.get(key) is None
+                await writer.put(key, [0.5, 0.25, 0.0, 1.0])
+                assert await writer.get(key) == [0.5, 0.25, 0.0, 1.0]
+                writer.close()
+
+                # A second worker sharing the disk tier gets a hit
+                reader = EmbeddingCache(max_entries=1, disk_path=path)
+                assert await reader.get(key) == [0.5, 0.25, 0.0, 1.0]
+                assert await reader.get(key) is not None  # now in memory
+                stats = reader.stats()
+                reader.close()
+                return stats
+
+            stats = asyncio.run(run())
+            assert stats["disk_hits"] == 1 and stats["memory_hits"] == 1
+            print("✓ Disk tier is shared across cache instances")
+
+    except Exception as e:
+        print(f"✗ Embedding cache test failed: {e}")
+        return False
+
+    return True
+
+
+def test_response_cache():
+    """Test semantic response cache lookups, staleness and eviction."""
+    print("\nTesting semantic response cache...")
+
+    from app.services.response_cache import SemanticResponseCache
+    from app.models.schemas import Citation
+
+    try:
+        citation = Citation(id="cite_1", source_title="Book", chunk_text="Text", relevance_score=0.9)
+        cache = SemanticResponseCache(similarity_threshold=0.95, max_entries_per_agent=2)
+        cache.store("professional_learning", [1.0, 0.0, 0.0], "Answer A", [citation])
+
+        hit = cache.lookup("professional_learning", [0.99, 0.05, 0.0])
+        assert hit is not None and hit[0] == "Answer A"
+        assert cache.lookup("professional_learning", [0.0, 1.0, 0.0]) is None
+        assert cache.lookup("classroom_curriculum", [1.0, 0.0, 0.0]) is None
+        print("✓ Similar queries hit, dissimilar queries and other agents miss")
+
+        cache.corpus_version = "2"
+        assert cache.lookup("professional_learning", [1.0, 0.0, 0.0]) is None
+        print("✓ Entries from an older corpus version are stale")
+
+        cache.store("professional_learning", [1.0, 0.0, 0.0], "A", [])
+        cache.store("professional_learning", [0.0, 1.0, 0.0], "B", [])
+        cache.lookup("professional_learning", [1.0, 0.0, 0.0])  # A recently used
+        cache.store("professional_learning", [0.0, 0.0, 1.0], "C", [])
+        assert cache.lookup("professional_learning", [0.0, 1.0, 0.0]) is None  # B evicted
+        assert cache.lookup("professional_learning", [0.0, 0.0, 1.0])[0] == "C"
+        print("✓ Least recently used entry is evicted when full")
+
+        expiring = SemanticResponseCache(ttl_seconds=-1)
+        expiring.store("professional_learning", [1.0, 0.0], "Old", [])
+        assert expiring.lookup("professional_learning", [1.0, 0.0]) is None
+        print("✓ Expired entries are not served")
+
+    except Exception as e:
+        print(f"✗ Response cache test failed: {e}")
+        return False
+
+    return True
+
+
+def test_local_vector_service():
+    """Test in-process vector retrieval over a vector artifact."""
+    print("\nTesting local vector service...")
+
+    import asyncio
+    import tempfile
+    import numpy as np
+    from app.config import Settings
+    from app.services.local_vector_service import LocalVectorService
+    from app.services.vector_artifact import VectorArtifact, write_artifact
+    from app.services.agent_router import AgentRouter
+
+    try:
+        vectors = np.array([
+            [1.0, 0.0, 0.0],
+            [0.9, 0.1, 0.0],
+            [0.0, 1.0, 0.0],
+            [0.8, 0.0, 0.2],
+        ])
+        rows = [
+            {"id": "a_0", "doc_title": "A", "chunk_index": 0, "agent_professional_learning": True},
+            {"id": "a_1", "doc_title": "A", "chunk_index": 1, "agent_professional_learning": True},
+            {"id": "b_0", "doc_title": "B", "chunk_index": 0, "agent_curriculum_planning": True},
+            {"id": "b_1", "doc_title": "B", "chunk_index": 1, "agent_curriculum_planning": True},
+        ]
+        texts = ["alpha", "alpha two", "beta", "beta two ✓"]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            write_artifact(tmp, vectors, rows, texts, corpus_version="v1", dtype="float16")
+            settings = Settings(
+                openai_api_key="test-key",
+                pinecone_api_key="test-key",
+                pinecone_environment="test",
+                pinecone_index_name="test",
+                firebase_project_id="test",
+                firebase_private_key="test",
+                firebase_client_email="test@test",
+                firebase_database_url="https://test.firebaseio.com",
+                pinecone_top_k=2
+            )
+            service = LocalVectorService(settings, artifact=VectorArtifact(tmp))
+
+            citations = asyncio.run(service.query_documents(
+                [1.0, 0.0, 0.0],
+                metadata_filter={"agent_curriculum_planning": {"$eq": True}}
+            ))
+            assert [c.chunk_text for c in citations] == ["beta two ✓", "beta"]
+            assert citations[0].relevance_score > citations[1].relevance_score
+            print("✓ Agent filter masks restrict results and scores are ranked")
+
+            unfiltered = asyncio.run(service.query_documents([1.0, 0.0, 0.0], top_k=1))
+            assert unfiltered[0].source_title == "A" and unfiltered[0].page_number == 0
+            assert service.get_index_stats()["corpus_version"] == "v1"
+            print("✓ Unfiltered top-k search works on a float16 artifact")
+
+            router = AgentRouter(settings, None, service, corpus_version=service.artifact.corpus_version)
+            assert router.response_cache.corpus_version == "v1"
+            assert AgentRouter(settings, None, service).response_cache.corpus_version == settings.corpus_version
+            print("✓ Cached answers are versioned by the loaded artifact's corpus")
+            service.close()
+
+    except Exception as e:
+        print(f"✗ Local vector service test failed: {e}")
+        return False
+
+    return True
+
+
+def test_sse_writer():
+    """Test coalescing of streamed deltas into SSE frames."""
+    print("\nTesting SSE stream writer...")
+
+    import asyncio
+    import json
+    import time
+    from app.utils.sse import SSEStreamWriter
+
+    try:
+        now = [0.0]
+        writer = SSEStreamWriter(flush_interval=0.02, flush_chars=8, clock=lambda: now[0])
+        frames = [writer.content(delta) for delta in ("ab", "cd", "efgh", "i")]
+        assert frames[:2] == [None, None] and frames[3] is None
+        assert json.loads(frames[2][len(b"data: "):]) == {"type": "content", "content": "abcdefgh"}
+        print("✓ Deltas are flushed once enough characters are pending")
+
+        now[0] = 0.05
+        frame = writer.content("j")
+        assert json.loads(frame[len(b"data: "):])["content"] == "ij"
+        assert writer.flush() is None
+        print("✓ Pending deltas are flushed after the time threshold")
+
+        writer.event({"type": "done"})
+        assert writer.text == "abcdefghij"
+        assert writer.stats()["frames"] == 3 and writer.stats()["deltas"] == 5
+        assert writer.stats()["bytes"] == len(frames[2]) + len(frame) + len(b'data: {"type":"done"}\n\n')
+        print("✓ Full text and frame/byte/delta counters are kept")
+
+        async def paused():
+            yield "ab"
+            await asyncio.sleep(0.2)
+            yield "cd"
+
+        async def collect():
+            writer = SSEStreamWriter(flush_interval=0.02, flush_chars=64)
+            start, arrivals = time.monotonic(), []
+            async for frame in writer.stream(paused()):
+                arrivals.append((time.monotonic() - start, json.loads(frame[len(b"data: "):])["content"]))
+            return arrivals, writer.flush()
+
+        arrivals, rest = asyncio.run(collect())
+        # "ab" goes out after the flush interval, not with "cd" 0.2s later
+        assert [content for _, content in arrivals] == ["ab", "cd"] and rest is None
+        assert arrivals[0][0] < 0.15 <= arrivals[1][0]
+        print("✓ Pending deltas are flushed on a timer while the model pauses")
+
+    except Exception as e:
+        print(f"✗ SSE writer test failed: {e}")
+        return False
+
+    return True
+
+
+def test_chat_stream():
+    """Test the chat stream's event order, error events, disconnects and resumes."""
+    print("\nTesting chat stream events...")
+
+    import asyncio
+    import json
+    from types import SimpleNamespace
+    from fastapi import HTTPException
+    from app.models.schemas import ChatRequest, UserInfo, AgentType
+    from app.routes.chat_stream import chat_stream, resume_chat_stream
+    from app.services.chat_pipeline import PreparedTurn, SessionNotFoundError
+    from app.services.stream_registry import StreamRegistry
+    from app.utils.sse import StreamStats
+
+    class StubPipeline:
+        settings = SimpleNamespace(sse_flush_chars=64, sse_flush_interval_ms=20.0, openai_max_tokens=500)
+
+        def __init__(self, error=None):
+            self.error = error
+            self.release = asyncio.Event()
+            self.stream_stats = StreamStats()
+
+        async def prepare(self, **kwargs):
+            await self.release.wait()
+            if self.error:
+                raise self.error
+            return PreparedTurn("s1", [], [], [0.1])
+
+    class StubRequest:
+        def __init__(self, disconnect_after=None):
+            self.checks = 0
+            self.disconnect_after = disconnect_after
+
+        async def is_disconnected(self):
+            self.checks += 1
+            return self.disconnect_after is not None and self.checks > self.disconnect_after
+
+    upstream = {"deltas": ["Hello", " world"], "produced": 0, "closed": False, "delay": 0, "calls": 0}
+
+    async def generate_response_with_streaming(**kwargs):
+        upstream["produced"], upstream["closed"] = 0, False
+        upstream["calls"] += 1
+        try:
+            for token in upstream["deltas"]:
+                await asyncio.sleep(upstream["delay"])
+                upstream["produced"] += 1
+                yield token
+        finally:
+            upstream["closed"] = True
+
+    saved = []
+
+    async def add_messages_to_session(user_id, session_id, messages):
+        saved.append((session_id, [m.content for m in messages], [m.truncated for m in messages]))
+
+    agent_router = SimpleNamespace(
+        openai_service=SimpleNamespace(generate_response_with_streaming=generate_response_with_streaming),
+        get_system_prompt=lambda agent_id: "prompt",
+        store_cached_response=lambda *args: None
+    )
+    firebase_service = SimpleNamespace(add_messages_to_session=add_messages_to_session)
+    user = UserInfo(user_id="u1", verified=True)
+
+    def parse(frame):
+        id_line, data_line = frame.decode().strip().split("\n")
+        return id_line[len("id: "):], json.loads(data_line[len("data: "):])
+
+    async def open_stream(pipeline, registry, session_id=None, http_request=None, last_event_id=None):
+        request = ChatRequest(query="Hi", agent_id=AgentType.PROFESSIONAL_LEARNING, session_id=session_id)
+        return await chat_stream(
+            http_request or StubRequest(), request, user, agent_router, pipeline,
+            firebase_service, registry, last_event_id
+        )
+
+    async def events(pipeline, session_id=None, http_request=None, registry=None):
+        response = await open_stream(pipeline, registry or StreamRegistry(), session_id, http_request)
+        body = response.body_iterator
+        first = parse(await body.__anext__())[1]
+        pipeline.release.set()
+        rest = [parse(chunk)[1] async for chunk in body]
+        await asyncio.sleep(0.01)  # save / grace-period cancel
+        return first, rest
+
+    try:
+        async def run():
+            first, rest = await events(StubPipeline())
+            assert first["type"] == "status" and first["message_id"]
+            assert [e["type"] for e in rest] == ["citations", "content", "done"]
+            assert rest[1]["content"] == "Hello world"  # short deltas coalesced into one frame
+            assert rest[0]["session_id"] == "s1" and saved == [("s1", ["Hi", "Hello world"], [False, False])]
+            print("✓ Status is sent before retrieval, then citations, content and done")
+
+            _, rest = await events(StubPipeline(SessionNotFoundError("Session missing")), "missing")
+            assert rest == [{"type": "error", "code": "session_not_found", "error": "Session missing"}]
+            _, rest = await events(StubPipeline(RuntimeError("Pinecone down")))
+            assert rest[-1]["type"] == "error" and rest[-1]["code"] == "internal"
+            assert len(saved) == 1
+            print("✓ Stage failures become SSE error events")
+
+            # Resume: read two events, drop the connection, reconnect with Last-Event-ID
+            upstream["deltas"], upstream["delay"] = ["word "] * 40, 0.001
+            registry, pipeline = StreamRegistry(grace_seconds=5), StubPipeline()
+            response = await open_stream(pipeline, registry)
+            body = response.body_iterator
+            status_id, status_event = parse(await body.__anext__())
+            pipeline.release.set()
+            citations_id, _ = parse(await body.__anext__())
+            await body.aclose()
+            message_id = status_event["message_id"]
+            assert (status_id, citations_id) == (f"{message_id}:1", f"{message_id}:2")
+            await asyncio.sleep(0.02)  # generation continues with no client attached
+
+            response = await chat_stream(
+                StubRequest(), None, user, agent_router, pipeline, firebase_service, registry, citations_id
+            )  # resumes need no body
+            resumed = [parse(chunk) async for chunk in response.body_iterator]
+            assert resumed[0][0] == f"{message_id}:3" and resumed[-1][1]["type"] == "done"
+            assert "".join(e["content"] for _, e in resumed if e["type"] == "content") == "word " * 40
+            await asyncio.sleep(0.01)  # save after done
+            assert upstream["calls"] == 2 and saved[-1][2] == [False, False]
+
+            response = await resume_chat_stream(message_id, StubRequest(), user, registry, None)
+            replayed = [parse(chunk)[0] async for chunk in response.body_iterator]
+            assert replayed[0] == status_id and replayed[-1] == resumed[-1][0]
+            try:
+                await resume_chat_stream(message_id, StubRequest(), UserInfo(user_id="u2"), registry, None)
+                raise AssertionError("Other users must not resume the stream")
+            except HTTPException as e:
+                assert e.status_code == 404
+            response = await open_stream(pipeline, registry, last_event_id="gone:3")
+            errors = [json.loads(c[len("data: "):]) async for c in response.body_iterator]
+            assert [e["code"] for e in errors] == ["resume_unavailable"]
+            assert registry.stats()["resumed"] == 2 and registry.stats()["resume_misses"] == 2
+            print("✓ Reconnects replay only missed events and regenerate nothing")
+
+            # Disconnect with no reconnect within the grace period
+            upstream["deltas"] = ["word "] * 100
+            pipeline, registry = StubPipeline(), StreamRegistry(grace_seconds=0)
+            first, rest = await events(pipeline, http_request=StubRequest(disconnect_after=3), registry=registry)
+            assert [e["type"] for e in rest][0] == "citations" and rest[-1]["type"] == "content"
+            response = await resume_chat_stream(first["message_id"], StubRequest(), user, registry, None)
+            replayed = [parse(chunk)[1] async for chunk in response.body_iterator]
+            assert replayed[-1] == {"type": "done", "truncated": True}
+            assert upstream["closed"] and upstream["produced"] < 100
+            session_id, contents, truncated = saved[-1]
+            assert contents[1] == "word " * upstream["produced"] and truncated == [False, True]
+            assert pipeline.stream_stats.stats() == {
+                "completed": 0, "cancelled": 1, "cancelled_by_reason": {"disconnected": 1},
+                "upstream_closed": 1, "cancelled_deltas": upstream["produced"],
+                "max_tokens_saved": 500 - upstream["produced"]
+            }
+            print("✓ Disconnects stop generation after the grace period and save a truncated answer")
+
+            # Without resume nobody can reattach, so the grace period is skipped
+            pipeline = StubPipeline()
+            registry = StreamRegistry(grace_seconds=5, resumable=False)
+            first, rest = await events(pipeline, http_request=StubRequest(disconnect_after=3), registry=registry)
+            await asyncio.sleep(0.01)
+            assert upstream["closed"] and upstream["produced"] < 100
+            assert pipeline.stream_stats.cancelled_by_reason == {"disconnected": 1}
+            assert registry.get(first["message_id"], user.user_id) is None
+            print("✓ Disconnects stop generation at once when resume is off")
+
+            pipeline = StubPipeline()
+            response = await open_stream(pipeline, StreamRegistry(grace_seconds=0))
+            pipeline.release.set()
+
+            async def consume():
+                async for _ in response.body_iterator:
+                    pass
+
+            task = asyncio.create_task(consume())
+            await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await asyncio.sleep(0.01)
+            assert upstream["closed"] and pipeline.stream_stats.cancelled == 1
+            assert saved[-1][2] == [False, True]
+            print("✓ Cancelled responses are handled the same way")
+
+        asyncio.run(run())
+
+    except Exception as e:
+        print(f"✗ Chat stream test failed: {e}")
+        return False
+
+    return True
+
+
+def test_chat_websocket():
+    """Test the WebSocket chat transport: auth, multiplexed turns, resume and cancel."""
+    print("\nTesting WebSocket chat...")
+
+    import asyncio
+    import time
+    from types import SimpleNamespace
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from starlette.websockets import WebSocketDisconnect
+    from app.models.schemas import UserInfo
+    from app.routes.chat_ws import router
+    from app.services.chat_pipeline import PreparedTurn
+    from app.services.stream_registry import StreamRegistry
+    from app.utils.sse import StreamStats
+
+    prepared, saved, verified = [], [], []
+
+    class StubPipeline:
+        settings = SimpleNamespace(
+            sse_flush_chars=64, sse_flush_interval_ms=20.0, openai_max_tokens=500,
+            max_conversation_history=2, ws_auth_timeout_seconds=5, ws_max_inflight_turns=4
+        )
+        stream_stats = StreamStats()
+
+        async def prepare(self, **kwargs):
+            prepared.append(kwargs)
+            return PreparedTurn(kwargs["session_id"] or "s-new", [], [], [0.1])
+
+    async def generate_response_with_streaming(user_query, **kwargs):
+        for _ in range(200 if user_query == "slow" else 1):
+            await asyncio.sleep(0.005 if user_query == "slow" else 0)
+            yield f"Answer to {user_query}. "
+
+    async def verify_token(token):
+        verified.append(token)
+        if token != "good":
+            raise ValueError("Invalid token")
+        return UserInfo(user_id="u1", expires_at=int(time.time()) + 3600)
+
+    async def add_messages_to_session(user_id, session_id, messages):
+        await asyncio.sleep(0.02)
+        saved.append((session_id, [m.content for m in messages], [m.truncated for m in messages]))
+
+    app = FastAPI()
+    app.include_router(router)
+    app.state.services = SimpleNamespace(
+        agent_router=SimpleNamespace(
+            openai_service=SimpleNamespace(generate_response_with_streaming=generate_response_with_streaming),
+            get_system_prompt=lambda agent_id: "prompt",
+            store_cached_response=lambda *args: None
+        ),
+        chat_pipeline=StubPipeline(),
+        firebase_service=SimpleNamespace(verify_token=verify_token, add_messages_to_session=add_messages_to_session),
+        stream_registry=StreamRegistry(grace_seconds=5)
+    )
+
+    def until_done(ws, turns):
+        events = {}
+        while turns:
+            message = ws.receive_json()
+            events.setdefault(message["request_id"], []).append(message["event"])
+            if message["event"]["type"] == "done":
+                turns -= 1
+        return events
+
+    def wait_for(condition):
+        deadline = time.time() + 2
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    try:
+        client = TestClient(app)
+        with client.websocket_connect("/ws/chat") as ws:
+            ws.send_json({"type": "auth", "token": "bad"})
+            try:
+                ws.receive_json()
+                raise AssertionError("Invalid tokens must close the connection")
+            except WebSocketDisconnect as e:
+                assert e.code == 1008
+        print("✓ Connections with invalid tokens are closed")
+
+        with client.websocket_connect("/ws/chat") as ws:
+            ws.send_json({"type": "auth", "token": "good"})
+            assert ws.receive_json()["type"] == "ready"
+
+            ws.send_json({"type": "chat", "request_id": "a", "query": "one", "agent_id": "professional_learning"})
+            ws.send_json({"type": "chat", "request_id": "b", "query": "two", "agent_id": "professional_learning",
+                          "session_id": "s1"})
+            events = until_done(ws, 2)
+            for request_id, query in (("a", "one"), ("b", "two")):
+                assert [e["type"] for e in events[request_id]] == ["status", "citations", "content", "done"]
+                assert events[request_id][2]["content"] == f"Answer to {query}. "
+            assert events["a"][0]["message_id"] != events["b"][0]["message_id"]
+            print("✓ Concurrent turns are multiplexed by message ID")
+
+            assert wait_for(lambda: len(saved) == 2)
+            ws.send_json({"type": "chat", "request_id": "c", "query": "three", "agent_id": "professional_learning",
+                          "session_id": "s-new"})
+            until_done(ws, 1)
+            # History is loaded by the pipeline (validated session cache), not kept per connection
+            assert prepared[-1]["session_id"] == "s-new" and "recent_messages" not in prepared[-1]
+            assert verified == ["bad", "good"]
+            print("✓ One auth per connection")
+
+            ws.send_json({"type": "chat", "request_id": "g", "query": "slow", "agent_id": "professional_learning"})
+            while (message := ws.receive_json())["event"]["type"] != "content":
+                pass
+            for _ in range(2):
+                ws.send_json({"type": "resume", "message_id": message["message_id"],
+                              "last_event_id": message["event_id"]})
+            event_ids = [message["event_id"]]
+            while (message := ws.receive_json())["event"]["type"] != "done":
+                event_ids.append(message["event_id"])
+            seqs = [int(event_id.rsplit(":", 1)[1]) for event_id in event_ids]
+            assert seqs == sorted(set(seqs)) and len(seqs) > 2
+            print("✓ Repeated resumes replace the forwarder instead of duplicating events")
+
+            ws.send_json({"type": "chat", "request_id": "d", "query": "slow", "agent_id": "professional_learning"})
+            while (message := ws.receive_json())["event"]["type"] != "content":
+                pass
+            ws.send_json({"type": "cancel", "message_id": message["message_id"]})
+            while (message := ws.receive_json())["event"]["type"] != "done":
+                pass
+            assert message["event"]["truncated"] is True
+            assert wait_for(lambda: StubPipeline.stream_stats.cancelled == 1)
+            assert wait_for(lambda: saved[-1][1][0] == "slow") and saved[-1][2] == [False, True]
+
+            # A cancel that arrives while a completed turn is being saved is ignored
+            ws.send_json({"type": "chat", "request_id": "f", "query": "four", "agent_id": "professional_learning",
+                          "session_id": "s1"})
+            while (message := ws.receive_json())["event"]["type"] != "done":
+                pass
+            ws.send_json({"type": "cancel", "message_id": message["message_id"]})
+            assert wait_for(lambda: saved[-1][1] == ["four", "Answer to four. "])
+            assert saved[-1][2] == [False, False] and StubPipeline.stream_stats.cancelled == 1
+
+            ws.send_json({"type": "chat", "request_id": "e", "agent_id": "professional_learning"})
+            while (message := ws.receive_json())["type"] != "error":
+                pass
+            assert message["code"] == "invalid_request"
+            for frame in ('"hello"', "[1, 2]", "not json", {"type": ["chat"]}):
+                ws.send_json(frame) if isinstance(frame, dict) else ws.send_text(frame)
+                assert ws.receive_json()["code"] == "invalid_request"
+            ws.send_bytes(b"\x00\x01")
+            assert ws.receive_json()["code"] == "invalid_request"
+            ws.send_json({"type": "cancel", "message_id": ["x"]})
+            ws.send_json({"type": "resume", "message_id": {"x": 1}})
+            assert ws.receive_json()["code"] == "resume_unavailable"
+            print("✓ Cancelled turns are saved as truncated; invalid messages and frames get error messages")
+
+    except Exception as e:
+        print(f"✗ WebSocket chat test failed: {e}")
+        return False
+
+    return True
+
+
 def run_all_tests():
     """Run all tests."""
     print("=" * 60)
@@ -288,6 +1059,16 @@ def run_all_tests():
         ("Configuration", test_config),
         ("Prompt Utils", test_prompt_utils),
         ("Agent Types", test_agent_types),
+        ("Stage Graph", test_stage_graph),
+        ("Chat Pipeline", test_chat_pipeline),
+        ("SWR Cache", test_swr_cache),
+        ("Token Cache", test_token_cache),
+        ("Embedding Cache", test_embedding_cache),
+        ("Response Cache", test_response_cache),
+        ("Local Vectors", test_local_vector_service),
+        ("SSE Writer", test_sse_writer),
+        ("Chat Stream", test_chat_stream),
+        ("WebSocket Chat", test_chat_websocket),
     ]
 
     results = []
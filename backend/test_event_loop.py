@@ -0,0 +1,185 @@
+"""
+Load test: event-loop responsiveness under concurrent Pinecone queries.
+
+Replaces the Pinecone index with a stand-in whose query blocks like a real
+network round-trip, fires many concurrent queries through PineconeService,
+and measures how late a 5ms heartbeat task wakes up while they run.
+
+Run directly for a report:
+    python test_event_loop.py
+"""
+import asyncio
+import sys
+import os
+import time
+
+# Add app to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+QUERY_LATENCY = 0.1  # Simulated Pinecone round-trip (seconds)
+CONCURRENT_QUERIES = 32
+HEARTBEAT_INTERVAL = 0.005
+
+
+class _Match:
+    def __init__(self, i):
+        self.id = f"doc_{i}"
+        self.score = 0.9
+        self.metadata = {"doc_title": f"Doc {i}", "chunk_index": i, "text": "chunk"}
+
+
+class _Results:
+    def __init__(self, k):
+        self.matches = [_Match(i) for i in range(k)]
+
+
+class BlockingIndex:
+    """Stand-in for a Pinecone index whose calls block the calling thread."""
+
+    def __init__(self, latency: float = QUERY_LATENCY):
+        self.latency = latency
+
+    def query(self, vector, top_k, include_metadata=True, filter=None):
+        time.sleep(self.latency)
+        return _Results(top_k)
+
+
+def _make_service(max_workers: int, **settings_overrides):
+    from app.config import Settings
+    from app.services.pinecone_service import PineconeService
+
+    settings = Settings(
+        openai_api_key="test-key",
+        pinecone_api_key="test-key",
+        pinecone_environment="test",
+        pinecone_index_name="test",
+        pinecone_max_workers=max_workers,
+        firebase_project_id="test",
+        firebase_private_key="test",
+        firebase_client_email="test@test",
+        firebase_database_url="https://test.firebaseio.com",
+        **settings_overrides
+    )
+    service = PineconeService(settings)
+    service._index = BlockingIndex()
+    return service
+
+
+async def _measure(query_fn) -> dict:
+    """Run CONCURRENT_QUERIES queries while sampling event-loop lag."""
+    lags = []
+    stop = asyncio.Event()
+
+    async def heartbeat():
+        while not stop.is_set():
+            expected = time.perf_counter() + HEARTBEAT_INTERVAL
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            lags.append(max(0.0, time.perf_counter() - expected))
+
+    beat = asyncio.create_task(heartbeat())
+    await asyncio.sleep(HEARTBEAT_INTERVAL * 2)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(query_fn() for _ in range(CONCURRENT_QUERIES)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await beat
+    return {"elapsed": elapsed, "max_lag": max(lags), "samples": len(lags)}
+
+
+async def _blocking_baseline(service) -> dict:
+    """Previous behaviour: the SDK call runs directly on the event loop."""
+    async def query():
+        return service._index.query(vector=[0.0] * 8, top_k=3)
+    return await _measure(query)
+
+
+async def _executor_backed(service) -> dict:
+    async def query():
+        return await service.query_documents([0.0] * 8, top_k=3)
+    return await _measure(query)
+
+
+def test_event_loop_responsiveness():
+    """Concurrent queries must not stall the event loop."""
+    print("Testing event-loop responsiveness under concurrent Pinecone queries...")
+
+    try:
+        service = _make_service(max_workers=8)
+        result = asyncio.run(_executor_backed(service))
+        service.close()
+
+        # The loop keeps ticking while queries are in flight
+        assert result["max_lag"] < QUERY_LATENCY / 2, result
+        # Bounded pool: 32 queries over 8 workers take ~4 round-trips, not 32
+        assert result["elapsed"] < QUERY_LATENCY * CONCURRENT_QUERIES / 4, result
+        print(
+            f"✓ {CONCURRENT_QUERIES} queries in {result['elapsed']:.2f}s, "
+            f"max loop lag {result['max_lag'] * 1000:.1f}ms"
+        )
+    except Exception as e:
+        print(f"✗ Event-loop responsiveness test failed: {e}")
+        return False
+
+    return True
+
+
+def test_abandoned_calls():
+    """Timed-out calls that still hold a worker make new calls fail fast."""
+    print("\nTesting timed-out Pinecone calls...")
+
+    async def run():
+        service = _make_service(max_workers=2, pinecone_timeout_seconds=0.05, pinecone_max_abandoned_calls=1)
+        service._index = BlockingIndex(latency=0.3)
+        try:
+            for _ in range(2):
+                start = time.perf_counter()
+                try:
+                    await service.query_documents([0.0] * 8, top_k=3)
+                    raise AssertionError("A stalled query must time out")
+                except TimeoutError:
+                    pass
+                elapsed = time.perf_counter() - start
+            # The second call failed at once instead of waiting for a worker
+            assert service.abandoned_calls == 1 and elapsed < 0.05, elapsed
+
+            await asyncio.sleep(0.35)
+            assert service.abandoned_calls == 0
+            service._index = BlockingIndex(latency=0)
+            assert len(await service.query_documents([0.0] * 8, top_k=3)) == 3
+        finally:
+            service.close()
+
+    try:
+        asyncio.run(run())
+        print("✓ Abandoned calls are tracked until their worker returns; new calls fail fast meanwhile")
+    except Exception as e:
+        print(f"✗ Abandoned call test failed: {e}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    service = _make_service(max_workers=8)
+
+    print("=" * 60)
+    print(f"{CONCURRENT_QUERIES} concurrent queries, {QUERY_LATENCY * 1000:.0f}ms each")
+    print("=" * 60)
+
+    before = asyncio.run(_blocking_baseline(service))
+    print(
+        f"Blocking SDK call on loop : total {before['elapsed']:.2f}s, "
+        f"max loop lag {before['max_lag'] * 1000:.1f}ms"
+    )
+
+    after = asyncio.run(_executor_backed(service))
+    print(
+        f"Executor-backed (8 workers): total {after['elapsed']:.2f}s, "
+        f"max loop lag {after['max_lag'] * 1000:.1f}ms"
+    )
+    service.close()
+
+    success = all([test_event_loop_responsiveness(), test_abandoned_calls()])
+    sys.exit(0 if success else 1)
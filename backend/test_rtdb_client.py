@@ -0,0 +1,1001 @@
+"""
+Tests for the async Realtime Database client against a local stand-in server.
+
+FakeRealtimeDatabase is a minimal in-memory implementation of the RTDB REST
+API (GET with shallow/orderBy/limit/range, PUT with ETag preconditions,
+multi-path PATCH, POST push, DELETE, ServerValue increments). It is served
+in-process through httpx's ASGI transport and is reused by other test files.
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import sys
+import os
+import time
+from urllib.parse import unquote
+
+# Add app to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.rtdb_client import key_order
+
+
+class FakeRealtimeDatabase:
+    """In-memory stand-in for the Realtime Database REST API (ASGI app)."""
+
+    def __init__(self, data=None):
+        self.data = data or {}
+        self.requests = []  # (method, path, query params) log
+
+    # -- tree helpers -------------------------------------------------
+    @staticmethod
+    def _parts(path):
+        return [p for p in path.strip('/').split('/') if p]
+
+    def read(self, path):
+        node = self.data
+        for part in self._parts(path):
+            if isinstance(node, list) and part.isdigit() and int(part) < len(node):
+                node = node[int(part)]
+            elif isinstance(node, dict) and part in node:
+                node = node[part]
+            else:
+                return None
+        return node if node != {} else None
+
+    def write(self, path, value):
+        parts = self._parts(path)
+        value = self._resolve_server_values(path, value)
+        if not parts:
+            self.data = value if isinstance(value, dict) else {}
+            return
+        node = self.data
+        for part in parts[:-1]:
+            child = node.get(part)
+            if isinstance(child, list):
+                # Writing a child key into an array turns it into an object
+                child = node[part] = {str(i): v for i, v in enumerate(child) if v is not None}
+            if not isinstance(child, dict):
+                node[part] = {}
+            node = node[part]
+        if value is None or value == [] or value == {}:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = value
+
+    def _resolve_server_values(self, path, value):
+        if isinstance(value, dict):
+            if '.sv' in value:
+                sv = value['.sv']
+                if sv == 'timestamp':
+                    return int(time.time() * 1000)
+                if isinstance(sv, dict) and 'increment' in sv:
+                    current = self.read(path)
+                    return (current if isinstance(current, (int, float)) else 0) + sv['increment']
+            return {
+                k: self._resolve_server_values(f"{path}/{k}", v)
+                for k, v in value.items() if v is not None
+            }
+        return value
+
+    @staticmethod
+    def etag(value):
+        return hashlib.md5(json.dumps(value, sort_keys=True).encode()).hexdigest()
+
+    # -- query evaluation ---------------------------------------------
+    @staticmethod
+    def _order_value(value):
+        if value is None:
+            return (0, 0)
+        if isinstance(value, bool):
+            return (1, value)
+        if isinstance(value, (int, float)):
+            return (2, value)
+        if isinstance(value, str):
+            return (3, value)
+        return (4, 0)
+
+    def _apply_query(self, value, params):
+        if not isinstance(value, (dict, list)):
+            return value
+        items = list(value.items()) if isinstance(value, dict) else [
+            (str(i), v) for i, v in enumerate(value) if v is not None
+        ]
+        order_by = json.loads(params['orderBy'])
+
+        def ordered(item):
+            key, child = item
+            if order_by == '$key':
+                return key_order(key)
+            if order_by == '$value':
+                return self._order_value(child)
+            return self._order_value(child.get(order_by) if isinstance(child, dict) else None)
+
+        items.sort(key=lambda item: (ordered(item), key_order(item[0])))
+        for name, cmp in (('startAt', lambda a, b: a >= b), ('endAt', lambda a, b: a <= b),
+                          ('equalTo', lambda a, b: a == b)):
+            if name in params:
+                bound = json.loads(params[name])
+                bound_key = key_order(bound) if order_by == '$key' else self._order_value(bound)
+                items = [item for item in items if cmp(ordered(item), bound_key)]
+        if 'limitToFirst' in params:
+            items = items[:int(params['limitToFirst'])]
+        if 'limitToLast' in params:
+            items = items[-int(params['limitToLast']):]
+        return dict(items)
+
+    # -- ASGI ----------------------------------------------------------
+    async def __call__(self, scope, receive, send):
+        assert scope['type'] == 'http'
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+
+        method = scope['method']
+        path = unquote(scope['path'])
+        assert path.endswith('.json'), path
+        path = path[:-len('.json')]
+        params = {}
+        for pair in scope['query_string'].decode().split('&'):
+            if pair:
+                key, _, value = pair.partition('=')
+                params[unquote(key)] = unquote(value.replace('+', ' '))
+        headers = {k.decode().lower(): v.decode() for k, v in scope['headers']}
+        self.requests.append((method, path, params))
+
+        status, payload, extra_headers = self.handle(method, path, params, headers, body)
+        content = b'' if status == 204 else json.dumps(payload).encode()
+        response_headers = [(b'content-type', b'application/json')]
+        response_headers += [(k.encode(), v.encode()) for k, v in extra_headers.items()]
+        await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': content})
+
+    def handle(self, method, path, params, headers, body):
+        silent = params.get('print') == 'silent'
+        if method == 'GET':
+            value = copy.deepcopy(self.read(path))
+            if params.get('shallow') == 'true' and isinstance(value, dict):
+                value = {k: (v if not isinstance(v, (dict, list)) else True) for k, v in value.items()}
+            if 'orderBy' in params:
+                value = self._apply_query(value, params)
+            extra = {'ETag': self.etag(value)} if headers.get('x-firebase-etag') == 'true' else {}
+            return 200, value, extra
+
+        payload = json.loads(body) if body else None
+        if method == 'PUT':
+            if 'if-match' in headers:
+                current = self.read(path)
+                if headers['if-match'] != self.etag(current):
+                    return 412, current, {'ETag': self.etag(current)}
+            self.write(path, payload)
+            return (204, None, {}) if silent else (200, self.read(path), {})
+        if method == 'PATCH':
+            for rel_path, value in payload.items():
+                self.write(f"{path}/{rel_path}", value)
+            return (204, None, {}) if silent else (200, payload, {})
+        if method == 'POST':
+            key = f"-{time.time_ns():020d}"
+            self.write(f"{path}/{key}", payload)
+            return 200, {'name': key}, {}
+        if method == 'DELETE':
+            self.write(path, None)
+            return (204, None, {}) if silent else (200, None, {})
+        return 405, {'error': 'method not allowed'}, {}
+
+
+def make_client(fake=None):
+    """Create a RealtimeDatabaseClient wired to a FakeRealtimeDatabase."""
+    import httpx
+    from app.services.rtdb_client import RealtimeDatabaseClient
+
+    fake = fake or FakeRealtimeDatabase()
+    client = RealtimeDatabaseClient(
+        "http://rtdb.local",
+        transport=httpx.ASGITransport(app=fake)
+    )
+    return client, fake
+
+
+def make_settings(**overrides):
+    """Create Settings with placeholder credentials for offline tests."""
+    from app.config import Settings
+
+    values = dict(
+        openai_api_key="test-key",
+        pinecone_api_key="test-key",
+        pinecone_environment="test",
+        pinecone_index_name="test",
+        firebase_project_id="test",
+        firebase_private_key="test",
+        firebase_client_email="test@test",
+        firebase_database_url="http://rtdb.local"
+    )
+    values.update(overrides)
+    return Settings(**values)
+
+
+def make_firebase_service(fake=None, **settings_overrides):
+    """Create a FirebaseService backed by a FakeRealtimeDatabase (no Admin SDK)."""
+    from app.services.firebase_service import FirebaseService
+
+    client, fake = make_client(fake)
+
+    class OfflineFirebaseService(FirebaseService):
+        @classmethod
+        def _initialize_sdk(cls, settings):
+            pass
+
+        @classmethod
+        def _create_rtdb_client(cls, settings):
+            return client
+
+    return OfflineFirebaseService(make_settings(**settings_overrides)), fake
+
+
+def test_rtdb_client():
+    """Test REST reads, writes and queries against the stand-in server."""
+    print("Testing Realtime Database client...")
+
+    from app.services.rtdb_client import PreconditionFailedError
+
+    async def run():
+        client, fake = make_client()
+
+        # set / get / shallow
+        await client.set('sessions/u1/s1', {'title': 'One', 'last_accessed': '2024-01-02'})
+        await client.set('sessions/u1/s2', {'title': 'Two', 'last_accessed': '2024-01-03'})
+        assert (await client.get('sessions/u1/s1'))['title'] == 'One'
+        assert await client.get('sessions/u1', shallow=True) == {'s1': True, 's2': True}
+        print("✓ set/get/shallow work")
+
+        # ordered + limited query
+        latest = await client.query('sessions/u1', order_by='last_accessed', limit_to_last=1)
+        assert [key for key, _ in latest] == ['s2']
+        print("✓ orderBy/limitToLast query works")
+
+        # multi-path update
+        await client.update('', {
+            'sessions/u1/s1/title': 'Renamed',
+            'sessions/u1/s2/count': {'.sv': {'increment': 2}},
+        })
+        assert (await client.get('sessions/u1/s1/title')) == 'Renamed'
+        assert (await client.get('sessions/u1/s2/count')) == 2
+        print("✓ multi-path PATCH works")
+
+        # ETag conditional write
+        value, etag = await client.get_with_etag('sessions/u1/s1/title')
+        await client.set('sessions/u1/s1/title', 'Third', etag=etag)
+        try:
+            await client.set('sessions/u1/s1/title', 'Stale', etag=etag)
+            raise AssertionError("stale ETag write should fail")
+        except PreconditionFailedError as e:
+            assert e.value == 'Third'
+        print("✓ ETag conditional writes detect concurrent changes")
+
+        # paginate past more than a page of children sharing one ordered value
+        await client.update('', {f'ties/k{i:02d}': {'day': 'a' if i < 7 else 'b'} for i in range(10)})
+        keys = [key async for key, _ in client.paginate('ties', order_by='day', page_size=3)]
+        assert keys == [f'k{i:02d}' for i in range(10)]
+        print("✓ paginate widens pages past ties on the ordered value")
+
+        # push + delete
+        key = await client.push('sessions/u1/s1/messages', {'role': 'user'})
+        assert (await client.get(f'sessions/u1/s1/messages/{key}'))['role'] == 'user'
+        await client.delete('sessions/u1/s1')
+        assert await client.get('sessions/u1/s1') is None
+        print("✓ push/delete work")
+
+        await client.close()
+
+    try:
+        asyncio.run(run())
+    except Exception as e:
+        print(f"✗ Realtime Database client test failed: {e}")
+        return False
+
+    return True
+
+
+def test_firebase_service_sessions():
+    """Test FirebaseService session storage through the async client."""
+    print("\nTesting FirebaseService on the async client...")
+
+    from datetime import datetime
+    from app.models.schemas import Message
+
+    async def run():
+        service, fake = make_firebase_service()
+
+        session_id = await service.create_session("u1", "professional_learning", "Test")
+        await asyncio.gather(*(
+            service.add_message_to_session(
+                "u1", session_id,
+                Message(role="user", content=f"Q{i}", timestamp=datetime.utcnow())
+            )
+            for i in range(5)
+        ))
+        session = await service.get_session("u1", session_id)
+        assert len(session.messages) == 5  # concurrent appends are not lost
+        print("✓ Concurrent appends are not lost")
+
+        fake.requests.clear()
+        await service.add_messages_to_session("u1", session_id, [
+            Message(role="user", content="question", timestamp=datetime.utcnow()),
+            Message(role="assistant", content="answer", timestamp=datetime.utcnow()),
+        ])
+        assert [r[0] for r in fake.requests] == ['PATCH']  # one write per turn
+        session = await service.get_session("u1", session_id)
+        assert [m.content for m in session.messages[-2:]] == ["question", "answer"]
+        print("✓ A turn is one multi-path write, in order")
+
+        # Sessions written before push keys stored messages as a list
+        legacy = {"role": "user", "content": "old", "timestamp": datetime.utcnow().isoformat()}
+        fake.write("sessions/u1/legacy", {
+            "session_id": "legacy", "user_id": "u1", "agent_id": "professional_learning",
+            "created_at": legacy["timestamp"], "last_accessed": legacy["timestamp"],
+            "messages": [legacy, legacy]
+        })
+        await service.add_message_to_session(
+            "u1", "legacy", Message(role="user", content="new", timestamp=datetime.utcnow())
+        )
+        session = await service.get_session("u1", "legacy")
+        assert [m.content for m in session.messages] == ["old", "old", "new"]
+        assert await service.delete_session("u1", "legacy")
+        print("✓ Legacy list sessions keep their order when appended to")
+
+        sessions = await service.get_user_sessions("u1")
+        assert [s.session_id for s in sessions] == [session_id]
+        assert not await service.delete_session("u2", session_id)
+        assert await service.delete_session("u1", session_id)
+        assert await service.get_session("u1", session_id) is None
+        assert not await service.delete_session("u1", session_id)
+        print("✓ Session create/list/delete work")
+
+        await service.close()
+
+    try:
+        asyncio.run(run())
+    except Exception as e:
+        print(f"✗ FirebaseService test failed: {e}")
+        return False
+
+    return True
+
+
+def test_session_index():
+    """Test the session index used by the sessions list endpoint."""
+    print("\nTesting session index...")
+
+    from datetime import datetime
+    from app.models.schemas import Message
+
+    async def run():
+        service, fake = make_firebase_service()
+
+        first = await service.create_session("u1", "professional_learning", "First")
+        second = await service.create_session("u1", "classroom_curriculum", "Second")
+        await service.add_messages_to_session("u1", first, [
+            Message(role="user", content="How do PLCs work?", timestamp=datetime.utcnow()),
+            Message(role="assistant", content="x" * 500, timestamp=datetime.utcnow()),
+        ])
+
+        await service.get_user_sessions("u1")  # first call checks for missing entries
+        fake.requests.clear()
+        sessions = await service.get_user_sessions("u1", limit=1)
+        assert [s.session_id for s in sessions] == [first]  # most recently used
+        assert sessions[0].message_count == 2
+        assert len(sessions[0].last_message_preview) == service.PREVIEW_LENGTH
+        assert all(path.startswith('/session_index') for _, path, _ in fake.requests)
+        print("✓ List reads only the top N index entries")
+
+        # A session stored before the index existed, then written to once
+        timestamp = datetime.utcnow().isoformat()
+        fake.write("sessions/u1/legacy", {
+            "session_id": "legacy", "user_id": "u1", "agent_id": "professional_learning",
+            "title": "Legacy", "created_at": timestamp, "last_accessed": timestamp,
+            "messages": [{"role": "user", "content": "old", "timestamp": timestamp}]
+        })
+        await service.add_message_to_session(
+            "u1", "legacy", Message(role="assistant", content="new", timestamp=datetime.utcnow())
+        )
+        sessions = await service.get_user_sessions("u1")
+        assert [s.session_id for s in sessions] == ["legacy", first, second]
+        assert sessions[0].title == "Legacy" and sessions[0].message_count == 2
+        print("✓ Sessions without index entries are backfilled")
+
+        await service.delete_session("u1", second)
+        assert fake.read("session_index/u1/" + second) is None
+        print("✓ Deleting a session removes its index entry")
+
+        await service.close()
+
+    try:
+        asyncio.run(run())
+    except Exception as e:
+        print(f"✗ Session index test failed: {e}")
+        return False
+
+    return True
+
+
+def test_message_pagination():
+    """Test cursor-paginated message retrieval."""
+    print("\nTesting message pagination...")
+
+    from datetime import datetime
+    from app.models.schemas import Message
+
+    async def run():
+        service, fake = make_firebase_service()
+
+        session_id = await service.create_session("u1", "professional_learning", "Long")
+        for turn in range(5):
+            await service.add_messages_to_session("u1", session_id, [
+                Message(role="user", content=f"Q{turn}", timestamp=datetime.utcnow()),
+                Message(role="assistant", content=f"A{turn}", timestamp=datetime.utcnow()),
+            ])
+
+        pages, cursor = [], None
+        while True:
+            page = await service.get_session_messages("u1", session_id, limit=4, before=cursor)
+            pages.append([m.content for m in page.messages])
+            if not page.has_more:
+                break
+            cursor = page.next_cursor
+
+        assert pages == [["Q3", "A3", "Q4", "A4"], ["Q1", "A1", "Q2", "A2"], ["Q0", "A0"]]
+        params = [p for method, path, p in fake.requests if path.endswith('/messages')]
+        assert all('limitToLast' in p for p in params)  # never a full read
+        print("✓ Pages walk back from the newest message via limited key queries")
+
+        assert await service.get_session_messages("u1", "missing") is None
+        print("✓ Unknown sessions return None")
+
+        await service.close()
+
+    try:
+        asyncio.run(run())
+    except Exception as e:
+        print(f"✗ Message pagination test failed: {e}")
+        return False
+
+    return True
+
+
+def test_session_history_cache():
+    """Test the write-through session history cache."""
+    print("\nTesting session history cache...")
+
+    from datetime import datetime
+    from app.models.schemas import Message
+
+    async def run():
+        service, fake = make_firebase_service(max_conversation_history=1)
+
+        session_id = await service.create_session("u1", "professional_learning", "Cached")
+        for turn in range(2):
+            await service.add_messages_to_session("u1", session_id, [
+                Message(role="user", content=f"Q{turn}", timestamp=datetime.utcnow()),
+                Message(role="assistant", content=f"A{turn}", timestamp=datetime.utcnow()),
+            ])
+
+        fake.requests.clear()
+        messages = await service.get_recent_messages("u1", session_id)
+        assert [m.content for m in messages] == ["Q1", "A1"]  # tail window only
+        assert [path for _, path, _ in fake.requests] == [f"/session_index/u1/{session_id}/message_count"]
+        print("✓ Follow-up turns read their own writes; only the message count is checked")
+
+        service.session_cache.invalidate("u1", session_id)
+        messages = await service.get_recent_messages("u1", session_id)
+        assert [m.content for m in messages] == ["Q1", "A1"]
+        # Ownership field read + last-K query; never the full session
+        params = {path: p for _, path, p in fake.requests}
+        assert sorted(params) == [
+            f"/session_index/u1/{session_id}/message_count",
+            f"/sessions/u1/{session_id}/messages", f"/sessions/u1/{session_id}/session_id"
+        ]
+        assert params[f"/sessions/u1/{session_id}/messages"]["limitToLast"] == "2"
+        print("✓ Misses fetch only the ownership check and the last K messages")
+
+        await service.delete_session("u1", session_id)
+        assert await service.get_recent_messages("u1", session_id) is None
+        stats = service.session_cache.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1
+        print("✓ Deletes invalidate the cache; hit-rate counters work")
+
+        # Two workers sharing one database: each caches the session, then
+        # the other one saves a turn
+        other, _ = make_firebase_service(fake, max_conversation_history=1)
+        session_id = await service.create_session("u1", "professional_learning", "Shared")
+        assert await service.get_recent_messages("u1", session_id) == []
+        await other.add_messages_to_session("u1", session_id, [
+            Message(role="user", content="Q0", timestamp=datetime.utcnow()),
+            Message(role="assistant", content="A0", timestamp=datetime.utcnow()),
+        ])
+        messages = await service.get_recent_messages("u1", session_id)
+        assert [m.content for m in messages] == ["Q0", "A0"]
+        assert service.session_cache.stats()["stale"] == 1
+
+        # This worker's own append keeps its entry valid; the other's is now stale
+        assert [m.content for m in await other.get_recent_messages("u1", session_id)] == ["Q0", "A0"]
+        await service.add_messages_to_session("u1", session_id, [
+            Message(role="user", content="Q1", timestamp=datetime.utcnow()),
+            Message(role="assistant", content="A1", timestamp=datetime.utcnow()),
+        ])
+        assert [m.content for m in await service.get_recent_messages("u1", session_id)] == ["Q1", "A1"]
+        assert [m.content for m in await other.get_recent_messages("u1", session_id)] == ["Q1", "A1"]
+        assert service.session_cache.stats()["stale"] == 1 and other.session_cache.stats()["stale"] == 1
+        print("✓ Tails extended by another worker are re-read, not served stale")
+
+        await other.close()
+        await service.close()
+
+    try:
+        asyncio.run(run())
+    except Exception as e:
+        print(f"✗ Session history cache test failed: {e}")
+        return False
+
+    return True
+
+
+def test_analytics_rollups():
+    """Test write-time analytics rollups against a full backfill."""
+    print("\nTesting analytics rollups...")
+
+    from datetime import datetime, timedelta
+    from app.services.analytics_service import AnalyticsService
+
+    async def run():
+        service, fake = make_firebase_service()
+        # A second worker sharing the database
+        other_worker, _ = make_firebase_service(fake)
+
+        sessions = []
+        for user_id, agent_id in (("u1", "professional_learning"), ("u1", "classroom_curriculum"),
+                                  ("u2", "professional_learning")):
+            sessions.append(await service.create_session(user_id, agent_id))
+        sessions.append(await other_worker.create_session("u2", "professional_learning"))
+        await service.save_feedback("u1", sessions[0], "m1", 5)
+        await service.save_feedback("u1", sessions[0], "m2", 3)
+        await service.save_feedback("u2", sessions[2], "m3", 2)
+        await service.delete_session("u2", sessions[3])
+
+        analytics = AnalyticsService(service.settings, service)
+        fake.requests.clear()
+        live = await analytics.get_analytics(days=7)
+        assert not any(path.startswith(('/sessions', '/feedback')) for _, path, _ in fake.requests)
+        assert live["total_conversations"] == 3 and live["active_users"] == 2
+        assert live["agent_usage_counts"] == {"professional_learning": 2, "classroom_curriculum": 1}
+        assert live["avg_rating"] == 3.33 and live["total_feedback_count"] == 3
+        assert live["top_rated_sessions"][0] == {
+            "session_id": sessions[0], "avg_rating": 4.0, "rating_count": 2
+        }
+        assert live["recent_activity"][-1]["sessions"] == 3 and live["sessions_this_week"] == 3
+        assert all("orderBy" in params for _, path, params in fake.requests
+                   if path.startswith('/analytics/session_ratings'))
+        print("✓ Analytics are served from rollups without scanning sessions")
+
+        await analytics.backfill()
+        rebuilt = await analytics.get_analytics(days=7)
+        live.pop("generated_at"), rebuilt.pop("generated_at")
+        assert rebuilt == live
+        assert (await analytics.get_summary())["active_users"] == 2
+        print("✓ Backfill reproduces the incrementally maintained rollups")
+
+        # The week is a rolling 7 x 24h window, not the last 7 calendar days
+        now = datetime.utcnow()
+        for session_id, age in (("inside", timedelta(days=7) - timedelta(minutes=5)),
+                                ("outside", timedelta(days=7, minutes=5))):
+            created_at = (now - age).isoformat()
+            await service.rtdb.update("", service._session_rollup_updates(
+                session_id, "professional_learning", created_at, 1
+            ))
+        assert (await analytics.compute_analytics(days=7))["sessions_this_week"] == 4
+        print("✓ Sessions this week use a rolling window")
+
+        # Deleting a user's last session removes them from the distinct users
+        await service.delete_session("u2", sessions[2])
+        assert fake.read("analytics/users/u2") == 0 and fake.read("analytics/users/u1") == 2
+        assert (await analytics.compute_summary())["active_users"] == 1
+        exporter = analytics.create_exporter()
+        assert [user_id async for user_id in exporter.iter_user_ids()] == ["u1"]
+        print("✓ Deleting a user's last session decrements active users")
+
+        await service.close()
+        await other_worker.close()
+
+    try:
+        asyncio.run(run())
+    except Exception as e:
+        print(f"✗ Analytics rollup test failed: {e}")
+        return False
+
+    return True
+
+
+def test_analytics_snapshot():
+    """Test the columnar analytics snapshot job and vectorized queries."""
+    print("\nTesting columnar analytics snapshot...")
+
+    import tempfile
+    from datetime import datetime
+    from pathlib import Path
+    from app.services.analytics_snapshot import AnalyticsSnapshotJob
+    from app.services.analytics_query import (
+        load_table, compute_analytics, ratings_by_agent_by_week, session_length_distribution
+    )
+
+    def session(session_id, user_id, agent_id, day, message_count):
+        created_at = f"{day}T10:00:00"
+        return {
+            "session_id": session_id, "agent_id": agent_id, "title": session_id,
+            "created_at": created_at, "last_accessed": created_at, "message_count": message_count
+        }
+
+    async def run():
+        service, fake = make_firebase_service()
+        for user_id, sessions in {
+            "u1": [session("s1", "u1", "professional_learning", "2026-10-01", 2),
+                   session("s2", "u1", "classroom_curriculum", "2026-10-02", 6)],
+            "u2": [session("s3", "u2", "professional_learning", "2026-10-02", 40)],
+        }.items():
+            for entry in sessions:
+                fake.write(f"sessions/{user_id}/{entry['session_id']}", {**entry, "user_id": user_id})
+                fake.write(f"session_index/{user_id}/{entry['session_id']}", entry)
+            fake.write(f"analytics/users/{user_id}", len(sessions))
+        # Created before the session index existed: reported, not indexed
+        legacy = session("s0", "u1", "professional_learning", "2026-10-02", 1)
+        fake.write("sessions/u1/s0", {**legacy, "user_id": "u1"})
+        for feedback_id, session_id, rating, day in (("f1", "s1", 5, "2026-10-01"),
+                                                     ("f2", "s1", 3, "2026-10-02"),
+                                                     ("f3", "s3", 4, "2026-10-02")):
+            fake.write(f"feedback/{feedback_id}", {
+                "user_id": "u1", "session_id": session_id, "message_id": "m",
+                "rating": rating, "timestamp": f"{day}T12:00:00"
+            })
+
+        with tempfile.TemporaryDirectory() as root:
+            job = AnalyticsSnapshotJob(service, root, page_size=2, max_buffered_rows=1)
+            first = await job.run(until_day="2026-10-01")
+            assert first["sessions"] == 1 and first["feedback"] == 1
+            assert first["missing_index_entries"] == 1
+
+            # Leftovers of a crashed run past the last complete day are replaced
+            stale = Path(root) / "sessions" / "day=2026-10-02"
+            stale.mkdir(parents=True)
+            (stale / "part-7.parquet").write_bytes(b"")
+
+            fake.requests.clear()
+            second = await job.run(until_day="2026-10-02")
+            assert second["start_day"] == "2026-10-02" and second["sessions"] == 2
+            range_queries = [p for _, _, p in fake.requests
+                             if p.get("orderBy") in ('"created_at"', '"timestamp"')]
+            assert range_queries and all(p["startAt"].startswith('"2026-10-02') for p in range_queries)
+            assert {method for method, _, _ in fake.requests} == {"GET"}
+            assert fake.read("session_index/u1/s0") is None
+            print("✓ Reruns append only new days without writing to the database")
+
+            parts = sorted(path.name for path in stale.iterdir())
+            assert parts == ["part-0.parquet", "part-1.parquet"]
+            print("✓ Days are written in parts as the row buffer fills")
+
+            sessions = load_table(root, "sessions")
+            feedback = load_table(root, "feedback")
+            now = datetime(2026, 10, 3)
+            metrics = compute_analytics(
+                sessions, feedback, ["professional_learning", "classroom_curriculum"], days=3, now=now
+            )
+            assert metrics["total_conversations"] == 3 and metrics["active_users"] == 2
+            assert [d["sessions"] for d in metrics["recent_activity"]] == [1, 2, 0]
+            assert metrics["agent_usage_counts"] == {"professional_learning": 2, "classroom_curriculum": 1}
+            assert metrics["avg_rating"] == 4.0
+            assert metrics["top_rated_sessions"][0] == {"session_id": "s1", "avg_rating": 4.0, "rating_count": 2}
+            print("✓ Vectorized metrics match the analytics endpoint's definitions")
+
+            weekly = ratings_by_agent_by_week(sessions, feedback)
+            assert weekly == [{"week": "2026-09-28", "agent_id": "professional_learning",
+                               "avg_rating": 4.0, "rating_count": 3}]
+            assert session_length_distribution(sessions) == {
+                "0-1": 0, "2-3": 1, "4-7": 1, "8-15": 0, "16-31": 0, "32+": 1
+            }
+            assert len(load_table(root, "sessions", start_day="2026-10-02")["session_id"]) == 2
+            print("✓ Ad hoc queries and day-range loads work")
+
+        await service.close()
+
+    try:
+        asyncio.run(run())
+    except Exception as e:
+        print(f"✗ Analytics snapshot test failed: {e}")
+        return False
+
+    return True
+
+
+def test_analytics_export():
+    """Test the streaming NDJSON/CSV analytics export."""
+    print("\nTesting streaming analytics export...")
+
+    import csv
+    import io
+    import json
+    from datetime import date, datetime
+    from app.models.schemas import Message
+    from app.services.analytics_export import AnalyticsExporter, validate_export
+
+    async def run():
+        service, fake = make_firebase_service()
+        sessions = []
+        for user_id, agent_id in (("u1", "professional_learning"), ("u1", "classroom_curriculum"),
+                                  ("u2", "professional_learning")):
+            session_id = await service.create_session(user_id, agent_id, f"{user_id} {agent_id}")
+            await service.add_messages_to_session(user_id, session_id, [
+                Message(role="user", content="Q", timestamp=datetime.utcnow()),
+                Message(role="assistant", content="A", timestamp=datetime.utcnow()),
+            ])
+            await service.save_feedback(user_id, session_id, "m", 4, None)
+            sessions.append(session_id)
+
+        exporter = AnalyticsExporter(service, page_size=2, flush_records=2)
+        fake.requests.clear()
+        chunks = [chunk async for chunk in exporter.stream(kind="all", fmt="ndjson")]
+        records = [json.loads(line) for line in "".join(chunks).splitlines()]
+        types = [r["type"] for r in records]
+        assert types.count("session") == 3 and types.count("message") == 6 and types.count("feedback") == 3
+        assert len(chunks) > 1
+        paged = [p for _, _, p in fake.requests if "orderBy" in p]
+        assert paged and all(int(p["limitToFirst"]) <= 3 for p in paged)
+        assert {method for method, _, _ in fake.requests} == {"GET"}
+        assert exporter.missing_index_entries == 0
+        print("✓ NDJSON streams all kinds in bounded pages and chunks")
+
+        # A session from before the index existed is counted and skipped, not indexed
+        fake.write("sessions/u2/legacy", {"user_id": "u2", "agent_id": "professional_learning",
+                                          "title": "legacy", "created_at": "2024-01-01T00:00:00"})
+        fake.requests.clear()
+        assert len([r async for r in exporter.iter_sessions()]) == 3
+        assert exporter.missing_index_entries == 1
+        assert fake.read("session_index/u2/legacy") is None
+        assert {method for method, _, _ in fake.requests} == {"GET"}
+        print("✓ Exports only read; sessions without index entries are reported")
+
+        filtered = [r async for r in exporter.iter_feedback(agent_id="classroom_curriculum")]
+        assert [r["session_id"] for r in filtered] == [sessions[1]]
+        today = date.today()
+        assert len([r async for r in exporter.iter_sessions(start=today, end=today)]) == 3
+        assert [r async for r in exporter.iter_sessions(end=date(2000, 1, 1))] == []
+        print("✓ Date-range and agent filters apply")
+
+        text = "".join([c async for c in exporter.stream(kind="messages", fmt="csv", agent_id="professional_learning")])
+        rows = list(csv.DictReader(io.StringIO(text)))
+        assert len(rows) == 4 and {row["role"] for row in rows} == {"user", "assistant"}
+        try:
+            validate_export("all", "csv")
+            assert False, "CSV with kind=all should be rejected"
+        except ValueError:
+            pass
+        print("✓ CSV exports one kind with a header row")
+
+        await service.close()
+
+    try:
+        asyncio.run(run())
+    except Exception as e:
+        print(f"✗ Analytics export test failed: {e}")
+        return False
+
+    return True
+
+
+def test_session_archive():
+    """Test archiving cold sessions and rehydrating them on open."""
+    print("\nTesting cold session archive...")
+
+    import tempfile
+    from pathlib import Path
+    from datetime import datetime, timedelta
+    from app.models.schemas import Message
+    from app.services.session_retention import SessionRetentionJob
+
+    async def run():
+        with tempfile.TemporaryDirectory() as root:
+            service, fake = make_firebase_service(session_archive_dir=root)
+            old_id = await service.create_session("u1", "professional_learning", "Old")
+            new_id = await service.create_session("u1", "professional_learning", "New")
+            for session_id in (old_id, new_id):
+                await service.add_messages_to_session("u1", session_id, [
+                    Message(role="user", content="Q", timestamp=datetime.utcnow()),
+                    Message(role="assistant", content="A", timestamp=datetime.utcnow()),
+                ])
+            stale = (datetime.utcnow() - timedelta(days=40)).isoformat()
+            fake.write(f"sessions/u1/{old_id}/last_accessed", stale)
+            fake.write(f"session_index/u1/{old_id}/last_accessed", stale)
+
+            job = SessionRetentionJob(service, retention_days=30)
+            summary = await job.run()
+            assert summary["archived"] == 1 and summary["bytes"] > 0
+            assert fake.read(f"sessions/u1/{old_id}") is None
+            assert Path(root, "u1", f"{old_id}.jsonl.gz").exists()
+            listed = {s.session_id: s.archived for s in await service.get_user_sessions("u1")}
+            assert listed == {old_id: True, new_id: False}
+            assert (await job.run())["archived"] == 0
+            print("✓ Idle sessions move to compressed blobs, leaving index stubs")
+
+            history = await service.get_recent_messages("u1", old_id)
+            assert [m.content for m in history] == ["Q", "A"]
+            assert fake.read(f"sessions/u1/{old_id}/session_id") == old_id
+            assert not fake.read(f"session_index/u1/{old_id}/archived")
+            assert not Path(root, "u1", f"{old_id}.jsonl.gz").exists()
+            session = await service.get_session("u1", old_id)
+            assert [m.content for m in session.messages] == ["Q", "A"]
+            print("✓ Opening an archived session rehydrates it")
+
+            # A turn from a worker whose session cache predates the archive
+            fake.write(f"sessions/u1/{old_id}/last_accessed", stale)
+            fake.write(f"session_index/u1/{old_id}/last_accessed", stale)
+            assert (await job.run())["archived"] == 1
+            await service.add_messages_to_session("u1", old_id, [
+                Message(role="user", content="Q2", timestamp=datetime.utcnow())
+            ])
+            session = await service.get_session("u1", old_id)
+            assert [m.content for m in session.messages] == ["Q", "A", "Q2"]
+            assert not Path(root, "u1", f"{old_id}.jsonl.gz").exists()
+            print("✓ Appending to an archived session rehydrates it first")
+
+            # A fragment left by a write that raced the archive job is merged back
+            fake.write(f"sessions/u1/{old_id}/last_accessed", stale)
+            fake.write(f"session_index/u1/{old_id}/last_accessed", stale)
+            assert (await job.run())["archived"] == 1
+            fake.write(f"sessions/u1/{old_id}/messages/zz", {
+                "role": "user", "content": "Q3", "timestamp": datetime.utcnow().isoformat()
+            })
+            session = await service.get_session("u1", old_id)
+            assert [m.content for m in session.messages] == ["Q", "A", "Q2", "Q3"]
+
+            fake.write(f"sessions/u1/{old_id}/last_accessed", stale)
+            fake.write(f"session_index/u1/{old_id}/last_accessed", stale)
+            assert (await job.run())["archived"] == 1
+
+            async def no_rehydrate(*args):
+                raise AssertionError("deleting must not rehydrate the session")
+            service._rehydrate = no_rehydrate
+            assert await service.delete_session("u1", old_id)
+            assert fake.read(f"session_index/u1/{old_id}") is None
+            assert fake.read("analytics/totals/sessions") == 1
+            assert not Path(root, "u1", f"{old_id}.jsonl.gz").exists()
+            print("✓ Deleting an archived session removes its blob and rollups")
+
+            await service.close()
+
+        # The instance filesystem is lost on Cloud Run; only mounts are durable
+        from app.services.session_archive import open_session_archive, _on_mounted_volume
+        os.environ["K_SERVICE"] = "plc-coach-backend"
+        try:
+            with tempfile.TemporaryDirectory() as root:
+                if not _on_mounted_volume(Path(root)):  # /tmp may itself be a mount
+                    try:
+                        open_session_archive(root)
+                        assert False, "An ephemeral archive directory should be refused"
+                    except ValueError:
+                        pass
+        finally:
+            del os.environ["K_SERVICE"]
+        print("✓ Ephemeral archive directories are refused on Cloud Run")
+
+    try:
+        asyncio.run(run())
+    except Exception as e:
+        print(f"✗ Session archive test failed: {e}")
+        return False
+
+    return True
+
+
+def test_citation_references():
+    """Test that citations are stored as chunk references and hydrated on read."""
+    print("\nTesting citation references...")
+
+    import tempfile
+    import numpy as np
+    from datetime import datetime
+    from app.models.schemas import Message, Citation
+    from app.services.chunk_store import ChunkStore, UNAVAILABLE_SOURCE
+    from app.services.vector_artifact import VectorArtifact, retain_chunk_table, write_artifact
+
+    def ingest(root, corpus_version, texts):
+        path = f"{root}/artifact_{corpus_version}"
+        write_artifact(
+            path,
+            np.eye(2, dtype=np.float32),
+            [{"id": "plc_0", "doc_title": "PLC Handbook", "chunk_index": 0},
+             {"id": "plc_1", "doc_title": "PLC Handbook", "chunk_index": 1}],
+            texts,
+            corpus_version=corpus_version
+        )
+        retain_chunk_table(path, f"{root}/history")
+        artifact = VectorArtifact(path)
+        store = ChunkStore(artifact, f"{root}/history")
+        artifact.close()
+        return store
+
+    async def run():
+        with tempfile.TemporaryDirectory() as root:
+            text = "Collaborative teams focus on learning. " * 25
+            store = ingest(root, "v1", [text, "Second chunk"])
+
+            service, fake = make_firebase_service()
+            service.chunk_store = store
+            session_id = await service.create_session("u1", "professional_learning")
+            citations = [
+                Citation(id="cite_1", vector_id="plc_0", source_title="PLC Handbook",
+                         page_number=0, chunk_text=text, relevance_score=0.91),
+                Citation(id="cite_2", vector_id="gone_7", source_title="Old Doc",
+                         chunk_text="Not in the corpus", relevance_score=0.5),
+            ]
+            await service.add_messages_to_session("u1", session_id, [
+                Message(role="assistant", content="Answer", timestamp=datetime.utcnow(), citations=citations)
+            ])
+
+            stored = list(fake.read(f"sessions/u1/{session_id}/messages").values())[0]["citations"]
+            assert stored[0] == {"vector_id": "plc_0", "relevance_score": 0.91, "corpus_version": "v1"}
+            assert stored[1]["chunk_text"] == "Not in the corpus"
+            print("✓ Known chunks are stored as {vector_id, score} references")
+
+            session = await service.get_session("u1", session_id)
+            assert [c.model_dump() for c in session.messages[0].citations] == [c.model_dump() for c in citations]
+            print("✓ Reads hydrate references from the chunk store")
+
+            assert store.resolve([{"vector_id": "unknown", "relevance_score": 0.4,
+                                   "corpus_version": "v1"}])[0].chunk_text == ""
+            print("✓ References to removed chunks degrade to an empty excerpt")
+
+            # Re-ingesting reuses plc_0 for new text; the old answer keeps its source
+            service.chunk_store = ingest(root, "v2", ["Rewritten first chunk", "Second chunk"])
+            service.session_cache.invalidate("u1", session_id)
+            session = await service.get_session("u1", session_id)
+            assert [c.model_dump() for c in session.messages[0].citations] == [c.model_dump() for c in citations]
+            assert service.chunk_store.resolve([{"vector_id": "plc_0", "relevance_score": 0.9,
+                                                 "corpus_version": "v2"}])[0].chunk_text == "Rewritten first chunk"
+            print("✓ Old sessions resolve citations from their corpus version after re-ingestion")
+
+            stale = store.resolve([{"vector_id": "plc_0", "relevance_score": 0.9, "corpus_version": "v0"}])[0]
+            assert stale.chunk_text == "" and stale.source_title == UNAVAILABLE_SOURCE
+            print("✓ References to versions that were not retained resolve as unavailable")
+
+            artifact = VectorArtifact(f"{root}/artifact_v2")
+            unretained = ChunkStore(artifact)
+            artifact.close()
+            assert not unretained.retained
+            assert unretained.to_reference(citations[0])["chunk_text"] == text
+            print("✓ Without a retained chunk table citations are stored in full")
+
+            await service.close()
+
+    try:
+        asyncio.run(run())
+    except Exception as e:
+        print(f"✗ Citation reference test failed: {e}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = all([
+        test_rtdb_client(),
+        test_firebase_service_sessions(),
+        test_session_index(),
+        test_message_pagination(),
+        test_session_history_cache(),
+        test_analytics_rollups(),
+        test_analytics_snapshot(),
+        test_analytics_export(),
+        test_session_archive(),
+        test_citation_references(),
+    ])
+    sys.exit(0 if success else 1)
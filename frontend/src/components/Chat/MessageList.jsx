@@ -1,12 +1,23 @@
-import { useEffect, useRef, useCallback } from 'react';
+import { useEffect, useLayoutEffect, useRef, useCallback } from 'react';
 import { useChat } from '../../hooks/useChat';
 import UserMessage from './UserMessage';
 import AssistantMessage from './AssistantMessage';
 
 const MessageList = ({ messages }) => {
-  const { isStreaming, streamingContent, streamingCitations } = useChat();
+  const {
+    isStreaming,
+    streamingContent,
+    streamingCitations,
+    hasOlderMessages,
+    isLoadingOlder,
+    loadOlderMessages
+  } = useChat();
+  const containerRef = useRef(null);
   const messagesEndRef = useRef(null);
   const scrollTimeoutRef = useRef(null);
+  // Distance from the bottom before older messages were prepended
+  const prependOffsetRef = useRef(null);
+  const lastScrollTopRef = useRef(0);
 
   const scrollToBottom = useCallback((smooth = true) => {
     if (scrollTimeoutRef.current) {
@@ -22,10 +33,31 @@ const MessageList = ({ messages }) => {
   }, []);
 
   // Smooth scroll for new messages
-  useEffect(() => {
+  useLayoutEffect(() => {
+    const container = containerRef.current;
+    if (prependOffsetRef.current !== null && container) {
+      // Older messages were prepended: keep the same messages in view
+      container.scrollTop = container.scrollHeight - prependOffsetRef.current;
+      prependOffsetRef.current = null;
+      return;
+    }
     scrollToBottom(true);
   }, [messages, scrollToBottom]);
 
+  // Load the previous page when the user scrolls up to the top
+  const handleScroll = useCallback(async (e) => {
+    const container = e.currentTarget;
+    const scrolledUp = container.scrollTop < lastScrollTopRef.current;
+    lastScrollTopRef.current = container.scrollTop;
+    if (!scrolledUp || container.scrollTop > 100 || !hasOlderMessages || isLoadingOlder) return;
+
+    prependOffsetRef.current = container.scrollHeight - container.scrollTop;
+    const loaded = await loadOlderMessages();
+    if (!loaded) {
+      prependOffsetRef.current = null;
+    }
+  }, [hasOlderMessages, isLoadingOlder, loadOlderMessages]);
+
   // Throttled scroll during streaming
   useEffect(() => {
     if (isStreaming) {
@@ -59,7 +91,16 @@ const MessageList = ({ messages }) => {
   }
 
   return (
-    <div className="flex-1 overflow-y-auto p-4 space-y-4" style={{ overflowAnchor: 'auto' }}>
+    <div
+      ref={containerRef}
+      onScroll={handleScroll}
+      className="flex-1 overflow-y-auto p-4 space-y-4"
+      style={{ overflowAnchor: 'auto' }}
+    >
+      {isLoadingOlder && (
+        <div className="text-center text-sm text-gray-500">Loading earlier messages...</div>
+      )}
+
       {messages.map((message) => {
         if (message.role === 'user') {
           return <UserMessage key={message.id} message={message} />;
@@ -1,4 +1,4 @@
-import { createContext, useState, useCallback, useEffect } from 'react';
+import { createContext, useState, useCallback, useEffect, useRef } from 'react';
 import { api } from '../utils/api';
 import { AGENTS } from '../utils/constants';
 
@@ -14,6 +14,10 @@ export const ChatProvider = ({ children }) => {
   const [streamingContent, setStreamingContent] = useState('');
   const [streamingCitations, setStreamingCitations] = useState([]);
   const [error, setError] = useState(null);
+  // Cursor for the next (older) page of a loaded session's messages
+  const [olderCursor, setOlderCursor] = useState(null);
+  const [isLoadingOlder, setIsLoadingOlder] = useState(false);
+  const loadingOlderRef = useRef(false);
 
   const sendMessage = useCallback(async (query) => {
     if (!query.trim()) return;
@@ -42,8 +46,13 @@ export const ChatProvider = ({ children }) => {
         query,
         session_id: sessionId,
 
+        onStatus: (data) => {
+          // Sent as soon as the stream opens, before retrieval
+          currentMessageId = data.message_id;
+        },
+
         onCitations: (data) => {
-          // Citations arrive first
+          // Citations arrive once retrieval completes
           currentCitations = data.citations || [];
           currentMessageId = data.message_id;
 
@@ -139,17 +148,20 @@ export const ChatProvider = ({ children }) => {
   const clearMessages = useCallback(() => {
     setMessages([]);
     setSessionId(null);
+    setOlderCursor(null);
     setError(null);
   }, []);
 
-  const loadSession = useCallback(async (sessionIdToLoad) => {
+  const loadSession = useCallback(async (sessionIdToLoad, agentId) => {
     try {
       setIsLoading(true);
-      const sessionData = await api.getSession(sessionIdToLoad);
+      // Only the newest page; older messages load as the user scrolls up
+      const page = await api.getSessionMessages(sessionIdToLoad);
 
-      setSessionId(sessionData.id);
-      setMessages(sessionData.messages || []);
-      setCurrentAgent(sessionData.agent_id || AGENTS.PROFESSIONAL_LEARNING.id);
+      setSessionId(sessionIdToLoad);
+      setMessages(page.messages || []);
+      setOlderCursor(page.has_more ? page.next_cursor : null);
+      setCurrentAgent(agentId || AGENTS.PROFESSIONAL_LEARNING.id);
       setError(null);
     } catch (err) {
       console.error('Error loading session:', err);
@@ -160,6 +172,27 @@ export const ChatProvider = ({ children }) => {
     }
   }, []);
 
+  const loadOlderMessages = useCallback(async () => {
+    if (!sessionId || !olderCursor || loadingOlderRef.current) return false;
+
+    try {
+      loadingOlderRef.current = true;
+      setIsLoadingOlder(true);
+      const page = await api.getSessionMessages(sessionId, { before: olderCursor });
+
+      setMessages(prev => [...(page.messages || []), ...prev]);
+      setOlderCursor(page.has_more ? page.next_cursor : null);
+      return true;
+    } catch (err) {
+      console.error('Error loading older messages:', err);
+      setError('Failed to load older messages');
+      return false;
+    } finally {
+      loadingOlderRef.current = false;
+      setIsLoadingOlder(false);
+    }
+  }, [sessionId, olderCursor]);
+
   // Initialize with welcome message on first load
   useEffect(() => {
     if (!initialized && messages.length === 0) {
@@ -184,6 +217,8 @@ export const ChatProvider = ({ children }) => {
     currentAgent,
     sessionId,
     isLoading,
+    isLoadingOlder,
+    hasOlderMessages: olderCursor !== null,
     isStreaming,
     streamingContent,
     streamingCitations,
@@ -191,7 +226,8 @@ export const ChatProvider = ({ children }) => {
     sendMessage,
     switchAgent,
     clearMessages,
-    loadSession
+    loadSession,
+    loadOlderMessages
   };
 
   return (
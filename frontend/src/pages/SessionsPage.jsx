@@ -12,7 +12,7 @@ const SessionsPage = () => {
   const { loadSession } = useChat();
   const [deletingId, setDeletingId] = useState(null);
 
-  const handleLoadSession = async (sessionId) => {
+  const handleLoadSession = async (sessionId, agentId) => {
     if (!sessionId) {
       console.error('Session ID is undefined');
       alert('Invalid session ID');
@@ -20,7 +20,7 @@ const SessionsPage = () => {
     }
 
     try {
-      await loadSession(sessionId);
+      await loadSession(sessionId, agentId);
       navigate('/chat');
     } catch (err) {
       console.error('Error loading session:', err);
@@ -117,7 +117,7 @@ const SessionsPage = () => {
             return (
               <div
                 key={sessionId || Math.random()}
-                onClick={() => handleLoadSession(sessionId)}
+                onClick={() => handleLoadSession(sessionId, session.agent_id)}
                 className="bg-white border border-gray-200 rounded-lg p-4 hover:shadow-md transition-shadow cursor-pointer"
               >
                 <div className="flex items-start justify-between">
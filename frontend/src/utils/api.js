@@ -1,6 +1,10 @@
 import axios from 'axios';
 import { auth } from '../config/firebase';
 
+// Reconnect attempts for an interrupted chat stream
+const MAX_STREAM_RESUMES = 3;
+const STREAM_RESUME_DELAY_MS = 500;
+
 const apiClient = axios.create({
   baseURL: import.meta.env.VITE_BACKEND_API_URL,
   headers: {
@@ -95,63 +99,87 @@ export const api = {
   },
 
   // Streaming Chat
-  streamMessage: async ({ agent_id, query, session_id = null, onCitations, onContent, onDone, onError }) => {
-    try {
-      const user = auth.currentUser;
-      const token = user ? await user.getIdToken() : null;
-
-      const response = await fetch(`${import.meta.env.VITE_BACKEND_API_URL}/api/chat/stream`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          'Authorization': token ? `Bearer ${token}` : ''
-        },
-        body: JSON.stringify({
-          query,
-          agent_id,
-          session_id
-        })
-      });
-
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
-      }
-
-      const reader = response.body.getReader();
-      const decoder = new TextDecoder();
-      let buffer = '';
+  // Dropped connections are resumed with Last-Event-ID; the server replays
+  // only the missed events instead of generating the answer again.
+  streamMessage: async ({ agent_id, query, session_id = null, onStatus, onCitations, onContent, onDone, onError }) => {
+    let lastEventId = null;
+    let resumes = 0;
 
+    try {
       while (true) {
-        const { done, value } = await reader.read();
-        if (done) break;
-
-        buffer += decoder.decode(value, { stream: true });
-        const lines = buffer.split('\n');
-        buffer = lines.pop() || ''; // Keep incomplete line in buffer
-
-        for (const line of lines) {
-          if (line.startsWith('data: ')) {
-            try {
-              const data = JSON.parse(line.slice(6));
-
-              switch (data.type) {
-                case 'citations':
-                  if (onCitations) onCitations(data);
-                  break;
-                case 'content':
-                  if (onContent) onContent(data.content);
-                  break;
-                case 'done':
-                  if (onDone) onDone();
-                  return;
-                case 'error':
-                  if (onError) onError(data.error);
-                  return;
+        try {
+          const user = auth.currentUser;
+          const token = user ? await user.getIdToken() : null;
+
+          const response = await fetch(`${import.meta.env.VITE_BACKEND_API_URL}/api/chat/stream`, {
+            method: 'POST',
+            // Sends the Cloud Run session-affinity cookie so a resume reaches
+            // the instance buffering the answer
+            credentials: 'include',
+            headers: {
+              'Content-Type': 'application/json',
+              'Authorization': token ? `Bearer ${token}` : '',
+              ...(lastEventId ? { 'Last-Event-ID': lastEventId } : {})
+            },
+            body: JSON.stringify({
+              query,
+              agent_id,
+              session_id
+            })
+          });
+
+          if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+          }
+
+          const reader = response.body.getReader();
+          const decoder = new TextDecoder();
+          let buffer = '';
+
+          while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop() || ''; // Keep incomplete line in buffer
+
+            for (const line of lines) {
+              if (line.startsWith('id: ')) {
+                lastEventId = line.slice(4);
+              } else if (line.startsWith('data: ')) {
+                try {
+                  const data = JSON.parse(line.slice(6));
+
+                  switch (data.type) {
+                    case 'status':
+                      if (onStatus) onStatus(data);
+                      break;
+                    case 'citations':
+                      if (onCitations) onCitations(data);
+                      break;
+                    case 'content':
+                      if (onContent) onContent(data.content);
+                      break;
+                    case 'done':
+                      if (onDone) onDone(data);
+                      return;
+                    case 'error':
+                      if (onError) onError(data.error);
+                      return;
+                  }
+                } catch (parseError) {
+                  console.error('Error parsing SSE data:', parseError, line);
+                }
               }
-            } catch (parseError) {
-              console.error('Error parsing SSE data:', parseError, line);
             }
           }
+          throw new Error('Stream ended before the answer was complete');
+        } catch (error) {
+          if (!lastEventId || resumes >= MAX_STREAM_RESUMES) throw error;
+          resumes += 1;
+          console.warn(`Stream interrupted, resuming after ${lastEventId}:`, error);
+          await new Promise((resolve) => setTimeout(resolve, STREAM_RESUME_DELAY_MS * resumes));
         }
       }
     } catch (error) {
@@ -172,6 +200,13 @@ export const api = {
     return response.data;
   },
 
+  getSessionMessages: async (sessionId, { limit = 20, before = null } = {}) => {
+    const params = { limit };
+    if (before) params.before = before;
+    const response = await apiClient.get(`/api/sessions/${sessionId}/messages`, { params });
+    return response.data;
+  },
+
   createSession: async (data) => {
     const response = await apiClient.post('/api/sessions', data);
     return response.data;
@@ -20,9 +20,15 @@ from scripts.chunk_documents import chunk_all_documents
 from scripts.metadata_tagger import tag_all_chunks, flatten_chunks
 from utils.embedding_handler import EmbeddingHandler
 from scripts.upload_to_pinecone import prepare_vectors, upload_vectors, save_manifest
+from utils.vector_artifact import save_vector_artifact, retain_chunk_table
 
 
-def run_ingestion_pipeline(raw_dir: str, output_dir: str, skip_upload: bool = False):
+def run_ingestion_pipeline(
+    raw_dir: str,
+    output_dir: str,
+    skip_upload: bool = False,
+    artifact_dtype: str = "float32"
+):
     """
     Run the complete ingestion pipeline.
 
@@ -30,6 +36,7 @@ def run_ingestion_pipeline(raw_dir: str, output_dir: str, skip_upload: bool = Fa
         raw_dir: Directory containing raw documents
         output_dir: Directory for processed output
         skip_upload: If True, skip uploading to Pinecone (for testing)
+        artifact_dtype: Storage type of the vector artifact ("float32" or "float16")
     """
     print("\n" + "="*60)
     print("RAG INGESTION PIPELINE")
@@ -68,11 +75,26 @@ def run_ingestion_pipeline(raw_dir: str, output_dir: str, skip_upload: bool = Fa
     else:
         print("STEP 4: Skipping Pinecone upload (skip_upload=True)\n")
 
-    # Step 5: Save manifest
-    print("STEP 5: Saving embeddings manifest")
+    # Step 5: Save vector artifact (vectors are kept for local search / re-upload)
+    print("STEP 5: Saving vector artifact")
+    print("-" * 60)
+    artifact_dir = Path(output_dir) / "vector_artifact"
+    save_vector_artifact(
+        embedded_chunks,
+        str(artifact_dir),
+        model=handler.model,
+        dimensions=handler.dimensions,
+        dtype=artifact_dtype
+    )
+    # Older versions stay: stored citations refer to chunks by corpus version
+    retain_chunk_table(str(artifact_dir), str(Path(output_dir) / "chunk_history"))
+    print()
+
+    # Step 6: Save manifest
+    print("STEP 6: Saving embeddings manifest")
     print("-" * 60)
     manifest_path = Path(output_dir) / "embeddings_manifest.json"
-    save_manifest(embedded_chunks, str(manifest_path))
+    save_manifest(embedded_chunks, str(manifest_path), str(artifact_dir))
     print()
 
     # Summary
@@ -86,6 +108,7 @@ def run_ingestion_pipeline(raw_dir: str, output_dir: str, skip_upload: bool = Fa
     if not skip_upload:
         print(f"Vectors uploaded: {len(embedded_chunks)}")
 
+    print(f"Vector artifact: {artifact_dir}")
     print(f"Manifest saved: {manifest_path}")
     print(f"Completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*60 + "\n")
@@ -103,6 +126,12 @@ def main():
         action="store_true",
         help="Skip uploading to Pinecone (for testing)"
     )
+    parser.add_argument(
+        "--artifact-dtype",
+        choices=["float32", "float16"],
+        default="float32",
+        help="Storage type for the persisted vector artifact"
+    )
     parser.add_argument(
         "--raw-dir",
         default=None,
@@ -122,7 +151,7 @@ def main():
     output_dir = args.output_dir or str(project_root / "data" / "processed")
 
     try:
-        run_ingestion_pipeline(raw_dir, output_dir, args.skip_upload)
+        run_ingestion_pipeline(raw_dir, output_dir, args.skip_upload, args.artifact_dtype)
         return 0
     except Exception as e:
         print(f"\n✗ ERROR: {str(e)}\n")
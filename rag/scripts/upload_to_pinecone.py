@@ -11,6 +11,7 @@ from tqdm import tqdm
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from config.pinecone_config import PineconeConfig
+from utils.vector_artifact import make_vector_id
 
 
 def prepare_vectors(chunks: List[Dict]) -> List[tuple]:
@@ -26,10 +27,8 @@ def prepare_vectors(chunks: List[Dict]) -> List[tuple]:
     vectors = []
 
     for idx, chunk in enumerate(chunks):
-        # Create unique ID
-        doc_name = chunk['metadata']['doc_name']
-        chunk_idx = chunk['metadata']['chunk_index']
-        vector_id = f"{doc_name}_{chunk_idx}"
+        # Create unique ID (shared with the local vector artifact)
+        vector_id = make_vector_id(chunk)
 
         # Get embedding
         embedding = chunk['embedding']
@@ -95,19 +94,23 @@ def upload_vectors(vectors: List[tuple], batch_size: int = 100):
     print(f"  Dimension: {stats.dimension}")
 
 
-def save_manifest(chunks: List[Dict], output_path: str):
+def save_manifest(chunks: List[Dict], output_path: str, artifact_dir: str = None):
     """
     Save embeddings manifest for reference.
 
     Args:
         chunks: List of chunks with metadata
         output_path: Path to save manifest
+        artifact_dir: Optional vector artifact directory to reference
     """
     manifest = {
         'total_chunks': len(chunks),
         'documents': {}
     }
 
+    if artifact_dir:
+        manifest['vector_artifact'] = str(Path(artifact_dir).name)
+
     # Group by document
     for chunk in chunks:
         doc_name = chunk['metadata']['doc_name']
@@ -129,6 +132,7 @@ if __name__ == "__main__":
     from scripts.chunk_documents import chunk_all_documents
     from scripts.metadata_tagger import tag_all_chunks, flatten_chunks
     from utils.embedding_handler import EmbeddingHandler
+    from utils.vector_artifact import save_vector_artifact
 
     project_root = Path(__file__).parent.parent
 
@@ -150,8 +154,12 @@ if __name__ == "__main__":
     vectors = prepare_vectors(embedded_chunks)
     upload_vectors(vectors)
 
-    print("\nStep 5: Saving manifest...")
+    print("\nStep 5: Saving vector artifact...")
+    artifact_dir = output_dir / "vector_artifact"
+    save_vector_artifact(embedded_chunks, str(artifact_dir), handler.model, handler.dimensions)
+
+    print("\nStep 6: Saving manifest...")
     manifest_path = output_dir / "embeddings_manifest.json"
-    save_manifest(embedded_chunks, str(manifest_path))
+    save_manifest(embedded_chunks, str(manifest_path), str(artifact_dir))
 
     print("\n✓ Upload complete!")
@@ -0,0 +1,214 @@
+"""
+Persisted, memory-mappable vector artifact written by the ingestion pipeline.
+
+Layout of the artifact directory (format version 1, read by the backend's
+`app/services/vector_artifact.py`):
+
+    manifest.json   format_version, corpus_version, model, dimensions, dtype,
+                    count, normalized, created_at
+    vectors.npy     contiguous (count, dimensions) float32/float16 matrix of
+                    L2-normalized embeddings
+    metadata.json   row-aligned column table {"columns": {name: [values]}}:
+                    id, doc_name, doc_title, chunk_index, token_count,
+                    agent_<agent> flags, text_offset, text_length
+    chunks.txt      full chunk texts, UTF-8, concatenated (byte offsets)
+
+Load it zero-copy with `load_vector_artifact()` or
+`np.load(path / "vectors.npy", mmap_mode="r")`.
+
+Each corpus version's chunk table (manifest, metadata and texts, without the
+vectors) is also kept under `chunk_history/{corpus_version}/`, so citations
+stored by reference still resolve after the corpus is re-ingested.
+"""
+import hashlib
+import json
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.npy"
+METADATA_FILE = "metadata.json"
+TEXT_FILE = "chunks.txt"
+
+
+def make_vector_id(chunk: Dict) -> str:
+    """
+    Build the vector ID shared by Pinecone and the local artifact.
+
+    Args:
+        chunk: Chunk dictionary with metadata
+
+    Returns:
+        Vector ID string
+    """
+    return f"{chunk['metadata']['doc_name']}_{chunk['metadata']['chunk_index']}"
+
+
+def compute_corpus_version(chunks: List[Dict], model: str, dimensions: int) -> str:
+    """
+    Derive a corpus version from chunk texts, IDs and the embedding model.
+
+    Args:
+        chunks: Embedded chunks
+        model: Embedding model name
+        dimensions: Embedding dimensions
+
+    Returns:
+        Short content hash; changes whenever the indexed corpus changes
+    """
+    digest = hashlib.sha256(f"{model}:{dimensions}".encode())
+    for chunk in chunks:
+        digest.update(make_vector_id(chunk).encode())
+        digest.update(chunk['text'].encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def save_vector_artifact(
+    chunks: List[Dict],
+    output_dir: str,
+    model: str,
+    dimensions: int,
+    dtype: str = "float32"
+) -> Path:
+    """
+    Save embedded chunks as a versioned, memory-mappable artifact.
+
+    Args:
+        chunks: Chunks with 'text', 'embedding' and 'metadata'
+        output_dir: Artifact directory to (re)write
+        model: Embedding model used
+        dimensions: Embedding dimensions
+        dtype: Vector storage type ("float32" or "float16")
+
+    Returns:
+        Path to the artifact directory
+    """
+    if dtype not in ("float32", "float16"):
+        raise ValueError(f"Unsupported artifact dtype: {dtype}")
+
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    # Contiguous, L2-normalized matrix so readers can use it without copying
+    matrix = np.asarray([chunk['embedding'] for chunk in chunks], dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = matrix / np.where(norms == 0, 1, norms)
+    np.save(out / VECTORS_FILE, np.ascontiguousarray(matrix.astype(dtype)))
+
+    agents = sorted({agent for chunk in chunks for agent in chunk['metadata']['agents']})
+    columns = {
+        'id': [],
+        'doc_name': [],
+        'doc_title': [],
+        'chunk_index': [],
+        'token_count': [],
+        'text_offset': [],
+        'text_length': [],
+    }
+    for agent in agents:
+        columns[f'agent_{agent}'] = []
+
+    offset = 0
+    with open(out / TEXT_FILE, 'wb') as f:
+        for chunk in chunks:
+            metadata = chunk['metadata']
+            encoded = chunk['text'].encode('utf-8')
+            f.write(encoded)
+
+            columns['id'].append(make_vector_id(chunk))
+            columns['doc_name'].append(metadata['doc_name'])
+            columns['doc_title'].append(metadata['doc_title'])
+            columns['chunk_index'].append(metadata['chunk_index'])
+            columns['token_count'].append(metadata['token_count'])
+            columns['text_offset'].append(offset)
+            columns['text_length'].append(len(encoded))
+            for agent in agents:
+                columns[f'agent_{agent}'].append(agent in metadata['agents'])
+            offset += len(encoded)
+
+    with open(out / METADATA_FILE, 'w') as f:
+        json.dump({'columns': columns}, f)
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'corpus_version': compute_corpus_version(chunks, model, dimensions),
+        'model': model,
+        'dimensions': dimensions,
+        'dtype': dtype,
+        'count': len(chunks),
+        'normalized': True,
+        'created_at': datetime.utcnow().isoformat(),
+    }
+    with open(out / MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"✓ Saved vector artifact ({len(chunks)} x {dimensions} {dtype}) to {out}")
+    print(f"  Corpus version: {manifest['corpus_version']}")
+    return out
+
+
+def load_vector_artifact(artifact_dir: str) -> Tuple[np.ndarray, Dict[str, List], Dict]:
+    """
+    Load an artifact zero-copy for analysis or re-upload.
+
+    Args:
+        artifact_dir: Artifact directory
+
+    Returns:
+        Tuple of (memory-mapped vectors, metadata columns, manifest)
+    """
+    path = Path(artifact_dir)
+    with open(path / MANIFEST_FILE) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format: {manifest.get('format_version')}")
+
+    vectors = np.load(path / VECTORS_FILE, mmap_mode='r')
+    with open(path / METADATA_FILE) as f:
+        columns = json.load(f)['columns']
+    return vectors, columns, manifest
+
+
+def read_chunk_text(artifact_dir: str, columns: Dict[str, List], row: int) -> str:
+    """
+    Read the full text of one row from the artifact's text file.
+
+    Args:
+        artifact_dir: Artifact directory
+        columns: Metadata columns from load_vector_artifact()
+        row: Row index
+
+    Returns:
+        Chunk text
+    """
+    with open(Path(artifact_dir) / TEXT_FILE, 'rb') as f:
+        f.seek(columns['text_offset'][row])
+        return f.read(columns['text_length'][row]).decode('utf-8')
+
+
+def retain_chunk_table(artifact_dir: str, history_dir: str) -> Path:
+    """
+    Keep an artifact's chunk table under its corpus version.
+
+    Args:
+        artifact_dir: Artifact directory
+        history_dir: Directory of retained chunk tables
+
+    Returns:
+        Directory the chunk table was copied to
+    """
+    source = Path(artifact_dir)
+    with open(source / MANIFEST_FILE) as f:
+        corpus_version = json.load(f)['corpus_version']
+    out = Path(history_dir) / corpus_version
+    out.mkdir(parents=True, exist_ok=True)
+    for name in (METADATA_FILE, TEXT_FILE, MANIFEST_FILE):
+        shutil.copyfile(source / name, out / name)
+    print(f"✓ Retained chunk table for corpus {corpus_version} in {out}")
+    return out